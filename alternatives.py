@@ -0,0 +1,141 @@
+import concurrent.futures
+import contextlib
+import dataclasses
+import itertools
+import logging
+import multiprocessing
+import os
+from typing import *
+
+from common import Config, Data, normalize_name
+from feasibility import FeasibilityOracle
+
+_worker = {}
+
+
+# Every combination of the weapon loadouts `weapon_sets` and the celestial power sets `power_sets` with the rest of
+# `config`.  An empty list of alternatives keeps what `config` has.
+def combinations(data: Data, config: Config, weapon_sets: Sequence[Iterable[str]],
+                 power_sets: Sequence[Iterable[str]]) -> List[Config]:
+    weapon_sets = [set(weapons) for weapons in weapon_sets] or [config.weapons]
+    power_sets = [{normalize_name(p) for p in powers} for powers in power_sets] or [config.celestial_powers]
+    for weapons in weapon_sets:
+        unknown = weapons - data.weapon_types.keys()
+        if unknown:
+            raise ValueError(f"unknown weapon type(s) {sorted(unknown)}, expected some of {sorted(data.weapon_types)}")
+    for powers in power_sets:
+        unknown = powers - data.celestial_power_stars.keys()
+        if unknown:
+            raise ValueError(f"unknown celestial power(s) {sorted(unknown)}")
+    return [
+        dataclasses.replace(config, weapons=weapons, celestial_powers=powers)
+        for weapons, powers in itertools.product(weapon_sets, power_sets)
+    ]
+
+
+# A quick upper bound on the objective of `config`: the value of its `num_points` most valuable stars.  Only used to
+# decide which combinations to solve first.
+def optimistic_bound(data: Data, config: Config) -> float:
+    from objective import objective_matrix
+
+    values = objective_matrix(data).star_values(config)
+    values.sort()
+    return float(values[::-1][:config.num_points].sum())
+
+
+def _init_worker(data: Data, backend: Optional[str], threads: int, best):
+    from backend import get_backend
+
+    with contextlib.redirect_stdout(open(os.devnull, 'w')):
+        env = get_backend(backend).Env(empty=True)
+        env.setParam('OutputFlag', 0)
+        env.setParam('Threads', threads)
+        env.start()
+    # Reachability doesn't depend on the weapons or powers, so the oracle and the cuts carry over between jobs
+    _worker.update(data=data, env=env, best=best, oracle=FeasibilityOracle(data), cuts=set())
+
+
+def _row(config: Config, status: str, objective: float = None, bound: float = None, stars=None,
+         final_constellations=None) -> Dict:
+    return {
+        "weapons": sorted(config.weapons),
+        "celestial_powers": sorted(config.celestial_powers),
+        "status": status,
+        "objective": objective,
+        "bound": bound,
+        "constellations": sorted(final_constellations) if final_constellations is not None else None,
+        "stars": stars,
+    }
+
+
+# Solve one combination in a worker, unless the bound of its LP relaxation shows it can't beat the best objective
+# found by any worker so far.
+def _solve_combination(config: Config) -> Dict:
+    from mip import MasterProblem
+
+    data, best, cuts = _worker['data'], _worker['best'], _worker['cuts']
+    master = MasterProblem(data, config, _worker['oracle'], env=_worker['env'])
+    master.add_cuts(cuts)
+    bound = master.lp_bound()
+    if bound is None:
+        return _row(config, "infeasible")
+    if bound <= best.value + 1e-6:
+        return _row(config, "pruned", bound=bound)
+
+    result = master.solve()
+    cuts.update(master.cuts)
+    if result is None:
+        return _row(config, "infeasible", bound=bound)
+    objective = master.objective
+    with best.get_lock():
+        best.value = max(best.value, objective)
+    stars, final_constellations = result
+    return _row(config, "optimal" if master.optimal else "time limit", objective, bound, stars, final_constellations)
+
+
+# Solve every config in `configs` on `workers` processes, calling `on_row` with the result of each as it finishes,
+# and return them best first.
+#
+# The workers are forked after the data and the objective matrix are loaded, so they share them, and each keeps its
+# feasibility oracle and the unreachable sets it has found from one combination to the next; those found by other
+# workers arrive through the cut pool.  Combinations are solved in order of a quick bound on their objective, so
+# good builds are found early, and a combination is skipped ("pruned") if the LP relaxation of its master problem
+# can't beat the best objective found so far.  Pruned rows have a bound but no objective.
+def solve_combinations(data: Data, configs: Sequence[Config], workers: int, threads: int = None,
+                       on_row: Callable[[Dict], None] = None) -> List[Dict]:
+    from objective import objective_matrix
+
+    ctx = multiprocessing.get_context("fork")
+    threads = threads or max(1, (os.cpu_count() or 1) // workers)
+    best = ctx.Value('d', float('-inf'))
+    objective_matrix(data)
+    configs = sorted(configs, key=lambda config: -optimistic_bound(data, config))
+
+    rows = []
+    with concurrent.futures.ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=ctx,
+            initializer=_init_worker,
+            initargs=(data, configs[0].backend if configs else None, threads, best),
+    ) as executor:
+        for f in concurrent.futures.as_completed([executor.submit(_solve_combination, c) for c in configs]):
+            row = f.result()
+            logging.info(f"{row['weapons']} {row['celestial_powers']}: {row['status']}")
+            if on_row is not None:
+                on_row(row)
+            rows.append(row)
+
+    def rank(row: Dict) -> Tuple[bool, float, float]:
+        return row["objective"] is None, -(row["objective"] or 0), -(row["bound"] or 0)
+    rows.sort(key=rank)
+    return rows
+
+
+def print_table(rows: Sequence[Dict]):
+    print(f"{'Rank':>4} {'Objective':>12} {'Bound':>12}  {'Weapons':<24} {'Celestial powers':<40} Constellations")
+    for i, row in enumerate(rows, 1):
+        objective = f"{row['objective']:.1f}" if row['objective'] is not None else row['status']
+        bound = f"{row['bound']:.1f}" if row['bound'] is not None else "-"
+        rank = str(i) if row['objective'] is not None else "-"
+        print(f"{rank:>4} {objective:>12} {bound:>12}  {', '.join(row['weapons']):<24} "
+              f"{', '.join(row['celestial_powers']) or '-':<40} {', '.join(row['constellations'] or [])}")
@@ -0,0 +1,26 @@
+from typing import *
+
+BACKENDS = ["gurobi", "highs"]
+
+
+# The MIP solver to use.  The models are written against gurobipy, and a backend is any module providing the part
+# of its API used here: `Model` (variables, linear constraints, `optimize` with a callback, `cbGetSolution`,
+# `cbLazy`, `terminate`, the `X`/`Start` attributes and `Status`/`ObjVal`/`SolCount`), `Env`, `quicksum`,
+# `tupledict`, `LinExpr` and the `GRB` constants.  `highs` implements this on top of `scipy.optimize.milp`, for
+# use without a Gurobi license.  By default Gurobi is used if it is installed.
+def get_backend(name: Optional[str] = None):
+    if name is None:
+        try:
+            import gurobipy
+            return gurobipy
+        except ImportError:
+            name = "highs"
+
+    if name == "gurobi":
+        import gurobipy
+        return gurobipy
+    elif name == "highs":
+        import highs
+        return highs
+    else:
+        raise ValueError(f"unknown backend: {name}")
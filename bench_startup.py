@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import *
+
+HEAVY_MODULES = ["gurobipy", "prettytable", "toml", "schema", "termcolor", "numpy", "scipy"]
+
+# Module imported by each entry point, and the heavy modules it is allowed to pull in at import time.
+ENTRY_POINTS = {
+    "common": [],
+    "info": [],
+    "configure": [],
+    "solve": [],
+}
+
+# Commands run end to end, which also pay for loading the config and the data.  `{solution}` is replaced by the
+# solution file to load and `{config}` by the config file.
+COMMANDS = {
+    "solve.py --load": ["solve.py", "--config", "{config}", "--load", "{solution}"],
+    "info.py w": ["info.py", "w"],
+}
+
+CHILD_SCRIPT = """
+import json, sys
+import {module}
+print(json.dumps([m for m in {heavy!r} if m in sys.modules and m not in {allowed!r}]))
+"""
+
+
+def run_python(*args: str) -> Tuple[float, str]:
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, *args],
+        cwd=Path(__file__).resolve().parent,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return time.perf_counter() - start, proc.stdout
+
+
+def best_of(n: int, *args: str) -> Tuple[float, str]:
+    return min((run_python(*args) for _ in range(n)), key=lambda x: x[0])
+
+
+def report(name: str, elapsed: float, budget: float, leaked: List[str] = ()) -> bool:
+    status = "ok"
+    if elapsed > budget:
+        status = "OVER BUDGET"
+    if leaked:
+        status = "IMPORTS " + ", ".join(leaked)
+    print(f"{name:<20}{elapsed:>8.1f} ms  {status}")
+    return status == "ok"
+
+
+if __name__ == '__main__':
+    p = argparse.ArgumentParser(
+        description="Measure the import time of each entry point and the time of a few quick commands, and fail if "
+                    "either exceeds its budget, or if an entry point imports a heavy module it doesn't need."
+    )
+    p.add_argument('-b', '--budget', type=float, default=250,
+                   help='Maximum import time in milliseconds (excluding interpreter start-up)')
+    p.add_argument('--command-budget', type=float, default=500,
+                   help='Maximum time of each command in milliseconds (excluding interpreter start-up)')
+    p.add_argument('-c', '--config', type=Path, default=Path(__file__).resolve().parent / "example-config.toml",
+                   help='Config file for solve.py')
+    p.add_argument('-l', '--load', type=Path, default=None,
+                   help='Solution for solve.py to load (default: an empty one)')
+    p.add_argument('-r', '--repeat', type=int, default=5, help='Take the best of this many runs')
+    args = p.parse_args()
+
+    baseline, _ = best_of(args.repeat, "-c", "pass")
+    ok = True
+    for module, allowed in ENTRY_POINTS.items():
+        code = CHILD_SCRIPT.format(module=module, heavy=HEAVY_MODULES, allowed=allowed)
+        elapsed, stdout = best_of(args.repeat, "-c", code)
+        ok &= report(module, (elapsed - baseline) * 1000, args.budget, json.loads(stdout))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        solution = args.load
+        if solution is None:
+            solution = Path(tmp) / "solution.json"
+            solution.write_text(json.dumps({"order": [], "stars": []}))
+        for name, command in COMMANDS.items():
+            command = [a.format(config=args.config, solution=solution) for a in command]
+            elapsed, _ = best_of(args.repeat, *command)
+            ok &= report(name, (elapsed - baseline) * 1000, args.command_budget)
+
+    if not ok:
+        sys.exit(1)
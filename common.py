@@ -2,7 +2,11 @@ from grim_dawn_data import load_constellation_bonuses, WEAPON_TYPES, COUNTS_AS
 from grim_dawn_data.bonuses import *
 from grim_dawn_data.json_utils import JsonSerializable
 import dataclasses
+import hashlib
+import importlib.util
 import json
+import os
+import pickle
 import re
 import sys
 from pathlib import Path
@@ -10,12 +14,35 @@ from typing import *
 import math
 import logging
 import copy
-import toml
-import textwrap
 import functools
 
 cache = functools.lru_cache(maxsize=None)
 
+
+# Like `cache`, for functions whose only argument is a `Data` (which isn't hashable).
+def cache_per_data(f):
+    results = {}
+
+    @functools.wraps(f)
+    def wrapper(data):
+        try:
+            cached_data, result = results[id(data)]
+        except KeyError:
+            pass
+        else:
+            if cached_data is data:
+                return result
+        result = f(data)
+        results[id(data)] = (data, result)
+        return result
+
+    return wrapper
+
+# Bump whenever the layout of `Data` (or anything else stored in the snapshot) changes.
+SNAPSHOT_VERSION = 3
+CACHE_DIR = Path(os.environ.get("DEVOTION_CACHE_DIR", Path(__file__).resolve().parent / ".cache"))
+SNAPSHOT_PATH = CACHE_DIR / "data.pickle"
+
 @dataclasses.dataclass(frozen=True, eq=True, order=True)
 class Star(JsonSerializable):
     cons: str
@@ -66,7 +93,11 @@ class Data:
 
     @staticmethod
     @cache
-    def load():
+    def load() -> 'Data':
+        return load_snapshot()['data']
+
+    @staticmethod
+    def build() -> 'Data':
         affinities = ["ascendant", "chaos", "eldritch", "order", "primordial"]
         stars = []
         celestial_powers = {}
@@ -144,6 +175,211 @@ class Data:
         )
         return _DATA
 
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+_REGEX_SPECIAL = re.compile(r"[.^$*+?{}\[\]\\|()]")
+
+
+def _tokens(text: str) -> Set[str]:
+    return set(_TOKEN.findall(text.lower()))
+
+
+@cache
+def _compile_patterns(patterns: Tuple[str, ...]) -> List['re.Pattern']:
+    return [re.compile(p, flags=re.IGNORECASE) for p in patterns]
+
+
+@dataclasses.dataclass
+class TokenIndex:
+    # Texts to search, by key
+    texts: Dict[Any, str]
+    # Position of each key in `texts`
+    position: Dict[Any, int]
+    # Keys of the texts containing each part of a token, a lowercase run of letters and digits
+    postings: Dict[str, List[Any]]
+
+    @staticmethod
+    def build(texts: Iterable[Tuple[Any, str]]) -> 'TokenIndex':
+        texts = dict(texts)
+        postings = {}
+        for key, text in texts.items():
+            parts = {t[i:j] for t in _tokens(text) for i in range(len(t)) for j in range(i + 1, len(t) + 1)}
+            for part in parts:
+                postings.setdefault(part, []).append(key)
+        return TokenIndex(texts, {key: i for i, key in enumerate(texts)}, postings)
+
+    # Keys whose text contains a token with `word` in it
+    def _containing(self, word: str) -> Set:
+        return set(self.postings.get(word, ()))
+
+    # The keys whose text matches any of the regular expressions `patterns` (case insensitive), in the order of
+    # `texts`: the same as `filter_strings`.  Only the texts containing every word of a pattern are matched against
+    # it, unless the pattern uses regular expression syntax; a literal match of a word always lies within one token.
+    def search(self, patterns: Sequence[str]) -> List:
+        if not patterns:
+            return list(self.texts)
+        found = set()
+        for p, regex in zip(patterns, _compile_patterns(tuple(patterns))):
+            words = _tokens(p)
+            if words and not _REGEX_SPECIAL.search(p):
+                candidates = set.intersection(*map(self._containing, words))
+            else:
+                candidates = self.texts.keys()
+            found.update(k for k in candidates if k not in found and regex.search(self.texts[k]))
+        return sorted(found, key=self.position.__getitem__)
+
+
+@dataclasses.dataclass
+class DataIndex:
+    # Stars contributing to each bonus kind (see `star_contributions`), with their value per unit of weight, best
+    # first
+    bonus_stars: Dict[str, List[Tuple[Star, float]]]
+    # Constellations giving each affinity, with how much, most first
+    affinity_constellations: Dict[str, List[Tuple[str, int]]]
+    # Selectable bonus kinds by display text
+    bonus_text: TokenIndex
+    constellation_text: TokenIndex
+    # Celestial power stars by the description of their power.  Powers are looked up by name with
+    # `Data.celestial_power_stars`.
+    power_text: TokenIndex
+
+    @staticmethod
+    def build(data: Data) -> 'DataIndex':
+        values = {}
+        for s, k, val in star_contributions(data):
+            per_star = values.setdefault(k, {})
+            per_star[s] = per_star.get(s, 0) + val
+        bonus_stars = {
+            k: sorted(per_star.items(), key=lambda item: (-item[1], item[0]))
+            for k, per_star in values.items()
+        }
+        affinity_constellations = {
+            a: sorted(((c, bonus[a]) for c, bonus in data.affinity_bonus.items() if bonus.get(a, 0) > 0),
+                      key=lambda item: (-item[1], item[0]))
+            for a in data.affinities
+        }
+        return DataIndex(
+            bonus_stars=bonus_stars,
+            affinity_constellations=affinity_constellations,
+            bonus_text=TokenIndex.build(
+                (k, data.bonus_kinds_info[k]['display']) for k in sorted(data.selectable_bonus_kinds)),
+            constellation_text=TokenIndex.build((c, c) for c in data.constellations),
+            power_text=TokenIndex.build((s, p.desc) for s, p in data.celestial_powers.items()),
+        )
+
+
+# The index stored with each snapshot loaded so far, by the `id` of its `Data`
+_snapshot_indexes: Dict[int, Tuple[Data, DataIndex]] = {}
+
+
+# The index of `data`: the one stored with the snapshot if `data` was loaded from one, otherwise built now.
+@cache_per_data
+def data_index(data: Data) -> DataIndex:
+    loaded = _snapshot_indexes.get(id(data))
+    if loaded is not None and loaded[0] is data:
+        return loaded[1]
+    return DataIndex.build(data)
+
+
+def _data_dump_files() -> List[Path]:
+    submodule = Path(__file__).resolve().parent / "grim-dawn-data-dump"
+    if submodule.is_dir():
+        roots = [submodule]
+    else:
+        roots = [Path(p) for p in importlib.util.find_spec("grim_dawn_data").submodule_search_locations]
+
+    files = []
+    for root in roots:
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames[:] = [d for d in dirnames if d not in (".git", "__pycache__") and not d.endswith(".egg-info")]
+            files.extend(Path(dirpath) / f for f in filenames)
+    files.sort()
+    return files
+
+
+def _data_dump_stat(files: List[Path]) -> List[Tuple[str, int, int]]:
+    stat = []
+    for p in files:
+        st = p.stat()
+        stat.append((str(p), st.st_size, st.st_mtime_ns))
+    return stat
+
+
+def _data_dump_hash(files: List[Path]) -> str:
+    h = hashlib.sha256()
+    for p in files:
+        content = p.read_bytes()
+        h.update(f"{p.name}:{len(content)}\n".encode())
+        h.update(content)
+    return h.hexdigest()
+
+
+# Content hash of the data dump the current snapshot was built from.
+def data_dump_hash() -> str:
+    return load_snapshot()['hash']
+
+
+def _read_snapshot_header(path: Path) -> Optional[Dict]:
+    try:
+        with open(path, 'rb') as fp:
+            header = pickle.load(fp)
+    except (OSError, EOFError, pickle.UnpicklingError):
+        return None
+    if not isinstance(header, dict) or header.get('version') != SNAPSHOT_VERSION:
+        return None
+    return header
+
+
+def _read_snapshot(path: Path) -> Dict:
+    with open(path, 'rb') as fp:
+        header = pickle.load(fp)
+        snapshot = pickle.load(fp)
+    snapshot['hash'] = header['hash']
+    return snapshot
+
+
+def _write_snapshot(path: Path, header: Dict, snapshot: Dict):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp, 'wb') as fp:
+        pickle.dump(header, fp, protocol=pickle.HIGHEST_PROTOCOL)
+        pickle.dump(snapshot, fp, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+
+
+# Build the derived `Data` from the data dump and write it to `path`, unless an up-to-date snapshot already exists.
+# A snapshot is up-to-date if it was written by the same `SNAPSHOT_VERSION` and its content hash matches the data
+# dump.  File sizes and modification times are checked first, so the content is only re-hashed when the dump has
+# been touched.
+def compile_snapshot(path: Path = SNAPSHOT_PATH, force: bool = False) -> Path:
+    files = _data_dump_files()
+    stat = _data_dump_stat(files)
+    header = None if force else _read_snapshot_header(path)
+
+    if header is not None and header['stat'] == stat:
+        return path
+
+    content_hash = _data_dump_hash(files)
+    if header is not None and header['hash'] == content_hash:
+        snapshot = _read_snapshot(path)
+        del snapshot['hash']
+    else:
+        logging.info(f"compiling data snapshot to {path}")
+        data = Data.build()
+        snapshot = {"data": data, "index": DataIndex.build(data)}
+
+    header = {"version": SNAPSHOT_VERSION, "stat": stat, "hash": content_hash}
+    _write_snapshot(path, header, snapshot)
+    return path
+
+
+@cache
+def load_snapshot(path: Path = SNAPSHOT_PATH) -> Dict:
+    snapshot = _read_snapshot(compile_snapshot(path))
+    _snapshot_indexes[id(snapshot['data'])] = (snapshot['data'], snapshot['index'])
+    return snapshot
+
+
 def _value_formula(b : Bonus) -> str:
     return {
         MiscBonus: "X",
@@ -164,6 +400,27 @@ class Config:
     celestial_powers: Set[str]
     num_points: int
     log_level: int = logging.ERROR
+    # MIP solver, see `backend.get_backend`
+    backend: Optional[str] = None
+    # How to plan the path to the final constellations: "mip" or "search" (see `pathsearch`)
+    path_engine: str = "mip"
+    # Longest path, in turns, considered when planning: final sets with no shorter path count as unreachable (see
+    # `horizon.turn_upper_bound`)
+    max_horizon: int = 200
+    # Shrink the master problem before solving it (see `presolve`)
+    presolve: bool = True
+    # Reuse and extend the on-disk pool of unreachable final sets (see `cutpool`)
+    cut_pool: bool = True
+    # Shrink unreachable final sets to a minimal core before cutting them off (see `mip.unreachable_core`)
+    shrink_cuts: bool = True
+    # Separate cuts from fractional solutions at MIP nodes (see `separation`)
+    user_cuts: bool = True
+    # Start the master problem from a solution found by `heuristic`
+    mip_start: bool = True
+    # Seconds the master problem may take before settling for the best solution found so far
+    time_limit: Optional[float] = None
+    # Look up and store solutions in the on-disk solution cache (see `solcache`)
+    solution_cache: bool = True
 
     def validate(self, data: Data):
         for kind in self.objective:
@@ -191,6 +448,9 @@ class Config:
         }
 
     def to_toml(self) -> str:
+        import textwrap
+        import toml
+
         comments = {
             "points": "Number of devotion points available",
             "celestial_powers": "Which celestial powers to unlock (case insensitive). Run './info.py p' for a full list",
@@ -247,6 +507,20 @@ def _calculate_bonus_value(b: Bonus) -> float:
     else:
         raise NotImplementedError
 
+# Every contribution `(star, kind, value)` of a star to the value of a bonus kind.  `ChanceOf` bonuses also count
+# towards the kind of the bonus they give, and `COUNTS_AS` bonuses towards the kinds they count as.
+def star_contributions(data: Data) -> Iterator[Tuple[Star, str, float]]:
+    for s, blist in data.star_bonuses.items():
+        for b in blist:
+            val = _calculate_bonus_value(b)
+            k = b.kind_id()
+            yield s, k, val
+            if isinstance(b, ChanceOf):
+                yield s, b.bonus.kind_id(), val
+            for k2, proportion in COUNTS_AS.get(k, []):
+                yield s, k2, proportion * val
+
+
 def star_bonuses_meet_weapon_req(data: Data, config: Config) -> Dict[Star, List[Bonus]]:
     star_bonuses = {}
     for s, blist in data.star_bonuses.items():
@@ -272,14 +546,16 @@ def calculate_bonus_objective(config: Config, b: Bonus) -> Optional[float]:
     return weight * _calculate_bonus_value(b)
 
 def calculate_star_objective(data: Data, config: Config) -> Dict[Star, float]:
-    obj = {}
-    for s, blist in star_bonuses_meet_weapon_req(data, config).items():
-        coeff = 0
-        for b in blist:
-            coeff += calculate_bonus_objective(config, b)
-        if coeff > 0:
-            obj[s] = coeff
-    return obj
+    from objective import objective_matrix
+    return objective_matrix(data).star_objective(config)
+
+
+def total_affinity(data: Data, cons: Iterable[str]) -> Dict[str, int]:
+    return {a: sum(data.affinity_bonus[c].get(a, 0) for c in cons) for a in data.affinities}
+
+
+def total_points(data: Data, cons: Iterable[str]) -> int:
+    return sum(len(data.constellations[c]) for c in cons)
 
 
 def normalize_name(s: str) -> str:
@@ -306,7 +582,7 @@ def parse_star(data: Data, s: str) -> Star:
 
 
 def filter_strings(strings: Iterable[str], patterns: List[str], key=None) -> List[str]:
-    patterns = [re.compile(p, flags=re.IGNORECASE) for p in patterns]
+    patterns = _compile_patterns(tuple(patterns))
     key = key or (lambda x: x)
     if patterns:
         return [s for s in strings if any(p.search(key(s)) for p in patterns)]
@@ -315,10 +591,13 @@ def filter_strings(strings: Iterable[str], patterns: List[str], key=None) -> Lis
 
 
 def get_bonus_kinds_by_patterns(data: Data, patterns: List[str]) -> List[str]:
-    return filter_strings(data.selectable_bonus_kinds, patterns, key=lambda k: data.bonus_kinds_info[k]['display'])
+    return data_index(data).bonus_text.search(patterns)
 
 def get_powers_by_patterns(data: Data, patterns: List[str]) -> List[Tuple[Star, CelestialPower]]:
-    return filter_strings(data.celestial_powers.items(), patterns, key=lambda pair: pair[1].desc)
+    return [(s, data.celestial_powers[s]) for s in data_index(data).power_text.search(patterns)]
+
+def get_constellations_by_patterns(data: Data, patterns: List[str]) -> List[str]:
+    return data_index(data).constellation_text.search(patterns)
 
 
 def eprint(*args, **kwargs):
@@ -0,0 +1,20 @@
+#!/usr/bin/env python
+import argparse
+import logging
+from pathlib import Path
+
+from common import SNAPSHOT_PATH, compile_snapshot, load_snapshot
+
+if __name__ == '__main__':
+    p = argparse.ArgumentParser(
+        description="Compile the data dump into a snapshot used by the other scripts.  The snapshot is rebuilt "
+                    "automatically when the data dump changes, so this only needs to be run to avoid paying the cost "
+                    "on first use."
+    )
+    p.add_argument('-o', type=Path, default=SNAPSHOT_PATH, help='Path of snapshot file.', metavar='FILEPATH')
+    p.add_argument('-f', '--force', action='store_true', help='Rebuild even if the snapshot is up-to-date')
+    args = p.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    path = compile_snapshot(args.o, force=args.force)
+    print(f"{path} ({load_snapshot(path)['hash'][:16]})")
@@ -2,8 +2,6 @@
 import argparse
 import logging
 import sys
-import toml
-from schema import *
 from typing import List, Tuple, Set
 from pathlib import Path
 from functools import lru_cache
@@ -57,6 +55,8 @@ def celestial_power_patterns() -> List[Tuple[Star, str, CelestialPower]]:
 
 
 def lookup_celestial_power(input_data: str) -> Star:
+    from schema import Schema, SchemaError
+
     input_name = normalize_name(Schema(str).validate(input_data))
 
     for star, name, p in celestial_power_patterns():
@@ -67,18 +67,24 @@ def lookup_celestial_power(input_data: str) -> Star:
 
 
 def is_bonus_kind(input_data: str) -> str:
+    from schema import SchemaError
+
     data = Data.load()
     if input_data not in data.selectable_bonus_kinds:
         raise SchemaError(f"No bonus matches `{input_data}`")
     return True
 
 def is_weapon(input_data: str) -> str:
+    from schema import SchemaError
+
     data = Data.load()
     if input_data not in data.weapon_types:
         raise SchemaError(f"`{input_data}` is not in {data.weapon_types}")
     return True
 
-def get_config_schema() -> Schema:
+def get_config_schema() -> 'Schema':
+    from schema import And, Optional, Or, Schema, Use
+
     data = Data.load()
     return Schema({
         "points": int,
@@ -98,9 +104,16 @@ def get_config_schema() -> Schema:
 
 
 def load_config(path: Path) -> Config:
+    import toml
+
     with open(path, 'r') as fp:
         config = toml.load(fp)
 
+    return config_from_dict(config)
+
+
+# Validate a config read from TOML or JSON (see `get_config_schema`) and convert it.
+def config_from_dict(config: dict) -> Config:
     config = get_config_schema().validate(config)
 
     objective = {}
@@ -127,6 +140,9 @@ def load_config(path: Path) -> Config:
 
 
 def load_config_or_exit(path=None) -> Config:
+    import toml
+    from schema import SchemaError
+
     path = path or Path("config.toml")
     try:
         return load_config(path)
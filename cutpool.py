@@ -0,0 +1,79 @@
+import json
+import logging
+import os
+from pathlib import Path
+from typing import *
+
+from common import CACHE_DIR, data_dump_hash
+
+CUT_POOL_DIR = CACHE_DIR / "cuts"
+
+
+class CutPool:
+    # Sets of final constellations proven unreachable, kept on disk across runs so that later solves can add their
+    # cuts up front.  A set is stored in the same sense as the lazy cuts in `mip.grb_callback`: no final set
+    # containing it is allowed.
+    #
+    # Reachability only depends on the data, the number of points and the longest path considered
+    # (`Config.max_horizon`), so there is one file per data version, horizon and point count, with one sorted JSON
+    # list of constellations per line.  A set unreachable with `n` points is also
+    # unreachable with fewer, so the pool for `num_points` includes the sets found for every larger point count.
+    # Lines are appended with a single write, so several processes can share a pool.
+    def __init__(self, num_points: int, max_horizon: int, version: Optional[str] = None,
+                 directory: Path = CUT_POOL_DIR):
+        self.num_points = num_points
+        self.max_horizon = max_horizon
+        self.version = version or data_dump_hash()
+        self.directory = directory
+        self.sets: Set[FrozenSet[str]] = set()
+        self.load()
+
+    def _prefix(self) -> str:
+        return f"{self.version[:16]}-{self.max_horizon}-"
+
+    def path(self, num_points: int) -> Path:
+        return self.directory / f"{self._prefix()}{num_points}.jsonl"
+
+    def load(self):
+        prefix = self._prefix()
+        for p in sorted(self.directory.glob(f"{prefix}*.jsonl")):
+            try:
+                n = int(p.stem[len(prefix):])
+            except ValueError:
+                continue
+            if n < self.num_points:
+                continue
+            try:
+                lines = p.read_text().splitlines()
+            except OSError as e:
+                logging.warning(f"can't read cut pool {p}: {e}")
+                continue
+            for line in lines:
+                try:
+                    self.sets.add(frozenset(json.loads(line)))
+                except ValueError:
+                    # Left by an interrupted write
+                    continue
+        # Sets containing another set are redundant
+        self.sets = {s for s in self.sets if not any(t < s for t in self.sets)}
+        logging.info(f"loaded {len(self.sets)} cuts from the cut pool")
+
+    # Is every final set containing `constellations` already excluded?
+    def covers(self, constellations: AbstractSet[str]) -> bool:
+        return any(s <= constellations for s in self.sets)
+
+    def add(self, constellations: AbstractSet[str]):
+        s = frozenset(constellations)
+        if self.covers(s):
+            return
+        self.sets.add(s)
+        line = json.dumps(sorted(s)) + "\n"
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            fd = os.open(self.path(self.num_points), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, line.encode())
+            finally:
+                os.close(fd)
+        except OSError as e:
+            logging.warning(f"can't write to the cut pool: {e}")
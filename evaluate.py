@@ -0,0 +1,208 @@
+#!/usr/bin/env python
+import dataclasses
+import itertools
+import json
+import sys
+from typing import *
+
+import numpy as np
+
+from common import *
+from objective import objective_matrix
+
+
+@dataclasses.dataclass
+class LegalityArrays:
+    constellations: List[str]
+    # membership[c, i] is 1 if star i belongs to constellation c
+    membership: np.ndarray
+    size: np.ndarray
+    affinity_req: np.ndarray
+    affinity_bonus: np.ndarray
+    # Star successor[k] can only be taken if predecessor[k] is
+    successor: np.ndarray
+    predecessor: np.ndarray
+
+    @staticmethod
+    def build(data: Data) -> 'LegalityArrays':
+        star_index = objective_matrix(data).star_index
+        constellations = list(data.constellations)
+        membership = np.zeros((len(constellations), len(star_index)), dtype=np.int32)
+        for j, c in enumerate(constellations):
+            membership[j, [star_index[s] for s in data.constellations[c]]] = 1
+
+        affinity_req = np.array([[data.affinity_req[c].get(a, 0) for a in data.affinities] for c in constellations])
+        affinity_bonus = np.array([[data.affinity_bonus[c].get(a, 0) for a in data.affinities] for c in constellations])
+        successor = [star_index[s] for s in data.predecessor]
+        predecessor = [star_index[s] for s in data.predecessor.values()]
+
+        return LegalityArrays(
+            constellations=constellations,
+            membership=membership,
+            size=membership.sum(axis=1),
+            affinity_req=affinity_req,
+            affinity_bonus=affinity_bonus,
+            successor=np.array(successor, dtype=np.intp),
+            predecessor=np.array(predecessor, dtype=np.intp),
+        )
+
+
+@cache_per_data
+def legality_arrays(data: Data) -> LegalityArrays:
+    return LegalityArrays.build(data)
+
+
+@dataclasses.dataclass
+class Evaluation:
+    objective: np.ndarray
+    points: np.ndarray
+    # Number of stars taken without their predecessor
+    missing_predecessors: np.ndarray
+    # Amount of each affinity missing to meet the requirements of the stars taken
+    affinity_deficit: np.ndarray
+    # Number of stars forced by the config (including celestial powers) which aren't taken
+    missing_required: np.ndarray
+    legal: np.ndarray
+
+
+# Score many sets of stars against `config` at once, and check that each set is a legal final allocation: every
+# star's predecessor is taken, the completed constellations provide enough affinity for every constellation a star
+# is taken from, the point limit is respected and the stars required by the config are taken.  These are the same
+# rules the master model in `mip.solve_master` enforces; whether the set can be reached is not checked.
+def evaluate_star_sets(data: Data, config: Config, star_sets: Sequence[Iterable[Star]]) -> Evaluation:
+    obj = objective_matrix(data)
+    arrays = legality_arrays(data)
+
+    X = np.zeros((len(star_sets), len(obj.stars)), dtype=bool)
+    for i, stars in enumerate(star_sets):
+        X[i, [obj.star_index[s] for s in stars]] = True
+
+    required = config.desired_stars | {data.celestial_power_stars[p] for p in config.celestial_powers}
+    required = np.array([obj.star_index[s] for s in required], dtype=np.intp)
+
+    points = X.sum(axis=1)
+    stars_per_constellation = X.astype(np.int32) @ arrays.membership.T
+    completed = stars_per_constellation == arrays.size
+    touched = stars_per_constellation > 0
+    affinity = completed.astype(np.int32) @ arrays.affinity_bonus
+    needed = (touched[:, :, None] * arrays.affinity_req[None, :, :]).max(axis=1, initial=0)
+    affinity_deficit = np.maximum(needed - affinity, 0)
+    missing_predecessors = (X[:, arrays.successor] & ~X[:, arrays.predecessor]).sum(axis=1)
+    missing_required = (~X[:, required]).sum(axis=1)
+
+    legal = (
+        (missing_predecessors == 0)
+        & (affinity_deficit.sum(axis=1) == 0)
+        & (points <= config.num_points)
+        & (missing_required == 0)
+    )
+
+    return Evaluation(
+        objective=X.astype(float) @ obj.star_values(config),
+        points=points,
+        missing_predecessors=missing_predecessors,
+        affinity_deficit=affinity_deficit,
+        missing_required=missing_required,
+        legal=legal,
+    )
+
+
+def _parse_star(data: Data, s) -> Star:
+    if isinstance(s, Star):
+        star = s
+    elif isinstance(s, str):
+        return parse_star(data, s)
+    elif isinstance(s, dict):
+        star = Star(s['cons'], int(s['idx']))
+    else:
+        cons, idx = s
+        star = Star(cons, int(idx))
+
+    if star not in data.constellations.get(star.cons, ()):
+        raise ValueError(f"No such star: {fmt_star(star)}")
+    return star
+
+
+# Each line is either a list of stars or an object with a `stars` list (such as a solution saved by
+# `solve.py --json`), and optionally an `id`.  Stars may be given as '[Constellation] [Index]' strings or as
+# `[constellation, index]` pairs.
+def parse_star_set(data: Data, line: str) -> Tuple[Any, List[Star]]:
+    item = json.loads(line)
+    if isinstance(item, dict):
+        return item.get('id'), [_parse_star(data, s) for s in item['stars']]
+    return None, [_parse_star(data, s) for s in item]
+
+
+def _problems(data: Data, config: Config, ev: Evaluation, i: int) -> List[str]:
+    problems = []
+    if ev.missing_predecessors[i]:
+        problems.append(f"{ev.missing_predecessors[i]} star(s) taken without their predecessor")
+    for a, deficit in zip(data.affinities, ev.affinity_deficit[i]):
+        if deficit:
+            problems.append(f"needs {deficit} more {a.capitalize()} affinity")
+    if ev.points[i] > config.num_points:
+        problems.append(f"uses {ev.points[i]} points (limit {config.num_points})")
+    if ev.missing_required[i]:
+        problems.append(f"{ev.missing_required[i]} required star(s) not taken")
+    return problems
+
+
+def evaluate_stream(data: Data, config: Config, lines: Iterable[str], batch_size: int = 4096) -> Iterator[Dict]:
+    lines = (l for l in lines if l.strip())
+    index = 0
+    while True:
+        batch = list(itertools.islice(lines, batch_size))
+        if not batch:
+            break
+
+        results = {}
+        ids = {}
+        star_sets = []
+        positions = []
+        for offset, line in enumerate(batch):
+            try:
+                ids[offset], stars = parse_star_set(data, line)
+            except (ValueError, KeyError, TypeError) as e:
+                results[offset] = {"error": str(e)}
+            else:
+                star_sets.append(stars)
+                positions.append(offset)
+
+        if star_sets:
+            ev = evaluate_star_sets(data, config, star_sets)
+            for i, offset in enumerate(positions):
+                results[offset] = {
+                    "objective": float(ev.objective[i]),
+                    "points": int(ev.points[i]),
+                    "legal": bool(ev.legal[i]),
+                    "problems": _problems(data, config, ev, i),
+                }
+
+        for offset in range(len(batch)):
+            r = {"index": index + offset}
+            if ids.get(offset) is not None:
+                r["id"] = ids[offset]
+            r.update(results[offset])
+            yield r
+        index += len(batch)
+
+
+if __name__ == '__main__':
+    import argparse
+    import configure
+
+    p = argparse.ArgumentParser(
+        description="Score sets of stars against a config, one JSON line of output per line of input."
+    )
+    p.add_argument('-c', "--config", type=Path, default=None)
+    p.add_argument('input', type=Path, nargs='?', default=None,
+                   help='JSON lines file of star lists or saved solutions (default: stdin)')
+    p.add_argument('--batch-size', type=int, default=4096, help='Number of lines to evaluate at once')
+    args = p.parse_args()
+
+    config = configure.load_config_or_exit(args.config)
+    data = Data.load()
+    fp = open(args.input) if args.input else sys.stdin
+    with fp:
+        for result in evaluate_stream(data, config, fp, args.batch_size):
+            print(json.dumps(result))
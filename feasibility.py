@@ -0,0 +1,176 @@
+import dataclasses
+from typing import *
+
+from common import Data, total_affinity, total_points
+
+# A single turn of a path: the constellations completed and the constellations refunded on that turn.
+Turn = Tuple[FrozenSet[str], FrozenSet[str]]
+
+
+def _meets_requirements(data: Data, active: AbstractSet[str], affinity: Dict[str, int]) -> bool:
+    for c in active:
+        if c in data.self_sufficient_constellations:
+            continue
+        for a, d in data.affinity_req[c].items():
+            if d > affinity[a]:
+                return False
+    return True
+
+
+# Check that a path obeys the same rules as `mip.Subproblem`: every turn must complete at least one constellation,
+# constellations can only be completed if the affinity at the end of the previous turn is enough and the points are
+# available, and every active constellation must have its requirements met at the end of each turn.
+def check_path(data: Data, num_points: int, turns: Sequence[Turn], target_constellations: AbstractSet[str]) -> bool:
+    active = set()
+    affinity = total_affinity(data, active)
+    points = 0
+    for added, removed in turns:
+        if not added or (added & active) or not (removed <= active):
+            return False
+        if points + total_points(data, added) > num_points:
+            return False
+        for c in added:
+            for a, d in data.affinity_req[c].items():
+                if d > affinity[a]:
+                    return False
+
+        active |= added
+        active -= removed
+        affinity = total_affinity(data, active)
+        points = total_points(data, active)
+        if not _meets_requirements(data, active, affinity):
+            return False
+
+    return active == set(target_constellations)
+
+
+# The actions of a path, as reported in a solution: one action per completion and per refund, with the active
+# constellations, affinity and points after it.
+def path_actions(data: Data, turns: Sequence[Turn]) -> List[Dict]:
+    actions = []
+    active_constellations = set()
+    for added, removed in turns:
+        if added:
+            active_constellations |= added
+            actions.append({
+                "add": set(added),
+                "constellations": active_constellations.copy(),
+            })
+        if removed:
+            active_constellations -= removed
+            actions.append({
+                "remove": set(removed),
+                "constellations": active_constellations.copy(),
+            })
+
+    for d in actions:
+        d['affinity'] = total_affinity(data, d['constellations'])
+        d['points'] = total_points(data, d['constellations'])
+
+    return actions
+
+
+# Try to turn a path reaching `target_constellations` into one reaching `subset`, by skipping or refunding the
+# extra constellations on the final turn.
+def _restrict_path(data: Data, num_points: int, turns: Sequence[Turn], subset: FrozenSet[str]) -> Optional[List[Turn]]:
+    if not turns:
+        return [] if not subset else None
+
+    active = set()
+    for added, removed in turns[:-1]:
+        active |= added
+        active -= removed
+
+    added, removed = turns[-1]
+    drop = (active | added) - subset
+    restricted = list(turns[:-1])
+    restricted.append((added - drop, removed | (drop & active)))
+    if check_path(data, num_points, restricted, subset):
+        return restricted
+    return None
+
+
+@dataclasses.dataclass
+class FeasibilityRecord:
+    # Largest horizon the target is known to be unreachable in.
+    infeasible_horizon: int = 0
+    # `True` if reachable, `False` if proven unreachable at every horizon, `None` if unknown.
+    feasible: Optional[bool] = None
+    # Number of turns used by `witness`, the smallest known so far.
+    turns: Optional[int] = None
+    witness: Optional[List[Turn]] = None
+
+
+class FeasibilityOracle:
+    # Remembers which sets of final constellations can be reached with a given number of points, so the
+    # subproblems don't have to be solved again.  Two kinds of monotonicity are used:
+    #
+    # - A set reachable with `n` points is reachable with more, in the same number of turns.  A set unreachable with
+    #   `n` points (at some horizon) is unreachable with fewer.
+    # - A subset of a reachable set is often reachable by leaving out the extra constellations on the final turn.
+    #   This is only trusted after checking the modified path with `check_path`.
+    def __init__(self, data: Data):
+        self.data = data
+        self.records: Dict[Tuple[FrozenSet[str], int], FeasibilityRecord] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _record(self, target: FrozenSet[str], num_points: int) -> FeasibilityRecord:
+        key = (target, num_points)
+        try:
+            return self.records[key]
+        except KeyError:
+            r = FeasibilityRecord()
+            self.records[key] = r
+            return r
+
+    def record_feasible(self, target_constellations: AbstractSet[str], num_points: int, witness: Sequence[Turn]):
+        r = self._record(frozenset(target_constellations), num_points)
+        r.feasible = True
+        if r.turns is None or len(witness) < r.turns:
+            r.turns = len(witness)
+            r.witness = list(witness)
+
+    def record_infeasible(self, target_constellations: AbstractSet[str], num_points: int, horizon: int,
+                          final: bool = False):
+        r = self._record(frozenset(target_constellations), num_points)
+        r.infeasible_horizon = max(r.infeasible_horizon, horizon)
+        if final:
+            r.feasible = False
+
+    def lookup(self, target_constellations: AbstractSet[str], num_points: int) -> FeasibilityRecord:
+        # Returns what is known about reaching `target_constellations`.  The returned record is a summary and
+        # should not be modified.
+        target = frozenset(target_constellations)
+        summary = FeasibilityRecord()
+        subset_candidates = []
+
+        for (cons, n), r in self.records.items():
+            if cons == target:
+                if r.feasible and n <= num_points:
+                    if summary.turns is None or r.turns < summary.turns:
+                        summary.feasible = True
+                        summary.turns = r.turns
+                        summary.witness = r.witness
+                elif n >= num_points:
+                    summary.infeasible_horizon = max(summary.infeasible_horizon, r.infeasible_horizon)
+                    if r.feasible is False:
+                        summary.feasible = False
+            elif r.feasible and n <= num_points and target < cons:
+                subset_candidates.append(r)
+
+        if summary.feasible is None:
+            for r in sorted(subset_candidates, key=lambda r: r.turns):
+                witness = _restrict_path(self.data, num_points, r.witness, target)
+                if witness is not None:
+                    self.record_feasible(target, num_points, witness)
+                    summary.feasible = True
+                    summary.turns = len(witness)
+                    summary.witness = witness
+                    break
+
+        if summary.feasible is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return summary
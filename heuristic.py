@@ -0,0 +1,211 @@
+import dataclasses
+import logging
+import time
+from typing import *
+
+from common import *
+from feasibility import FeasibilityOracle, Turn
+from horizon import turn_lower_bound
+from inequalities import star_ancestors
+from objective import objective_matrix
+from pathsearch import PathSearch, merge_turns
+from presolve import fill_points
+
+# Weight of one point of missing affinity for a forced star or a completed constellation, so that moves towards
+# meeting it are preferred to anything else.
+PENALTY = 1e6
+
+
+@dataclasses.dataclass
+class HeuristicSolution:
+    # Objective value, less `PENALTY` for every point of affinity forced stars and completed constellations are
+    # missing
+    score: float
+    stars: List[Star]
+    final_constellations: FrozenSet[str]
+    # `False` if some forced star's requirements aren't met
+    feasible: bool = True
+    # `True` if some completed constellation's requirements aren't met, so the set can't be reached yet
+    broken: bool = False
+    # A path to `final_constellations`, once it has been checked
+    witness: Optional[List[Turn]] = None
+
+
+class Heuristic:
+    # Greedy and local search over the set of completed constellations.  A set is scored by its stars plus the
+    # best partial stars that fit in the points left over (chosen greedily by value per point, with their
+    # predecessors), and only accepted if it can be reached, which is checked with a bounded `PathSearch`.
+    #
+    # Starting from nothing, the search repeatedly moves to the best reachable neighbouring set: one more
+    # constellation, one fewer, or one swapped for another (swaps are only tried when no addition or removal
+    # improves the score).  The forced stars may complete constellations whose requirements they don't meet, so
+    # sets whose constellations miss some affinity are scored with a penalty rather than rejected, and are passed
+    # through without a path until the missing affinity has been added.
+    def __init__(self, data: Data, config: Config, oracle: FeasibilityOracle = None, max_states: int = 20000):
+        self.data = data
+        self.config = config
+        self.oracle = oracle
+        self.max_states = max_states
+
+        obj = objective_matrix(data)
+        values = obj.star_values(config)
+        self.value = {s: float(values[obj.star_index[s]]) for s in data.stars}
+        self.forced = config.desired_stars | {data.celestial_power_stars[p] for p in config.celestial_powers}
+        self.points = {c: len(stars) for c, stars in data.constellations.items()}
+
+        ancestors = star_ancestors(data)
+        self.forced_closure = {t for s in self.forced for t in [s] + ancestors.get(s, [])}
+        # Constellations the forced stars complete on their own
+        self.start = frozenset(
+            c for c, stars in data.constellations.items() if all(s in self.forced_closure for s in stars)
+        )
+        chains = []
+        for s in data.stars:
+            if self.value[s] > 0:
+                chain = [s] + ancestors.get(s, [])
+                chains.append((sum(self.value[t] for t in chain) / len(chain), chain))
+        chains.sort(key=lambda item: -item[0])
+        self.chains = [chain for _, chain in chains]
+        self._reachable: Dict[FrozenSet[str], Optional[List[Turn]]] = {}
+        self.evaluated = 0
+
+    def _deficit(self, constellation: str, affinity: Dict[str, int]) -> int:
+        return sum(max(0, d - affinity[a]) for a, d in self.data.affinity_req[constellation].items())
+
+    # Score `final`, or `None` if it breaks the point limit or leaves out a constellation the forced stars complete.
+    def evaluate(self, final: FrozenSet[str]) -> Optional[HeuristicSolution]:
+        data = self.data
+        num_points = self.config.num_points
+        if sum(self.points[c] for c in final) > num_points:
+            return None
+        affinity = total_affinity(data, final)
+        broken = sum(self._deficit(c, affinity) for c in final if c not in data.self_sufficient_constellations)
+
+        self.evaluated += 1
+        taken = {s for c in final for s in data.constellations[c]}
+        deficit = broken + sum(self._deficit(s.cons, affinity) for s in self.forced if s not in taken)
+        taken |= self.forced_closure
+        if len(taken) > num_points or not self.start <= final:
+            return None
+        count = {}
+        for s in taken:
+            count[s.cons] = count.get(s.cons, 0) + 1
+
+        room = num_points - len(taken)
+        for chain in self.chains:
+            if room == 0:
+                break
+            s = chain[0]
+            if s in taken or self._deficit(s.cons, affinity):
+                continue
+            new = [t for t in chain if t not in taken]
+            # Don't complete any more constellations
+            if len(new) > room or count.get(s.cons, 0) + len(new) >= self.points[s.cons]:
+                continue
+            taken.update(new)
+            count[s.cons] = count.get(s.cons, 0) + len(new)
+            room -= len(new)
+
+        score = sum(self.value[s] for s in taken) - PENALTY * deficit
+        return HeuristicSolution(score, sorted(taken), final, feasible=deficit == 0, broken=broken > 0)
+
+    def reachable(self, final: FrozenSet[str]) -> Optional[List[Turn]]:
+        try:
+            return self._reachable[final]
+        except KeyError:
+            pass
+
+        num_points = self.config.num_points
+        witness = None
+        known = self.oracle.lookup(final, num_points) if self.oracle is not None else None
+        if known is not None and known.feasible is not None:
+            witness = known.witness
+        elif turn_lower_bound(self.data, final, num_points) is not None:
+            witness = PathSearch(self.data, num_points, final).search(self.max_states)
+            if witness is not None:
+                witness = merge_turns(self.data, num_points, witness, final)
+                if self.oracle is not None:
+                    self.oracle.record_feasible(final, num_points, witness)
+
+        self._reachable[final] = witness
+        return witness
+
+    # Whether the search may move to `sol`: its final constellations must be reachable, which is only checked once
+    # they meet their requirements.
+    def _accept(self, sol: HeuristicSolution) -> bool:
+        if sol.broken:
+            return True
+        final = sol.final_constellations
+        sol.witness = self.reachable(final) if final else []
+        return sol.witness is not None
+
+    def _neighbours(self, final: FrozenSet[str], swaps: bool) -> Iterator[FrozenSet[str]]:
+        others = [c for c in self.data.constellations if c not in final]
+        if not swaps:
+            for c in others:
+                yield final | {c}
+            for c in final:
+                yield final - {c}
+        else:
+            for c in final:
+                for d in others:
+                    yield (final - {c}) | {d}
+
+    # The best valid and reachable subset of `final` found by dropping one constellation at a time, each time the
+    # one whose removal scores best.
+    def _repair(self, final: FrozenSet[str]) -> Optional[HeuristicSolution]:
+        final = final | self.start
+        while True:
+            sol = self.evaluate(final)
+            if sol is not None and self._accept(sol):
+                return sol
+            if final == self.start:
+                return None
+
+            def removal_score(c: str) -> Tuple[bool, float]:
+                sol = self.evaluate(final - {c})
+                return (True, sol.score) if sol is not None else (False, self.points[c])
+            final = final - {max(final - self.start, key=removal_score)}
+
+    # Returns the best solution found within `time_limit` seconds, or `None` if no solution meeting the forced
+    # stars' requirements was found.  The search starts from the largest reachable part of `initial` (say, the
+    # solution for a similar config) if given, otherwise from the constellations the forced stars complete.
+    def run(self, time_limit: float = 1.0, initial: Iterable[str] = ()) -> Optional[HeuristicSolution]:
+        deadline = time.perf_counter() + time_limit
+        current = self._repair(frozenset(initial))
+        if current is None:
+            return None
+        swaps = False
+        while time.perf_counter() < deadline:
+            candidates = []
+            for final in self._neighbours(current.final_constellations, swaps):
+                sol = self.evaluate(final)
+                if sol is not None and sol.score > current.score:
+                    candidates.append(sol)
+                if time.perf_counter() >= deadline:
+                    break
+
+            candidates.sort(key=lambda sol: -sol.score)
+            for sol in candidates:
+                if self._accept(sol):
+                    current = sol
+                    swaps = False
+                    break
+            else:
+                if swaps:
+                    break
+                swaps = True
+
+        logging.info(f"heuristic: evaluated {self.evaluated} sets, best score {current.score}")
+        return current if current.feasible else None
+
+
+# Find a good solution quickly.  Returns the chosen stars and the completed constellations, like
+# `mip.solve_master`, with a path to them in `oracle` if one is given.
+def solve_heuristic(data: Data, config: Config, oracle: FeasibilityOracle = None, time_limit: float = 1.0,
+                    initial: Iterable[str] = ()) -> Optional[Tuple[List[Star], List[str]]]:
+    sol = Heuristic(data, config, oracle).run(time_limit, initial)
+    if sol is None:
+        return None
+    final_constellations = sorted(sol.final_constellations)
+    return fill_points(data, config, sol.stars, final_constellations), final_constellations
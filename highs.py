@@ -0,0 +1,451 @@
+import itertools
+import logging
+import math
+import numbers
+import time
+from typing import *
+
+import numpy as np
+from scipy.optimize import Bounds, LinearConstraint, milp
+from scipy.sparse import csr_array
+
+
+# The subset of gurobipy's constants used by this project, with the same values.
+class GRB:
+    BINARY = 'B'
+    CONTINUOUS = 'C'
+    INTEGER = 'I'
+
+    MINIMIZE = 1
+    MAXIMIZE = -1
+
+    LESS_EQUAL = '<'
+    GREATER_EQUAL = '>'
+    EQUAL = '='
+
+    INFINITY = 1e100
+    UNDEFINED = 1e101
+
+    LOADED = 1
+    OPTIMAL = 2
+    INFEASIBLE = 3
+    INF_OR_UNBD = 4
+    UNBOUNDED = 5
+    TIME_LIMIT = 9
+    INTERRUPTED = 11
+
+    class Callback:
+        MIP = 3
+        MIPSOL = 4
+        MIPNODE = 5
+        MIPSOL_OBJ = 4002
+        MIPSOL_OBJBND = 4004
+
+
+class LinExpr:
+    __slots__ = ("coeffs", "constant")
+
+    def __init__(self, coeffs: Dict[int, float] = None, constant: float = 0.0):
+        self.coeffs = coeffs if coeffs is not None else {}
+        self.constant = constant
+
+    def copy(self) -> 'LinExpr':
+        return LinExpr(self.coeffs.copy(), self.constant)
+
+    def _add(self, other, scale: float) -> bool:
+        if isinstance(other, Var):
+            self.coeffs[other.index] = self.coeffs.get(other.index, 0) + scale
+        elif isinstance(other, LinExpr):
+            for i, c in other.coeffs.items():
+                self.coeffs[i] = self.coeffs.get(i, 0) + scale * c
+            self.constant += scale * other.constant
+        elif isinstance(other, numbers.Real):
+            self.constant += scale * other
+        else:
+            return False
+        return True
+
+    def __iadd__(self, other):
+        return self if self._add(other, 1) else NotImplemented
+
+    def __isub__(self, other):
+        return self if self._add(other, -1) else NotImplemented
+
+    def __add__(self, other):
+        e = self.copy()
+        return e if e._add(other, 1) else NotImplemented
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        e = self.copy()
+        return e if e._add(other, -1) else NotImplemented
+
+    def __rsub__(self, other):
+        e = -self
+        return e if e._add(other, 1) else NotImplemented
+
+    def __mul__(self, other):
+        if not isinstance(other, numbers.Real):
+            return NotImplemented
+        return LinExpr({i: c * other for i, c in self.coeffs.items()}, self.constant * other)
+
+    __rmul__ = __mul__
+
+    def __neg__(self):
+        return self * -1
+
+    def __le__(self, other):
+        return TempConstr(self - other, GRB.LESS_EQUAL)
+
+    def __ge__(self, other):
+        return TempConstr(self - other, GRB.GREATER_EQUAL)
+
+    def __eq__(self, other):
+        return TempConstr(self - other, GRB.EQUAL)
+
+    __hash__ = None
+
+
+class Var:
+    __slots__ = ("index", "lb", "ub", "vtype", "VarName", "Start", "X")
+
+    def __init__(self, index: int, lb: float, ub: float, vtype: str, name: str):
+        self.index = index
+        self.lb = lb
+        self.ub = ub
+        self.vtype = vtype
+        self.VarName = name
+        self.Start = None
+        self.X = None
+
+    @property
+    def x(self) -> float:
+        return self.X
+
+    def _expr(self) -> LinExpr:
+        return LinExpr({self.index: 1.0})
+
+    def __add__(self, other):
+        return self._expr() + other
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        return self._expr() - other
+
+    def __rsub__(self, other):
+        return other - self._expr()
+
+    def __mul__(self, other):
+        return self._expr() * other
+
+    __rmul__ = __mul__
+
+    def __neg__(self):
+        return -self._expr()
+
+    def __le__(self, other):
+        return self._expr() <= other
+
+    def __ge__(self, other):
+        return self._expr() >= other
+
+    def __eq__(self, other):
+        return self._expr() == other
+
+    __hash__ = object.__hash__
+
+    def __repr__(self):
+        return f"<highs.Var {self.VarName}>"
+
+
+class TempConstr:
+    __slots__ = ("expr", "sense")
+
+    # expr (sense) 0
+    def __init__(self, expr: LinExpr, sense: str):
+        self.expr = expr
+        self.sense = sense
+
+
+class Constr:
+    __slots__ = ("coeffs", "sense", "RHS", "ConstrName")
+
+    def __init__(self, coeffs: Dict[int, float], sense: str, rhs: float, name: str):
+        self.coeffs = coeffs
+        self.sense = sense
+        self.RHS = rhs
+        self.ConstrName = name
+
+
+class tupledict(dict):
+    def select(self, *pattern) -> list:
+        if not pattern:
+            return list(self.values())
+        return [v for k, v in self.items() if all(p == '*' or p == kp for p, kp in zip(pattern, k))]
+
+    def sum(self, *pattern) -> LinExpr:
+        return quicksum(self.select(*pattern))
+
+
+def quicksum(terms: Iterable) -> LinExpr:
+    e = LinExpr()
+    for t in terms:
+        e += t
+    return e
+
+
+DEFAULT_PARAMS = {
+    "OutputFlag": 1,
+    "LazyConstraints": 0,
+    "TimeLimit": math.inf,
+    "MIPGap": 1e-4,
+    "Threads": 0,
+}
+
+
+class Env:
+    def __init__(self, empty: bool = False):
+        self.params = {}
+
+    def setParam(self, name: str, value):
+        if name not in DEFAULT_PARAMS:
+            raise ValueError(f"unsupported parameter: {name}")
+        self.params[name] = value
+
+    def start(self):
+        return self
+
+    def dispose(self):
+        pass
+
+
+class Model:
+    # A MIP model solved with HiGHS through `scipy.optimize.milp`.  HiGHS has no callbacks, so they are emulated:
+    # `optimize(callback)` calls the callback with `GRB.Callback.MIP` before each solve and with
+    # `GRB.Callback.MIPSOL` on each optimal solution.  Lazy constraints added with `cbLazy` become ordinary
+    # constraints until `optimize` returns, and the model is solved again until the callback adds none.  The final
+    # solution is therefore the same as Gurobi's, but every intermediate solution is a full re-solve.  `milp` takes
+    # no initial solution, so a MIP start set through `Var.Start` is ignored.
+    def __init__(self, name: str = "", env: Env = None):
+        self.ModelName = name
+        self.params = DEFAULT_PARAMS.copy()
+        if env is not None:
+            self.params.update(env.params)
+        self._vars: List[Var] = []
+        self._constrs: Dict[int, Constr] = {}
+        self._constr_ids = itertools.count()
+        self._objective = LinExpr()
+        self._sense = GRB.MINIMIZE
+        self._cb_solution = None
+        self._lazy = None
+        self._terminated = False
+        self.Status = GRB.LOADED
+        self.ObjVal = math.nan
+        self.ObjBound = math.nan
+        self.SolCount = 0
+        self.Runtime = 0.0
+
+    @property
+    def status(self) -> int:
+        return self.Status
+
+    @property
+    def NumVars(self) -> int:
+        return len(self._vars)
+
+    @property
+    def NumConstrs(self) -> int:
+        return len(self._constrs)
+
+    def setParam(self, name: str, value):
+        if name not in DEFAULT_PARAMS:
+            raise ValueError(f"unsupported parameter: {name}")
+        self.params[name] = value
+
+    def update(self):
+        pass
+
+    def addVar(self, lb: float = 0.0, ub: float = GRB.INFINITY, obj: float = 0.0, vtype: str = GRB.CONTINUOUS,
+               name: str = "") -> Var:
+        v = Var(len(self._vars), lb, ub, vtype, name)
+        self._vars.append(v)
+        if obj:
+            self._objective += v * obj
+        return v
+
+    def addVars(self, *indices, lb: float = 0.0, ub: float = GRB.INFINITY, obj: float = 0.0,
+                vtype: str = GRB.CONTINUOUS, name: str = "") -> tupledict:
+        indices = [range(ix) if isinstance(ix, int) else list(ix) for ix in indices]
+        td = tupledict()
+        for key in itertools.product(*indices):
+            if len(key) == 1:
+                key = key[0]
+                label = key
+            else:
+                label = ",".join(map(str, key))
+            td[key] = self.addVar(lb, ub, obj, vtype, f"{name}[{label}]")
+        return td
+
+    def getVars(self) -> List[Var]:
+        return list(self._vars)
+
+    def addConstr(self, constr: TempConstr, name: str = "") -> Constr:
+        expr = constr.expr
+        c = Constr({i: a for i, a in expr.coeffs.items() if a != 0}, constr.sense, -expr.constant, name)
+        self._constrs[next(self._constr_ids)] = c
+        return c
+
+    def remove(self, items):
+        if isinstance(items, Constr):
+            items = [items]
+        items = {id(c) for c in items}
+        self._constrs = {k: c for k, c in self._constrs.items() if id(c) not in items}
+
+    def setObjective(self, expr, sense: int = GRB.MINIMIZE):
+        self._objective = quicksum([expr])
+        self._sense = sense
+
+    def getAttr(self, attr: str, items: List[Var]) -> list:
+        return [getattr(v, attr) for v in items]
+
+    def setAttr(self, attr: str, items: List[Var], values: list):
+        for v, val in zip(items, values):
+            setattr(v, attr, val)
+
+    def terminate(self):
+        self._terminated = True
+
+    def cbGetSolution(self, vars):
+        if self._cb_solution is None:
+            raise Exception("cbGetSolution called outside of a MIPSOL callback")
+        if isinstance(vars, Var):
+            return self._cb_solution[vars.index]
+        elif isinstance(vars, dict):
+            return {k: self._cb_solution[v.index] for k, v in vars.items()}
+        else:
+            return [self._cb_solution[v.index] for v in vars]
+
+    # Only the objective and bound of a MIPSOL solution are available.  The solution is optimal for the current
+    # constraints, so its objective is also a bound for the whole problem.
+    def cbGet(self, what: int) -> float:
+        if self._cb_solution is None:
+            raise Exception("cbGet called outside of a MIPSOL callback")
+        if what == GRB.Callback.MIPSOL_OBJ:
+            return self.ObjVal
+        elif what == GRB.Callback.MIPSOL_OBJBND:
+            return self.ObjBound
+        raise ValueError(f"unsupported callback query: {what}")
+
+    def cbLazy(self, constr: TempConstr):
+        if self._lazy is None:
+            raise Exception("cbLazy called outside of a MIPSOL callback")
+        self._lazy.append(constr)
+
+    def optimize(self, callback: Callable[['Model', int], None] = None):
+        start = time.perf_counter()
+        self._terminated = False
+        added = []
+        if any(v.Start is not None and v.Start != GRB.UNDEFINED for v in self._vars):
+            logging.debug("ignoring the MIP start, which HiGHS can't use")
+        while True:
+            if callback is not None:
+                callback(self, GRB.Callback.MIP)
+                if self._terminated:
+                    self.Status = GRB.INTERRUPTED
+                    break
+
+            self._solve(self.params["TimeLimit"] - (time.perf_counter() - start))
+            if callback is None or self.Status != GRB.OPTIMAL:
+                break
+
+            self._cb_solution = [v.X for v in self._vars]
+            self._lazy = []
+            try:
+                callback(self, GRB.Callback.MIPSOL)
+                lazy = self._lazy
+            finally:
+                self._cb_solution = None
+                self._lazy = None
+
+            if self._terminated:
+                self.Status = GRB.INTERRUPTED
+                break
+            if not lazy:
+                break
+            if not self.params["LazyConstraints"]:
+                raise Exception("cbLazy requires the LazyConstraints parameter to be set")
+            logging.debug(f"re-solving with {len(lazy)} lazy constraint(s)")
+            added.extend(self.addConstr(c) for c in lazy)
+
+        # Like Gurobi's, lazy constraints only last for one call
+        self.remove(added)
+        self.Runtime = time.perf_counter() - start
+
+    def _solve(self, time_limit: float):
+        n = len(self._vars)
+        c = np.zeros(n)
+        for i, a in self._objective.coeffs.items():
+            c[i] = a
+        c *= self._sense
+
+        lb = np.array([-np.inf if v.lb <= -GRB.INFINITY else v.lb for v in self._vars], dtype=float)
+        ub = np.array([np.inf if v.ub >= GRB.INFINITY else v.ub for v in self._vars], dtype=float)
+        integrality = np.array([v.vtype != GRB.CONTINUOUS for v in self._vars], dtype=np.uint8)
+        binary = np.array([v.vtype == GRB.BINARY for v in self._vars], dtype=bool)
+        lb[binary] = np.maximum(lb[binary], 0)
+        ub[binary] = np.minimum(ub[binary], 1)
+
+        constraints = []
+        if self._constrs:
+            constrs = list(self._constrs.values())
+            rows = np.repeat(np.arange(len(constrs)), [len(con.coeffs) for con in constrs])
+            cols = np.fromiter((i for con in constrs for i in con.coeffs), dtype=np.intp, count=len(rows))
+            vals = np.fromiter((a for con in constrs for a in con.coeffs.values()), dtype=float, count=len(rows))
+            rhs = np.array([con.RHS for con in constrs], dtype=float)
+            sense = np.array([con.sense for con in constrs])
+            A = csr_array((vals, (rows, cols)), shape=(len(constrs), n))
+            row_lb = np.where(sense == GRB.LESS_EQUAL, -np.inf, rhs)
+            row_ub = np.where(sense == GRB.GREATER_EQUAL, np.inf, rhs)
+            constraints.append(LinearConstraint(A, row_lb, row_ub))
+
+        options = {
+            "disp": bool(self.params["OutputFlag"]),
+            "mip_rel_gap": self.params["MIPGap"],
+        }
+        if math.isfinite(time_limit):
+            options["time_limit"] = max(time_limit, 0)
+
+        if n == 0:
+            self._set_solution(np.zeros(0))
+            self.Status = GRB.OPTIMAL
+            return
+
+        res = milp(c, integrality=integrality, bounds=Bounds(lb, ub), constraints=constraints, options=options)
+        if res.status == 0:
+            self.Status = GRB.OPTIMAL
+        elif res.status == 1:
+            self.Status = GRB.TIME_LIMIT
+        elif res.status == 2:
+            self.Status = GRB.INFEASIBLE
+        elif res.status == 3:
+            self.Status = GRB.UNBOUNDED
+        else:
+            raise Exception("unexpected HiGHS status", res.status, res.message)
+
+        if res.x is not None:
+            self._set_solution(res.x)
+            # There is no MIP bound when every variable is continuous
+            bound = getattr(res, "mip_dual_bound", None)
+            self.ObjBound = self._sense * (res.fun if bound is None else bound) + self._objective.constant
+        else:
+            self.SolCount = 0
+            for v in self._vars:
+                v.X = None
+
+    def _set_solution(self, x: np.ndarray):
+        for v, val in zip(self._vars, x):
+            v.X = float(val)
+        self.SolCount = 1
+        self.ObjVal = float(sum(a * x[i] for i, a in self._objective.coeffs.items())) + self._objective.constant
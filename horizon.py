@@ -0,0 +1,100 @@
+from typing import *
+
+from common import Data, total_affinity, total_points
+
+# Smallest horizon tried when nothing better is known.
+FIRST_HORIZON = 4
+
+
+# A lower bound on the number of turns needed to complete `target_constellations`, or `None` if they can never be
+# the final set of constellations.  Ignoring the point limit, the set of constellations that can be active after
+# `t` turns is largest if every constellation that can be completed is completed on every turn, so no path can
+# complete a constellation earlier than that.
+def turn_lower_bound(data: Data, target_constellations: Iterable[str], num_points: int) -> Optional[int]:
+    target_constellations = set(target_constellations)
+    if total_points(data, target_constellations) > num_points:
+        return None
+
+    affinity = total_affinity(data, target_constellations)
+    for c in target_constellations:
+        if c in data.self_sufficient_constellations:
+            continue
+        if any(d > affinity[a] for a, d in data.affinity_req[c].items()):
+            return None
+
+    level = {}
+    active = set()
+    turns = 0
+    while not target_constellations <= active:
+        affinity = total_affinity(data, active)
+        added = {
+            c for c in data.constellations
+            if c not in active and all(d <= affinity[a] for a, d in data.affinity_req[c].items())
+        }
+        if not added:
+            return None
+        turns += 1
+        level.update((c, turns) for c in added)
+        active |= added
+
+    return max((level[c] for c in target_constellations), default=0)
+
+
+# Number of non-empty sets of constellations using at most `num_points` points, saturating at `limit`.
+def _count_sets(data: Data, num_points: int, limit: int) -> int:
+    # ways[p] = number of sets of constellations using exactly p points
+    ways = [1] + [0] * num_points
+    for stars in data.constellations.values():
+        cost = len(stars)
+        for p in reversed(range(cost, num_points + 1)):
+            ways[p] = min(ways[p] + ways[p - cost], limit)
+    return min(sum(ways) - 1, limit)
+
+
+# The largest horizon worth searching: `max_horizon` (`Config.max_horizon`), the longest path considered at all, or
+# less if fewer turns are enough for any path.  A final set with no path within this many turns is treated as
+# unreachable.
+#
+# Every turn of a shortest path ends with a different, non-empty set of active constellations (otherwise the turns
+# in between could be skipped), and the set can never use more than `num_points`, so the number of such sets bounds
+# the turns needed.  That only beats the usual `max_horizon` for a handful of points; beyond that the cap is a
+# limit on the paths considered rather than a bound on the paths that exist.
+def turn_upper_bound(data: Data, num_points: int, max_horizon: int) -> int:
+    return _count_sets(data, num_points, max_horizon)
+
+
+# Galloping search for a horizon that admits a solution.  `check(h)` solves the model with a horizon of `h` turns
+# and returns `None` if it is infeasible, otherwise the number of turns the solution actually used.  `infeasible`
+# is the largest horizon already known to be infeasible and `upper` the largest horizon worth trying.
+#
+# The horizon doubles until a solution is found, and that solution's turn count is the new upper limit.  If
+# `minimal` is set, a binary search then finds the smallest feasible horizon.  Returns `None` if the model is
+# infeasible at `upper`.
+def search_horizon(check: Callable[[int], Optional[int]], infeasible: int, upper: int,
+                   minimal: bool = False) -> Optional[int]:
+    if infeasible >= upper:
+        return None
+
+    feasible = None
+    h = max(infeasible + 1, FIRST_HORIZON)
+    while feasible is None:
+        h = min(h, upper)
+        used = check(h)
+        if used is not None:
+            feasible = used
+        elif h >= upper:
+            return None
+        else:
+            infeasible = h
+            h *= 2
+
+    if minimal:
+        while feasible - infeasible > 1:
+            h = (infeasible + feasible) // 2
+            used = check(h)
+            if used is None:
+                infeasible = h
+            else:
+                feasible = used
+
+    return feasible
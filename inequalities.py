@@ -0,0 +1,101 @@
+import math
+from typing import *
+
+from common import Config, Data, Star, cache_per_data
+
+
+# The ancestors of every star which has a predecessor, nearest first.
+@cache_per_data
+def star_ancestors(data: Data) -> Dict[Star, List[Star]]:
+    ancestors = {}
+    for s in data.predecessor:
+        chain = []
+        p = data.predecessor.get(s)
+        while p is not None:
+            chain.append(p)
+            p = data.predecessor.get(p)
+        ancestors[s] = chain
+    return ancestors
+
+
+# min_affinity_points(data)[a][k] is the fewest points of constellations which together give at least `k` of affinity
+# `a`, for every `k` up to the largest requirement for `a` (`math.inf` if it can't be done).
+@cache_per_data
+def min_affinity_points(data: Data) -> Dict[str, List[float]]:
+    table = {}
+    for a in data.affinities:
+        most = max((req.get(a, 0) for req in data.affinity_req.values()), default=0)
+        best = [0] + [math.inf] * most
+        for c, stars in data.constellations.items():
+            bonus = data.affinity_bonus[c].get(a, 0)
+            if bonus <= 0:
+                continue
+            for k in reversed(range(1, most + 1)):
+                best[k] = min(best[k], best[max(0, k - bonus)] + len(stars))
+        table[a] = best
+    return table
+
+
+# A lower bound on the points of a set of constellations meeting `req`.
+def affinity_points_bound(data: Data, req: Dict[str, int]) -> float:
+    table = min_affinity_points(data)
+    return max((table[a][d] for a, d in req.items() if d > 0), default=0)
+
+
+# The inequalities of `valid_inequalities` which depend on the number of points, kept apart so they can be replaced
+# when it changes.
+def budget_inequalities(gp, model, data: Data, num_points: int, X: Dict[Star, Any], Y: Dict[str, Any]) -> Dict:
+    return {
+        'never_completed': {
+            c: model.addConstr(Y[c] == 0)
+            for c in Y
+            if affinity_points_bound(data, data.affinity_req[c]) + len(data.constellations[c]) > num_points
+        },
+        'never_taken': {
+            s: model.addConstr(X[s] == 0)
+            for s in X
+            if affinity_points_bound(data, data.affinity_req[s.cons]) + 1 > num_points
+        },
+    }
+
+
+# Inequalities which hold for every reachable final set, added to the master problem up front to tighten its LP
+# relaxation.  `X` and `Y` are the master problem's star and constellation variables, which may cover only part of
+# the data (see `presolve`).
+#
+# - `never_completed`/`never_taken`: a constellation can only be completed if its requirements can be met by
+#   constellations using the points left over, and a star can only be taken if they can be met with one point
+#   less than the limit.
+# - `affinity_cover`: a constellation which isn't self-sufficient must be covered by the other final
+#   constellations for the part of its requirement it doesn't give itself, since the requirements are checked at
+#   the end of every turn.  Coefficients are capped at the deficit, which keeps the inequality valid.
+# - `star_affinity_cover`: the same capping applied to the requirement of the first stars of each constellation.
+def valid_inequalities(gp, model, data: Data, config: Config, X: Dict[Star, Any], Y: Dict[str, Any]) -> Dict:
+    constraints = budget_inequalities(gp, model, data, config.num_points, X, Y)
+
+    constraints['affinity_cover'] = {}
+    for c in Y:
+        if c in data.self_sufficient_constellations:
+            continue
+        for a, amount in data.affinity_req[c].items():
+            deficit = amount - data.affinity_bonus[c].get(a, 0)
+            if deficit <= 0:
+                continue
+            cover = gp.quicksum(
+                min(data.affinity_bonus[d].get(a, 0), deficit) * Y[d]
+                for d in Y if d != c and data.affinity_bonus[d].get(a, 0) > 0
+            )
+            constraints['affinity_cover'][c, a] = model.addConstr(deficit * Y[c] <= cover)
+
+    constraints['star_affinity_cover'] = {}
+    for s in X:
+        if s in data.predecessor:
+            continue
+        for a, amount in data.affinity_req[s.cons].items():
+            cover = gp.quicksum(
+                min(data.affinity_bonus[d].get(a, 0), amount) * Y[d]
+                for d in Y if data.affinity_bonus[d].get(a, 0) > 0
+            )
+            constraints['star_affinity_cover'][s, a] = model.addConstr(amount * X[s] <= cover)
+
+    return constraints
@@ -2,11 +2,14 @@
 import argparse
 import json
 import re
-from prettytable import PrettyTable, PLAIN_COLUMNS
 from grim_dawn_data import WEAPON_TYPES
 from common import *
 
-def output_table(args, table: PrettyTable):
+def new_table() -> 'PrettyTable':
+    from prettytable import PrettyTable
+    return PrettyTable()
+
+def output_table(args, table: 'PrettyTable'):
     # table.set_style(PLAIN_COLUMNS)
     table.sortby = None
 
@@ -21,7 +24,7 @@ def bonus(args):
     selected_bonuses = get_bonus_kinds_by_patterns(data, args.pattern)
     selected_bonuses.sort(key=bonus_kind_lex_key)
 
-    table = PrettyTable()
+    table = new_table()
     table.field_names = ["Bonus", "Description", "Value"]
     table.align = "l"
     table.align['Value'] = "c"
@@ -32,10 +35,10 @@ def bonus(args):
 
 def constellation(args):
     data = Data.load()
-    selected_constellations = filter_strings(data.constellations, args.pattern)
+    selected_constellations = get_constellations_by_patterns(data, args.pattern)
     selected_constellations.sort()
 
-    table = PrettyTable()
+    table = new_table()
 
     table.field_names = ["Constellation", "Stars", "Affinity Req.", "Affinity Bonus"]
     table.align["Constellation"] = "l"
@@ -47,11 +50,9 @@ def constellation(args):
 
 def constellation_stars(args):
     data = Data.load()
-    selected_constellations = filter_strings(data.constellations, args.pattern)
+    selected_constellations = get_constellations_by_patterns(data, args.pattern)
     selected_constellations.sort()
 
-    table = PrettyTable()
-
     if args.json:
         jsondata = []
         for c in selected_constellations:
@@ -66,6 +67,7 @@ def constellation_stars(args):
                 jsondata.append(d)
         print(json.dumps(jsondata, indent='  '))
     else:
+        table = new_table()
         table.field_names = ["Star", "Bonuses"]
         table.align["Constellation"] = "l"
         for c in selected_constellations:
@@ -86,12 +88,47 @@ def constellation_stars(args):
         output_table(args, table)
 
 
+def bonus_stars(args):
+    data = Data.load()
+    index = data_index(data)
+    # Bonus kinds may be given exactly, or matched by their description like `bonus`
+    kinds = []
+    for pattern in args.pattern:
+        kinds.extend([pattern] if pattern in index.bonus_stars else get_bonus_kinds_by_patterns(data, [pattern]))
+    kinds = sorted(set(kinds), key=bonus_kind_lex_key)
+
+    table = new_table()
+    table.field_names = ["Bonus", "Star", "Value", "Weapons"]
+    table.align = "l"
+    table.align['Value'] = "r"
+    for k in kinds:
+        for s, value in index.bonus_stars.get(k, []):
+            table.add_row([k, f"{s.cons} {s.idx}", fmt_val(value), ", ".join(sorted(data.weapon_req.get(s, ())))])
+
+    output_table(args, table)
+
+def affinity_constellations(args):
+    data = Data.load()
+    index = data_index(data)
+    affinities = filter_strings(data.affinities, args.pattern)
+
+    table = new_table()
+    table.field_names = ["Affinity", "Constellation", "Bonus", "Stars"]
+    table.align = "l"
+    table.align['Bonus'] = "r"
+    table.align['Stars'] = "r"
+    for a in affinities:
+        for c, amount in index.affinity_constellations[a]:
+            table.add_row([a, c, amount, len(data.constellations[c])])
+
+    output_table(args, table)
+
 def celestial_powers(args):
     data = Data.load()
     powers = get_powers_by_patterns(data, args.pattern)
     powers.sort()
 
-    table = PrettyTable()
+    table = new_table()
     table.field_names = ["Power", "Star"]
     table.align = "l"
     for star, p in powers:
@@ -100,7 +137,7 @@ def celestial_powers(args):
     output_table(args, table)
 
 def weapon_types(args):
-    table = PrettyTable()
+    table = new_table()
     table.field_names = ["Type", "Description"]
     table.align = "l"
     for t, desc in WEAPON_TYPES.items():
@@ -132,6 +169,15 @@ if __name__ == '__main__':
     add_common_args(stars)
     stars.set_defaults(func=constellation_stars)
 
+    givers = sp.add_parser("givers", aliases=["g"],
+                           help="Stars giving a bonus (by kind, e.g. DamageModifier.Aether, or description), best first")
+    add_common_args(givers)
+    givers.set_defaults(func=bonus_stars)
+
+    aff = sp.add_parser("affinity", aliases=["a"], help="Constellations giving an affinity, most first")
+    add_common_args(aff)
+    aff.set_defaults(func=affinity_constellations)
+
     powers = sp.add_parser("powers", aliases=["p"], help="List Celestial Powers")
     add_common_args(powers)
     powers.set_defaults(func=celestial_powers)
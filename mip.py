@@ -0,0 +1,767 @@
+import contextlib
+import dataclasses
+import itertools
+import logging
+import os
+import time
+
+from backend import get_backend
+from common import *
+from cutpool import CutPool
+from feasibility import FeasibilityOracle, Turn, path_actions
+from heuristic import solve_heuristic
+from horizon import search_horizon, turn_lower_bound, turn_upper_bound
+from inequalities import budget_inequalities, valid_inequalities
+from objective import objective_matrix
+from presolve import Presolve, fill_points, presolve
+from separation import Separator
+
+
+class Subproblem:
+    def __init__(self, data: Data, config: Config, target_constellations: Set[str], turns: int, env: 'Env' = None):
+        self.gp = gp = get_backend(config.backend)
+        with contextlib.redirect_stdout(open(os.devnull, 'w')):
+            model = gp.Model(env=env)
+        if config.log_level > logging.DEBUG:
+            model.setParam('OutputFlag', 0)
+
+        self.turns = range(0)
+        self.fixed_num_refunds = None
+        self.data = data
+        self.config = config
+        self.target_constellations = set(target_constellations)
+        # If set, only the target constellations are required at the end and the others are left free
+        self.superset = False
+        self.constraints = {
+            "affinity_req_pick": {},
+            "affinity_req_unpick": {},
+            "calc_Q": {},
+            "inventory": {},
+            "calc_P": {},
+            "max_points": {},
+            "antisymmetry": {},
+            "link_wz": {},
+            "must_add_something": {},
+            "final_Y": {},
+        }
+        # Amount of each affinity we have the end of turn t
+        self.Q = gp.tupledict()
+        # Amount of points we've used have the end of turn t
+        self.P = gp.tupledict()
+        # Is constellation c active at the end of turn t?
+        self.Y = gp.tupledict()
+        # Do we pick (p=1) or unpick (p=-1) constellation c on turn t?
+        self.Z = gp.tupledict()
+        # Do we pick anything on turn t?
+        self.W = gp.tupledict()
+        self.model = model
+        self.extend(turns)
+
+    # Grow the horizon to `turns`, adding only the variables and constraints for the new turns.  If the model has
+    # a solution, it is kept as a MIP start, with the new turns left idle.
+    def extend(self, turns: int):
+        if turns <= len(self.turns):
+            return
+
+        gp = self.gp
+        data = self.data
+        model = self.model
+        Q, P, Y, Z, W = self.Q, self.P, self.Y, self.Z, self.W
+        constraints = self.constraints
+        old_turns = self.turns
+        new_turns = range(len(old_turns), turns)
+        last = old_turns[-1] if old_turns else None
+
+        start = None
+        if old_turns and model.SolCount > 0:
+            old_vars = model.getVars()
+            model.setAttr('Start', old_vars, model.getAttr('X', old_vars))
+            start = {
+                "Q": {a: Q[a, last].X for a in data.affinities},
+                "P": P[last].X,
+                "Y": {c: Y[c, last].X for c in data.constellations},
+            }
+
+        Q.update(model.addVars(data.affinities, new_turns, name="Q"))
+        P.update(model.addVars(new_turns, name="P", ub=self.config.num_points))
+        Y.update(model.addVars(data.constellations, new_turns, vtype=gp.GRB.BINARY, name="Y"))
+        Z.update(model.addVars(data.constellations, [1, -1], new_turns, vtype=gp.GRB.BINARY, name="Z"))
+        W.update(model.addVars(new_turns, vtype=gp.GRB.BINARY, name="W"))
+
+        constraints["affinity_req_pick"].update({
+            (c, t, a): model.addConstr(Z[c, 1, t] * d <= (0 if t == 0 else Q[a, t - 1]))
+            for t in new_turns
+            for c in data.constellations
+            for a, d in data.affinity_req[c].items()
+        })
+        constraints["affinity_req_unpick"].update({
+            (c, t, a): model.addConstr(Y[c, t] * d <= Q[a, t])
+            for t in new_turns
+            for c in data.constellations if c not in data.self_sufficient_constellations
+            for a, d in data.affinity_req[c].items()
+        })
+
+        constraints["calc_Q"].update({
+            (t, a): model.addConstr(
+                Q[a, t] == gp.quicksum(Y[c, t] * data.affinity_bonus[c].get(a, 0) for c in data.constellations))
+            for t in new_turns
+            for a in data.affinities
+        })
+
+        constraints["inventory"].update({
+            (c, t): model.addConstr(
+                Y[c, t] == (Y[c, t - 1] if t > 0 else 0) + Z[c, 1, t] - Z[c, -1, t]
+            )
+            for c in data.constellations
+            for t in new_turns
+        })
+
+        constraints["calc_P"].update({
+            t: model.addConstr(
+                P[t] == gp.quicksum(len(stars) * Y[c, t] for c, stars in data.constellations.items())
+            )
+            for t in new_turns
+        })
+
+        constraints["max_points"].update({
+            t: model.addConstr(
+                (P[t - 1] if t > 0 else 0) + gp.quicksum(
+                    len(stars) * Z[c, 1, t] for c, stars in data.constellations.items()) <= self.config.num_points
+            )
+            for t in new_turns
+        })
+
+        constraints["antisymmetry"].update({
+            t: model.addConstr(W[t] <= W[t - 1])
+            for t in new_turns if t > 0
+        })
+
+        constraints["link_wz"].update({
+            (c, t): model.addConstr(Z[c, 1, t] + Z[c, -1, t] <= W[t])
+            for t in new_turns
+            for c in data.constellations
+        })
+
+        constraints["must_add_something"].update({
+            t: model.addConstr(gp.quicksum(Z[c, 1, t] for c in data.constellations) >= W[t])
+            for t in new_turns
+        })
+
+        self.turns = range(turns)
+        self._set_final_Y()
+
+        if "fix_num_refunds" in constraints:
+            n = self.fixed_num_refunds
+            self.unfix_num_refunds()
+            self.fix_num_refunds(n)
+
+        if start is not None:
+            for t in new_turns:
+                W[t].Start = 0
+                P[t].Start = start["P"]
+                for a in data.affinities:
+                    Q[a, t].Start = start["Q"][a]
+                for c in data.constellations:
+                    Y[c, t].Start = start["Y"][c]
+                    Z[c, 1, t].Start = 0
+                    Z[c, -1, t].Start = 0
+
+    def _set_final_Y(self):
+        model = self.model
+        last = self.turns[-1]
+        model.remove(list(self.constraints["final_Y"].values()))
+        self.constraints["final_Y"] = {
+            c: model.addConstr(self.Y[c, last] == int(c in self.target_constellations))
+            for c in (self.target_constellations if self.superset else self.data.constellations)
+        }
+
+    # Only require `constellations` to be active at the end, rather than exactly `target_constellations`.
+    def require_final(self, constellations: AbstractSet[str]):
+        self.target_constellations = set(constellations)
+        self.superset = True
+        self._set_final_Y()
+
+    # Only allow the first `turns` turns to be used, growing the model if needed.
+    def limit_turns(self, turns: int):
+        self.extend(turns)
+        for t in self.turns:
+            self.W[t].ub = 1 if t < turns else 0
+
+    def is_feasible(self) -> bool:
+        self.model.optimize()
+        status = self.model.Status
+        if status == self.gp.GRB.OPTIMAL:
+            return True
+        elif status == self.gp.GRB.INFEASIBLE:
+            return False
+        else:
+            raise Exception("unexpected GRB status", status)
+
+    def _sum_refunds(self) -> 'LinExpr':
+        return self.gp.quicksum(
+            self.Z[c, -1, t] * len(stars) for c, stars in self.data.constellations.items() for t in self.turns)
+
+    def minimise_refunds(self) -> Optional[int]:
+        logging.info(f"minimise refunds (max turns = {len(self.turns)})")
+        self.model.setObjective(self._sum_refunds(), self.gp.GRB.MINIMIZE)
+        self.model.optimize()
+        if self.model.Status == self.gp.GRB.INFEASIBLE:
+            return None
+        elif self.model.Status == self.gp.GRB.OPTIMAL:
+            return round(self.model.ObjVal)
+        else:
+            raise Exception("unexpected GRB status", self.model.Status)
+
+    def fix_num_refunds(self, n: int) -> 'Constr':
+        try:
+            return self.constraints["fix_num_refunds"]
+        except KeyError:
+            c = self.model.addConstr(self._sum_refunds() == n)
+            self.constraints["fix_num_refunds"] = c
+            self.fixed_num_refunds = n
+            return c
+
+    def unfix_num_refunds(self):
+        try:
+            c = self.constraints.pop("fix_num_refunds")
+        except KeyError:
+            return
+        self.fixed_num_refunds = None
+        self.model.remove(c)
+
+    def minimise_turns(self) -> int:
+        logging.info(f"minimise turns (max turns = {len(self.turns)})")
+        self.model.setObjective(self.W.sum(), self.gp.GRB.MINIMIZE)
+        self.model.optimize()
+        return round(self.model.ObjVal)
+
+    def get_turns(self) -> List[Turn]:
+        turns = []
+        for t in self.turns:
+            if self.W[t].x > .9:
+                added = frozenset(c for c in self.data.constellations if self.Z[c, 1, t].x > .9)
+                removed = frozenset(c for c in self.data.constellations if self.Z[c, -1, t].x > .9)
+                turns.append((added, removed))
+        return turns
+
+    def get_solution(self) -> List:
+        return path_actions(self.data, self.get_turns())
+
+
+# Search for a horizon in which `target_constellations` can be reached.  Returns the horizon (the smallest one, if
+# `minimal` is set) and a Subproblem limited to it, or `None` if the target is unreachable.  If a `pool` is given,
+# the horizons are raced against each other on it instead, and the Subproblem is only built on request.  If the
+# target is shown to be unreachable by solving a Subproblem at the largest horizon, that Subproblem is appended to
+# `proofs`, if given.
+def find_horizon(data: Data, config: Config, target_constellations: Set[str], oracle: FeasibilityOracle,
+                 minimal: bool = False, pool: 'HorizonPool' = None,
+                 proofs: List[Subproblem] = None) -> Optional[Tuple[int, Subproblem]]:
+    known = oracle.lookup(target_constellations, config.num_points)
+    if known.feasible is False:
+        return None
+
+    lower = turn_lower_bound(data, target_constellations, config.num_points)
+    upper = turn_upper_bound(data, config.num_points, config.max_horizon)
+    if lower is None:
+        logging.info("target can never be completed")
+        oracle.record_infeasible(target_constellations, config.num_points, upper, final=True)
+        return None
+
+    infeasible = max(lower - 1, known.infeasible_horizon)
+    if pool is not None:
+        horizon = pool.search_horizon(config, target_constellations, oracle, infeasible, upper, minimal=minimal)
+        return None if horizon is None else (horizon, None)
+
+    sp = None
+
+    def check(turns: int) -> Optional[int]:
+        nonlocal sp
+        if sp is None:
+            sp = Subproblem(data, config, target_constellations, turns)
+        sp.limit_turns(turns)
+        if sp.is_feasible():
+            logging.info(f"feasible with {turns} turns")
+            witness = sp.get_turns()
+            oracle.record_feasible(target_constellations, config.num_points, witness)
+            return len(witness)
+        else:
+            logging.warning(f"infeasible with {turns} turns")
+            oracle.record_infeasible(target_constellations, config.num_points, turns, final=turns >= upper)
+            if turns >= upper and proofs is not None:
+                proofs.append(sp)
+            return None
+
+    horizon = search_horizon(check, infeasible, upper, minimal=minimal)
+    if horizon is None:
+        return None
+    if sp is None:
+        sp = Subproblem(data, config, target_constellations, horizon)
+    sp.limit_turns(horizon)
+    return horizon, sp
+
+
+def solve_final_constellation_path(data: Data, config: Config, constellations: Set[str],
+                                   oracle: FeasibilityOracle = None, pool: 'HorizonPool' = None):
+    oracle = oracle or FeasibilityOracle(data)
+    found = find_horizon(data, config, constellations, oracle, minimal=True, pool=pool)
+    if found is None:
+        return None
+    turns, sp = found
+    upper = turn_upper_bound(data, config.num_points, config.max_horizon)
+
+    if pool is not None:
+        horizons = [turns]
+        while horizons[-1] < upper:
+            horizons.append(min(2 * horizons[-1], upper))
+        turns, num_refunds = pool.stable_refunds(config, constellations, horizons)
+        sp = Subproblem(data, config, constellations, turns)
+        sp.fix_num_refunds(num_refunds)
+        sp.minimise_turns()
+        return sp.get_solution()
+
+    # Longer horizons may allow fewer refunds.  Keep doubling until the number of refunds stops improving.
+    num_prev_refunds = None
+    while True:
+        sp.limit_turns(turns)
+        num_refunds = sp.minimise_refunds()
+        if num_refunds == num_prev_refunds or turns >= upper:
+            sp.fix_num_refunds(num_refunds)
+            sp.minimise_turns()
+            return sp.get_solution()
+
+        num_prev_refunds = num_refunds
+        turns = min(2 * turns, upper)
+
+
+def is_reachable(data: Data, config: Config, target_constellations: Set[str], oracle: FeasibilityOracle,
+                 pool: 'HorizonPool' = None, proofs: List[Subproblem] = None) -> bool:
+    known = oracle.lookup(target_constellations, config.num_points)
+    if known.feasible is not None:
+        logging.info(f"cached verdict: feasible = {known.feasible}")
+        return known.feasible
+    return find_horizon(data, config, target_constellations, oracle, pool=pool, proofs=proofs) is not None
+
+
+# Shrink `target_constellations`, which has no path within `horizon` turns, to a minimal core: a subset which no
+# final set reachable within `horizon` turns contains.  The core is found with an IIS of the `final_Y` constraints
+# where the backend supports it, otherwise with a deletion filter, on `sp` if given (the Subproblem which showed the
+# target unreachable, limited to `horizon`) rather than a new one.  If some superset of the target is reachable, the
+# target itself is returned.
+def unreachable_core(data: Data, config: Config, target_constellations: Set[str], horizon: int,
+                     sp: Subproblem = None) -> FrozenSet[str]:
+    if sp is None:
+        sp = Subproblem(data, config, target_constellations, horizon)
+    sp.limit_turns(horizon)
+    sp.require_final(target_constellations)
+    if sp.is_feasible():
+        return frozenset(target_constellations)
+
+    model = sp.model
+    if hasattr(model, "computeIIS"):
+        constrs = model.getConstrs()
+        model.setAttr("IISConstrForce", constrs, [1] * len(constrs))
+        final = sp.constraints["final_Y"]
+        model.setAttr("IISConstrForce", list(final.values()), [-1] * len(final))
+        variables = model.getVars()
+        model.setAttr("IISLBForce", variables, [1] * len(variables))
+        model.setAttr("IISUBForce", variables, [1] * len(variables))
+        model.computeIIS()
+        return frozenset(c for c, constr in final.items() if constr.IISConstr)
+
+    core = set(target_constellations)
+    for c in sorted(target_constellations):
+        sp.require_final(core - {c})
+        if not sp.is_feasible():
+            core.discard(c)
+    return frozenset(core)
+
+
+@dataclasses.dataclass
+class Incumbent:
+    objective: float
+    # Best bound on the objective when found, if known
+    bound: Optional[float]
+    stars: List[Star]
+    final_constellations: List[str]
+
+
+# The chosen stars and completed constellations of a master problem solution, from the values `x` of its star
+# variables and `y` of its constellation variables.
+def _master_solution(data: Data, config: Config, pre: Presolve, x: Dict[Star, float],
+                     y: Dict[str, float]) -> Tuple[List[Star], List[str]]:
+    chosen_stars = [s for s, val in x.items() if val > .9]
+    chosen_stars.extend(s for c in pre.bundled if y[c] > .9 for s in data.constellations[c])
+    chosen_stars.sort()
+
+    chosen = set(chosen_stars)
+    final_constellations = []
+    for c, stars in data.constellations.items():
+        if c in y and y[c] > .9:
+            final_constellations.append(c)
+        elif all(s in chosen for s in stars):
+            final_constellations.append(c)
+
+    if not pre.complete:
+        chosen_stars = fill_points(data, config, chosen_stars, final_constellations)
+    return chosen_stars, final_constellations
+
+
+# Keep `incumbent` if it improves on the best reachable solution so far, and pass it on to `model._on_incumbent`.
+def _update_incumbent(model: 'Model', incumbent: Incumbent):
+    if model._incumbent is not None and incumbent.objective <= model._incumbent.objective + 1e-6:
+        return
+    model._incumbent = incumbent
+    if model._on_incumbent is not None:
+        model._on_incumbent(incumbent)
+
+
+def grb_callback(model: 'Model', where: int):
+    gp = model._gp
+    if model._should_stop is not None and model._should_stop():
+        model.terminate()
+        return
+
+    if where == gp.GRB.Callback.MIPSOL:
+        data: Data = model._data
+        config: Config = model._config
+        Y = model._Y
+        Yv = model.cbGetSolution(model._Y)
+        target_constellations = {c for c, val in Yv.items() if val > .9}
+        logging.info(f"solving subproblem {target_constellations}", )
+        proofs = []
+        if not is_reachable(data, config, target_constellations, model._oracle, model._pool, proofs):
+            cut = target_constellations
+            # The core is only as final as the horizon it is found in, so it is only looked for within the horizon
+            # the target was proven unreachable in, and only used if that is the largest one.  A target ruled out by
+            # `turn_lower_bound` alone keeps the plain cut.
+            upper = turn_upper_bound(data, config.num_points, config.max_horizon)
+            known = model._oracle.lookup(target_constellations, config.num_points)
+            if config.shrink_cuts and len(target_constellations) > 1 and known.infeasible_horizon >= upper and (
+                    turn_lower_bound(data, target_constellations, config.num_points) is not None):
+                cut = unreachable_core(data, config, target_constellations, upper, proofs[-1] if proofs else None)
+                model._oracle.record_infeasible(cut, config.num_points, upper, final=True)
+            logging.warning(f"add cut on {len(cut)} of {len(target_constellations)} constellations")
+            if model._cuts is not None:
+                model._cuts.add(cut)
+            model._found_cuts.append(cut)
+            model.cbLazy(gp.quicksum(Y[c] for c in cut) <= len(cut) - 1)
+        else:
+            objective = model.cbGet(gp.GRB.Callback.MIPSOL_OBJ)
+            if model._incumbent is None or objective > model._incumbent.objective + 1e-6:
+                stars, final = _master_solution(data, config, model._pre, model.cbGetSolution(model._X), Yv)
+                bound = model.cbGet(gp.GRB.Callback.MIPSOL_OBJBND)
+                _update_incumbent(model, Incumbent(objective, bound, stars, final))
+
+    elif where == gp.GRB.Callback.MIPNODE and model._separator is not None:
+        if model.cbGet(gp.GRB.Callback.MIPNODE_STATUS) != gp.GRB.OPTIMAL:
+            return
+        x = model.cbGetNodeRel(model._X)
+        y = model.cbGetNodeRel(model._Y)
+        for cut in model._separator.separate(x, y):
+            model.cbCut(cut)
+
+
+class MasterProblem:
+    # The master problem: choose the best final set of stars, with lazy cuts for final constellations which can't be
+    # reached.  The model can be solved again after changing the number of points with `set_num_points` or the
+    # bonus weights with `set_objective`.
+    #
+    # Cuts are kept between solves as ordinary constraints, as are the verdicts in the oracle.  An unreachable set
+    # stays unreachable with fewer points but may become reachable with more, so the cuts are dropped (and reloaded
+    # from the cut pool) when the number of points goes up; sweeping downwards keeps them all.
+    def __init__(self, data: Data, config: Config, oracle: FeasibilityOracle = None, pool: 'HorizonPool' = None,
+                 env: 'Env' = None):
+        self.data = data
+        self.config = config = dataclasses.replace(config)
+        self.gp = gp = get_backend(config.backend)
+        force_stars = config.desired_stars.copy()
+        force_stars.update(data.celestial_power_stars[p] for p in config.celestial_powers)
+
+        with contextlib.redirect_stdout(open(os.devnull, 'w')):
+            self.model = model = gp.Model(env=env)
+        model._gp = gp
+        model._data = data
+        model._config = config
+        model._oracle = oracle or FeasibilityOracle(data)
+        model._pool = pool
+        model._cuts = None
+        model._found_cuts = []
+        model._incumbent = None
+        model._on_incumbent = None
+        model._should_stop = None
+        self.optimal = False
+        if config.log_level > logging.DEBUG:
+            model.setParam('OutputFlag', 0)
+        model.setParam('LazyConstraints', 1)
+        self.pre = pre = presolve(data, config)
+        model._pre = pre
+        logging.info(pre.summary(data))
+
+        # Amount of each affinity we have
+        Q = {a: model.addVar(name=f"Q[{a}]") for a in data.affinities}
+
+        # Do we take star s?
+        self.X = X = {s: model.addVar(vtype=gp.GRB.BINARY, name=f"X[{s.cons},{s.idx}]") for s in pre.stars}
+
+        for s in force_stars:
+            X[s].lb = 1
+
+        # do we finish constellation c?
+        self.Y = Y = {c: model.addVar(vtype=gp.GRB.BINARY, name=f"Y[{c}]") for c in pre.constellations}
+        model._X = X
+        model._Y = Y
+
+        self.constraints = constraints = {}
+        constraints['finish_constellation'] = {
+            s: model.addConstr(Y[s.cons] <= X[s])
+            for s in pre.stars if s.cons in Y
+        }
+
+        constraints['pred'] = {
+            (s1, s2): model.addConstr(X[s1] <= X[s2])
+            for s1, s2 in data.predecessor.items() if s1 in X
+        }
+
+        constraints['affinity_req'] = {
+            (s, a): model.addConstr(X[s] * amount <= Q[a])
+            for s in pre.stars
+            for a, amount in data.affinity_req[s.cons].items()
+        }
+        constraints['affinity_req'].update({
+            (c, a): model.addConstr(Y[c] * amount <= Q[a])
+            for c in pre.bundled
+            for a, amount in data.affinity_req[c].items()
+        })
+
+        constraints['affinity_bonus'] = {
+            a: model.addConstr(Q[a] == gp.quicksum(Y[c] * data.affinity_bonus[c].get(a, 0) for c in Y))
+            for a in data.affinities
+        }
+
+        constraints['dominated'] = {
+            (c, d): model.addConstr(Y[c] <= Y[d])
+            for c, d in pre.dominated
+        }
+
+        constraints.update(valid_inequalities(gp, model, data, config, X, Y))
+
+        # Only Gurobi calls back at MIP nodes
+        model._separator = None
+        if config.user_cuts and hasattr(model, "cbCut"):
+            model._separator = Separator(gp, data, config, X, Y)
+            model.setParam('PreCrush', 1)
+
+        points = gp.quicksum(X.values()) + gp.quicksum(len(data.constellations[c]) * Y[c] for c in pre.bundled)
+        if pre.complete:
+            constraints['num_points'] = model.addConstr(points == config.num_points)
+        else:
+            constraints['num_points'] = model.addConstr(points <= config.num_points)
+
+        constraints['learned_cuts'] = {}
+        self._load_cuts()
+
+        # Final sets later solutions must differ from, and by how many constellations (see `exclude`)
+        constraints['excluded'] = []
+        self.excluded: List[Tuple[FrozenSet[str], int]] = []
+        self._completed = {}
+
+        self.obj_coeff = calculate_star_objective(data, config)
+        model.setObjective(
+            gp.quicksum(X[s] * c for s, c in self.obj_coeff.items()
+        ), gp.GRB.MAXIMIZE)
+
+    # Cut off every final set in `cuts` that the model has variables for and doesn't cut off already.
+    def add_cuts(self, cuts: Iterable[FrozenSet[str]]):
+        learned = self.constraints['learned_cuts']
+        for cut in cuts:
+            cut = frozenset(cut)
+            if cut not in learned and cut <= self.Y.keys():
+                learned[cut] = self.model.addConstr(self.gp.quicksum(self.Y[c] for c in cut) <= len(cut) - 1)
+
+    # Final sets found unreachable by earlier runs
+    def _load_cuts(self):
+        model = self.model
+        num_points = self.config.num_points
+        model._cuts = CutPool(num_points, self.config.max_horizon) if self.config.cut_pool else None
+        if model._cuts is not None:
+            upper = turn_upper_bound(self.data, num_points, self.config.max_horizon)
+            for cut in model._cuts.sets:
+                model._oracle.record_infeasible(cut, num_points, upper, final=True)
+            self.add_cuts(model._cuts.sets)
+
+    # The final sets currently cut off
+    @property
+    def cuts(self) -> List[FrozenSet[str]]:
+        return list(self.constraints['learned_cuts'])
+
+    # Change the bonus weights, keeping the cuts.  Returns `False`, changing nothing, if presolve left out stars that
+    # would have value under `objective`; a new master problem is needed then.
+    def set_objective(self, objective: Dict[str, float]) -> bool:
+        config = dataclasses.replace(self.config, objective=dict(objective))
+        obj_coeff = objective_matrix(self.data).star_objective(config)
+        if not obj_coeff.keys() <= self.X.keys():
+            return False
+        self.config.objective = config.objective
+        self.obj_coeff = obj_coeff
+        self.model.setObjective(
+            self.gp.quicksum(self.X[s] * c for s, c in obj_coeff.items()
+        ), self.gp.GRB.MAXIMIZE)
+        return True
+
+    def set_num_points(self, num_points: int):
+        old = self.config.num_points
+        if num_points == old:
+            return
+        self.config.num_points = num_points
+        model = self.model
+        model.remove([c for name in ('never_completed', 'never_taken') for c in self.constraints[name].values()])
+        self.constraints.update(budget_inequalities(self.gp, model, self.data, num_points, self.X, self.Y))
+        self.constraints['num_points'].RHS = num_points
+        if model._separator is not None:
+            model._separator.num_points = num_points
+        if num_points > old:
+            model.remove(list(self.constraints['learned_cuts'].values()))
+            self.constraints['learned_cuts'] = {}
+        self._load_cuts()
+
+    # 1 if constellation `c` is completed: its variable if it has one, otherwise a new variable tied to its stars, or
+    # `None` if presolve removed some of them so it can never be completed.  Its variable is otherwise only bounded
+    # above by its stars, so it is also bounded below here: a cut on it mustn't be dodged by taking every star of `c`
+    # and leaving it at 0.
+    def completed(self, c: str) -> Optional['Var']:
+        try:
+            return self._completed[c]
+        except KeyError:
+            pass
+        gp, model = self.gp, self.model
+        stars = self.data.constellations[c]
+        var = self.Y.get(c)
+        if all(s in self.X for s in stars):
+            if var is None:
+                var = model.addVar(vtype=gp.GRB.BINARY, name=f"completed[{c}]")
+                for s in stars:
+                    model.addConstr(var <= self.X[s])
+            model.addConstr(var >= gp.quicksum(self.X[s] for s in stars) - (len(stars) - 1))
+        self._completed[c] = var
+        return var
+
+    # Require later solutions to complete a set of constellations differing from `final_constellations` in at least
+    # `min_difference` constellations (counting those completed in one but not the other).
+    def exclude(self, final_constellations: Iterable[str], min_difference: int = 1):
+        final = frozenset(final_constellations)
+        gp = self.gp
+        same = gp.quicksum(v for v in map(self.completed, final) if v is not None)
+        added = gp.quicksum(v for v in map(self.completed, self.data.constellations.keys() - final) if v is not None)
+        self.constraints['excluded'].append(self.model.addConstr(len(final) - same + added >= min_difference))
+        self.excluded.append((final, min_difference))
+
+    def _is_excluded(self, final_constellations: Iterable[str]) -> bool:
+        final = set(final_constellations)
+        return any(len(final ^ excluded) < d for excluded, d in self.excluded)
+
+    # Upper bound on the objective from the LP relaxation, with the cuts added so far.  Returns `None` if even the
+    # relaxation is infeasible, in which case so is the master problem.
+    def lp_bound(self) -> Optional[float]:
+        gp, model = self.gp, self.model
+        variables = [
+            var for var in itertools.chain(self.X.values(), self.Y.values(), self._completed.values())
+            if var is not None
+        ]
+        for var in variables:
+            var.vtype = gp.GRB.CONTINUOUS
+        try:
+            model.optimize()
+        finally:
+            for var in variables:
+                var.vtype = gp.GRB.BINARY
+        if model.status in (gp.GRB.INFEASIBLE, gp.GRB.INF_OR_UNBD):
+            return None
+        if model.status != gp.GRB.OPTIMAL:
+            return math.inf
+        return model.ObjVal
+
+    # Is `start` (chosen stars and completed constellations) a solution with the current settings whose final
+    # constellations are known to be reachable?  Returns its objective if so.
+    def _start_objective(self, start: Tuple[List[Star], List[str]]) -> Optional[float]:
+        stars, final = start
+        config = self.config
+        forced = config.desired_stars | {self.data.celestial_power_stars[p] for p in config.celestial_powers}
+        if len(set(stars)) > config.num_points or not forced <= set(stars) or self._is_excluded(final):
+            return None
+        affinity = total_affinity(self.data, final)
+        if any(d > affinity[a] for c in {s.cons for s in stars} - set(final)
+               for a, d in self.data.affinity_req[c].items()):
+            return None
+        if self.model._oracle.lookup(final, config.num_points).feasible is not True:
+            return None
+        return sum(self.obj_coeff.get(s, 0) for s in stars)
+
+    # Returns the chosen stars and the constellations which are completed, or `None` if the requirements can't be
+    # met.
+    #
+    # If given, `on_incumbent` is called with every improving solution whose final constellations are reachable.  With
+    # `config.time_limit`, the best such solution is returned once time runs out, and likewise as soon as
+    # `should_stop` returns `True` (it is polled from the solver's callback).  The heuristic which provides the
+    # starting solution starts from the final constellations `initial`, if given.  `start` is another starting
+    # solution, such as the previous solve's; the better of the two is used, if still valid.
+    def solve(self, on_incumbent: Callable[[Incumbent], None] = None, initial: Iterable[str] = (),
+              should_stop: Callable[[], bool] = None,
+              start: Tuple[List[Star], List[str]] = None) -> Optional[Tuple[List[Star], List[str]]]:
+        started = time.perf_counter()
+        data, config, model, gp = self.data, self.config, self.model, self.gp
+        model._incumbent = None
+        model._on_incumbent = on_incumbent
+        model._should_stop = should_stop
+        model._found_cuts = []
+
+        # The heuristic's path goes into the oracle, so its final set is accepted by the callback without more work
+        starts = [start] if start is not None else []
+        if config.mip_start:
+            time_limit = 1.0 if config.time_limit is None else min(1.0, config.time_limit / 2)
+            heuristic = solve_heuristic(data, config, model._oracle, time_limit, initial)
+            if heuristic is not None:
+                starts.append(heuristic)
+        start, objective = None, None
+        for candidate in starts:
+            value = self._start_objective(candidate)
+            if value is not None and (objective is None or value > objective):
+                start, objective = candidate, value
+        if start is not None:
+            start_stars, start_constellations = start
+            _update_incumbent(model, Incumbent(objective, None, start_stars, start_constellations))
+            start_stars, start_constellations = set(start_stars), set(start_constellations)
+            for s, var in self.X.items():
+                var.Start = 1 if s in start_stars else 0
+            for c, var in self.Y.items():
+                var.Start = 1 if c in start_constellations else 0
+        else:
+            for var in itertools.chain(self.X.values(), self.Y.values()):
+                var.Start = gp.GRB.UNDEFINED
+
+        if config.time_limit is not None:
+            model.setParam('TimeLimit', max(0, config.time_limit - (time.perf_counter() - started)))
+        model.optimize(grb_callback)
+        # Lazy constraints don't outlive the solve
+        self.add_cuts(model._found_cuts)
+
+        # Whether the solution returned is proven optimal, rather than the best found in time
+        self.optimal = model.status == gp.GRB.OPTIMAL
+        if model.status == gp.GRB.INFEASIBLE:
+            return None
+        if model._incumbent is None:
+            logging.warning("no solution found within the time limit")
+            return None
+        return model._incumbent.stars, model._incumbent.final_constellations
+
+    # The objective value of the last solution found
+    @property
+    def objective(self) -> Optional[float]:
+        incumbent = self.model._incumbent
+        return incumbent.objective if incumbent is not None else None
+
+
+# Find the best final set of stars.  Returns the chosen stars and the constellations which are completed, or `None`
+# if the requirements can't be met.  See `MasterProblem.solve` for `on_incumbent`.
+def solve_master(data: Data, config: Config, oracle: FeasibilityOracle = None, pool: 'HorizonPool' = None,
+                 on_incumbent: Callable[[Incumbent], None] = None) -> Optional[Tuple[List[Star], List[str]]]:
+    return MasterProblem(data, config, oracle, pool).solve(on_incumbent)
@@ -0,0 +1,78 @@
+import dataclasses
+from typing import *
+
+import numpy as np
+
+from common import Config, Data, Star, cache_per_data, star_contributions
+
+
+@dataclasses.dataclass
+class ObjectiveMatrix:
+    stars: List[Star]
+    star_index: Dict[Star, int]
+    kinds: List[str]
+    kind_index: Dict[str, int]
+    # matrix[i, j] is how much star i contributes to the objective per unit of weight on bonus kind j (see
+    # `common.star_contributions`).
+    matrix: np.ndarray
+    # Stars without a weapon requirement
+    unrestricted: np.ndarray
+    # weapon_mask[w][i] is True if star i's weapon requirement is met by weapon type w
+    weapon_mask: Dict[str, np.ndarray]
+
+    @staticmethod
+    def build(data: Data) -> 'ObjectiveMatrix':
+        stars = list(data.stars)
+        star_index = {s: i for i, s in enumerate(stars)}
+        contributions = list(star_contributions(data))
+
+        kinds = sorted({k for _, k, _ in contributions})
+        kind_index = {k: j for j, k in enumerate(kinds)}
+        matrix = np.zeros((len(stars), len(kinds)))
+        for s, k, val in contributions:
+            matrix[star_index[s], kind_index[k]] += val
+
+        unrestricted = np.array([s not in data.weapon_req for s in stars])
+        weapon_mask = {
+            w: np.array([w in data.weapon_req.get(s, ()) for s in stars])
+            for w in data.weapon_types
+        }
+
+        return ObjectiveMatrix(
+            stars=stars,
+            star_index=star_index,
+            kinds=kinds,
+            kind_index=kind_index,
+            matrix=matrix,
+            unrestricted=unrestricted,
+            weapon_mask=weapon_mask,
+        )
+
+    def weights(self, objective: Dict[str, float]) -> np.ndarray:
+        w = np.zeros(len(self.kinds))
+        for k, weight in objective.items():
+            try:
+                w[self.kind_index[k]] = weight
+            except KeyError:
+                pass
+        return w
+
+    def mask(self, weapons: Iterable[str]) -> np.ndarray:
+        mask = self.unrestricted.copy()
+        for w in weapons:
+            mask |= self.weapon_mask[w]
+        return mask
+
+    # Objective coefficient of every star, in the order of `self.stars`.
+    def star_values(self, config: Config) -> np.ndarray:
+        return (self.matrix @ self.weights(config.objective)) * self.mask(config.weapons)
+
+    def star_objective(self, config: Config) -> Dict[Star, float]:
+        values = self.star_values(config)
+        return {self.stars[i]: float(values[i]) for i in np.flatnonzero(values > 0)}
+
+
+# The matrix for `data`, built on first use.
+@cache_per_data
+def objective_matrix(data: Data) -> ObjectiveMatrix:
+    return ObjectiveMatrix.build(data)
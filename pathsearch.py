@@ -0,0 +1,236 @@
+import heapq
+import itertools
+import logging
+from fractions import Fraction
+from typing import *
+
+from common import Config, Data
+from feasibility import FeasibilityOracle, Turn, check_path, path_actions
+from horizon import turn_lower_bound
+
+# A search state is `(active, added, removed)`: the constellations active at the start of a turn, the constellation
+# completed on the turn and the constellations refunded so far, as bit masks over `PathSearch.constellations`
+# (`added` is an index).  Between turns, `added` is `_BETWEEN` and `removed` is 0.
+State = Tuple[int, int, int]
+_BETWEEN = -1
+
+# States `solve_final_constellation_path` expands before handing the target over to the MIP, a few seconds' work
+MAX_STATES = 50000
+
+
+def _bits(mask: int) -> Iterator[int]:
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+def _popcount(mask: int) -> int:
+    return bin(mask).count("1")
+
+
+class PathSearch:
+    # A* search for a path to `target_constellations` under the rules of `mip.Subproblem`, minimising the points
+    # refunded and then the number of constellations completed.
+    #
+    # Completing several constellations on one turn can always be split into one turn per constellation (the
+    # affinity and points only allow more afterwards), so each turn completes a single constellation.  The
+    # refunds of a turn are chosen one at a time in increasing index order, and the turn ends once the remaining
+    # constellations all have their requirements met.  Costs are exact: refunding costs the constellation's points.
+    #
+    # The heuristic is admissible: every active constellation outside the target must be refunded eventually, and
+    # the affinity each missing target constellation needs beyond what the rest of the target and the active
+    # non-target constellations give must come from other non-target constellations, which cost at least the
+    # deficit divided by the best affinity per point available.
+    def __init__(self, data: Data, num_points: int, target_constellations: AbstractSet[str]):
+        self.num_points = num_points
+        self.constellations = list(data.constellations)
+        index = {c: i for i, c in enumerate(self.constellations)}
+        self.points = [len(data.constellations[c]) for c in self.constellations]
+        self.req = [tuple(data.affinity_req[c].get(a, 0) for a in data.affinities) for c in self.constellations]
+        self.bonus = [tuple(data.affinity_bonus[c].get(a, 0) for a in data.affinities) for c in self.constellations]
+        # Constellations whose requirements must be met while they are active
+        self.checked = [c not in data.self_sufficient_constellations for c in self.constellations]
+        self.target = sum(1 << index[c] for c in target_constellations)
+
+        self._affinity: Dict[int, Tuple[int, ...]] = {}
+        self._heuristic: Dict[int, Optional[Tuple[int, int]]] = {}
+
+        outside = [i for i in range(len(self.constellations)) if not self.target >> i & 1]
+        self.best_ratio = [
+            max((Fraction(self.bonus[i][k], self.points[i]) for i in outside), default=Fraction(0))
+            for k in range(len(data.affinities))
+        ]
+        target_affinity = self.affinity(self.target)
+        # Affinity each target constellation needs from outside the target to be completed
+        self.outside_need = {
+            i: tuple(r - (t - b) for r, t, b in zip(self.req[i], target_affinity, self.bonus[i]))
+            for i in _bits(self.target)
+        }
+        self.expanded = 0
+        # Set if the last search ran out of states rather than showing the target unreachable
+        self.gave_up = False
+
+    def affinity(self, mask: int) -> Tuple[int, ...]:
+        try:
+            return self._affinity[mask]
+        except KeyError:
+            aff = tuple(map(sum, zip(*(self.bonus[i] for i in _bits(mask))))) or (0,) * len(self.best_ratio)
+            self._affinity[mask] = aff
+            return aff
+
+    def points_of(self, mask: int) -> int:
+        return sum(self.points[i] for i in _bits(mask))
+
+    def _meets(self, i: int, affinity: Tuple[int, ...]) -> bool:
+        return all(r <= a for r, a in zip(self.req[i], affinity))
+
+    def is_valid(self, mask: int) -> bool:
+        affinity = self.affinity(mask)
+        return all(self._meets(i, affinity) for i in _bits(mask) if self.checked[i])
+
+    # Lower bound on the (refunds, completions) still needed to reach the target from `active`, or `None` if the
+    # target can't be reached from it.
+    def heuristic(self, active: int) -> Optional[Tuple[int, int]]:
+        try:
+            return self._heuristic[active]
+        except KeyError:
+            pass
+
+        outside = active & ~self.target
+        extra = self.affinity(outside)
+        missing = self.target & ~active
+        stones = 0
+        for i in _bits(missing):
+            for k, need in enumerate(self.outside_need[i]):
+                need -= extra[k]
+                if need <= 0:
+                    continue
+                ratio = self.best_ratio[k]
+                if not ratio:
+                    self._heuristic[active] = None
+                    return None
+                stones = max(stones, -(-need * ratio.denominator // ratio.numerator))
+
+        h = (self.points_of(outside) + stones, _popcount(missing))
+        self._heuristic[active] = h
+        return h
+
+    def _moves(self, state: State) -> Iterator[Tuple[State, Tuple[int, int]]]:
+        active, added, removed = state
+        if added == _BETWEEN:
+            affinity = self.affinity(active)
+            room = self.num_points - self.points_of(active)
+            for i in range(len(self.constellations)):
+                if not active >> i & 1 and self.points[i] <= room and self._meets(i, affinity):
+                    yield (active, i, 0), (0, 1)
+        else:
+            for i in _bits(active & ~((1 << removed.bit_length()) - 1)):
+                yield (active, added, removed | 1 << i), (self.points[i], 0)
+            after = (active | 1 << added) & ~removed
+            if self.is_valid(after):
+                yield (after, _BETWEEN, 0), (0, 0)
+
+    # Returns a path of single-completion turns, or `None` if the target can't be reached.  If `max_states` is
+    # given, also gives up and returns `None` after expanding that many states, setting `gave_up`.
+    def search(self, max_states: Optional[int] = None) -> Optional[List[Turn]]:
+        self.gave_up = False
+        start = (0, _BETWEEN, 0)
+        h = self.heuristic(0)
+        if h is None:
+            return None
+
+        best = {start: (0, 0)}
+        parent = {start: None}
+        tiebreak = itertools.count()
+        heap = [(h[0], h[1], h[1], next(tiebreak), (0, 0), start)]
+        while heap:
+            _, _, _, _, g, state = heapq.heappop(heap)
+            if best[state] != g:
+                continue
+            active, added, _ = state
+            if added == _BETWEEN and active == self.target:
+                return self._turns(parent, state)
+
+            if max_states is not None and self.expanded >= max_states:
+                self.gave_up = True
+                return None
+            self.expanded += 1
+            for nxt, cost in self._moves(state):
+                ng = (g[0] + cost[0], g[1] + cost[1])
+                old = best.get(nxt)
+                if old is not None and old <= ng:
+                    continue
+                active, added, removed = nxt
+                h = self.heuristic(active if added == _BETWEEN else (active | 1 << added) & ~removed)
+                if h is None:
+                    continue
+                best[nxt] = ng
+                parent[nxt] = state
+                # Among equally good states, prefer those closest to the target
+                heapq.heappush(heap, (ng[0] + h[0], ng[1] + h[1], h[1], next(tiebreak), ng, nxt))
+
+        return None
+
+    def _turns(self, parent: Dict[State, Optional[State]], state: State) -> List[Turn]:
+        states = []
+        while state is not None:
+            states.append(state)
+            state = parent[state]
+        states.reverse()
+
+        turns = []
+        for (_, added, removed), (_, now, _) in zip(states, states[1:]):
+            if now == _BETWEEN:
+                turns.append((
+                    frozenset([self.constellations[added]]),
+                    frozenset(self.constellations[i] for i in _bits(removed)),
+                ))
+        return turns
+
+
+# Merge consecutive turns wherever the merged path is still valid.  This keeps the refunds and the final set, but
+# isn't guaranteed to find the fewest turns.
+def merge_turns(data: Data, num_points: int, turns: Sequence[Turn],
+                target_constellations: AbstractSet[str]) -> List[Turn]:
+    turns = list(turns)
+    i = 0
+    while i + 1 < len(turns):
+        (added1, removed1), (added2, removed2) = turns[i], turns[i + 1]
+        if not (added2 & removed1) and not (removed2 & added1):
+            merged = turns[:i] + [(added1 | added2, removed1 | removed2)] + turns[i + 2:]
+            if check_path(data, num_points, merged, target_constellations):
+                turns = merged
+                continue
+        i += 1
+    return turns
+
+
+# A replacement for `mip.solve_final_constellation_path` using `PathSearch`.  The number of refunds is the same,
+# but the number of turns may be slightly larger since turns are merged greedily.  If the search expands
+# `max_states` states without settling the target, the path is planned by `mip.solve_final_constellation_path`
+# (on `pool`, if given) instead.
+def solve_final_constellation_path(data: Data, config: Config, constellations: Iterable[str],
+                                   oracle: FeasibilityOracle = None, pool: 'HorizonPool' = None,
+                                   max_states: int = MAX_STATES):
+    target = set(constellations)
+    turns = None
+    if turn_lower_bound(data, target, config.num_points) is not None:
+        search = PathSearch(data, config.num_points, target)
+        turns = search.search(max_states)
+        logging.info(f"path search expanded {search.expanded} states")
+        if search.gave_up:
+            import mip
+
+            logging.warning(f"path search gave up after {max_states} states, planning the path with the MIP")
+            return mip.solve_final_constellation_path(data, config, target, oracle, pool)
+
+    if turns is None:
+        if oracle is not None:
+            oracle.record_infeasible(target, config.num_points, config.max_horizon, final=True)
+        return None
+
+    turns = merge_turns(data, config.num_points, turns, target)
+    if oracle is not None:
+        oracle.record_feasible(target, config.num_points, turns)
+    return path_actions(data, turns)
@@ -0,0 +1,142 @@
+import dataclasses
+import logging
+from typing import *
+
+from common import Config, Data, Star, calculate_star_objective, total_affinity
+
+
+@dataclasses.dataclass
+class Presolve:
+    # Stars which get a variable of their own in the master problem
+    stars: List[Star]
+    # Constellations which get a variable for being completed: those whose affinity may be needed
+    constellations: List[str]
+    # Constellations only worth completing for their affinity.  Their stars have no variables of their own, and are
+    # taken exactly when the constellation is completed.
+    bundled: List[str]
+    # Pairs (c, d) of bundled constellations where d is at least as good as c: no more points, no more
+    # requirements and at least as much affinity.  Completing c without d is never needed, so c may only be
+    # completed if d is.
+    dominated: List[Tuple[str, str]]
+    # `False` if stars were removed or bundled, in which case the master problem can no longer be required to use
+    # every point (see `fill_points`).
+    complete: bool
+
+    # No reduction at all.
+    @staticmethod
+    def identity(data: Data) -> 'Presolve':
+        return Presolve(
+            stars=list(data.stars),
+            constellations=list(data.constellations),
+            bundled=[],
+            dominated=[],
+            complete=True,
+        )
+
+    def summary(self, data: Data) -> str:
+        bundled_stars = sum(len(data.constellations[c]) for c in self.bundled)
+        removed_stars = len(data.stars) - len(self.stars) - bundled_stars
+        return (
+            f"presolve: {len(self.stars)} of {len(data.stars)} star variables kept ({removed_stars} removed, "
+            f"{bundled_stars} bundled into {len(self.bundled)} constellations), {len(self.constellations)} of "
+            f"{len(data.constellations)} constellation variables kept, {len(self.dominated)} dominance constraints"
+        )
+
+
+def _dominates(data: Data, d: str, c: str) -> bool:
+    if len(data.constellations[d]) > len(data.constellations[c]):
+        return False
+    if any(data.affinity_req[d].get(a, 0) > data.affinity_req[c].get(a, 0) for a in data.affinities):
+        return False
+    if any(data.affinity_bonus[d].get(a, 0) < data.affinity_bonus[c].get(a, 0) for a in data.affinities):
+        return False
+    # d's requirements have to hold whenever it's active, so it can't replace a constellation that only needs them
+    # to be completed.
+    return d in data.self_sufficient_constellations or c not in data.self_sufficient_constellations
+
+
+# Shrink the master problem for `config`.  A star is kept if it has some value, is forced, is the predecessor of a
+# kept star, or is part of a constellation that must be completed for its affinity.  A constellation is worth
+# completing only if it gives an affinity required by a kept star or by another such constellation.  Everything
+# else can never improve the objective or make a requirement easier to meet.
+def presolve(data: Data, config: Config) -> Presolve:
+    if not config.presolve:
+        return Presolve.identity(data)
+
+    keep = set(calculate_star_objective(data, config))
+    keep |= config.desired_stars
+    keep |= {data.celestial_power_stars[p] for p in config.celestial_powers}
+
+    stack = list(keep)
+    while stack:
+        p = data.predecessor.get(stack.pop())
+        if p is not None and p not in keep:
+            keep.add(p)
+            stack.append(p)
+
+    useful = set()
+    needed = set()
+    requiring = {s.cons for s in keep}
+    while requiring:
+        needed |= {a for c in requiring for a, d in data.affinity_req[c].items() if d > 0}
+        requiring = {
+            c for c in data.constellations
+            if c not in useful and any(data.affinity_bonus[c].get(a, 0) > 0 for a in needed)
+        }
+        useful |= requiring
+
+    bundled = []
+    for c in data.constellations:
+        if c not in useful:
+            continue
+        if any(s in keep for s in data.constellations[c]):
+            keep.update(data.constellations[c])
+        else:
+            bundled.append(c)
+
+    # Of two equivalent constellations, the one listed first is preferred.
+    dominated = []
+    for i, c in enumerate(bundled):
+        for j, d in enumerate(bundled):
+            if i != j and _dominates(data, d, c) and (j < i or not _dominates(data, c, d)):
+                dominated.append((c, d))
+
+    return Presolve(
+        stars=[s for s in data.stars if s in keep],
+        constellations=[c for c in data.constellations if c in useful],
+        bundled=bundled,
+        dominated=dominated,
+        complete=not bundled and len(keep) == len(data.stars),
+    )
+
+
+# Pad `stars` with stars of no value until every point is used, as the unreduced master problem would.  Stars are
+# only taken if their predecessor is and `final_constellations` meet their requirements, and no further
+# constellation is completed.
+def fill_points(data: Data, config: Config, stars: List[Star], final_constellations: List[str]) -> List[Star]:
+    taken = set(stars)
+    missing = config.num_points - len(taken)
+    affinity = total_affinity(data, final_constellations)
+    remaining = {c: sum(s not in taken for s in cons) for c, cons in data.constellations.items()}
+
+    progress = True
+    while missing > 0 and progress:
+        progress = False
+        for s in data.stars:
+            if missing == 0:
+                break
+            if s in taken or remaining[s.cons] <= 1:
+                continue
+            if any(d > affinity[a] for a, d in data.affinity_req[s.cons].items()):
+                continue
+            p = data.predecessor.get(s)
+            if p is not None and p not in taken:
+                continue
+            taken.add(s)
+            remaining[s.cons] -= 1
+            missing -= 1
+            progress = True
+
+    if missing > 0:
+        logging.warning(f"{missing} point(s) left unused")
+    return sorted(taken)
@@ -0,0 +1,213 @@
+import concurrent.futures
+import logging
+import multiprocessing
+import os
+from typing import *
+
+from common import Config, Data
+from feasibility import FeasibilityOracle, Turn
+from horizon import FIRST_HORIZON
+
+# Most horizons solved at once for one target, however many workers there are: beyond the first few, the larger
+# horizons are big models which are nearly always cancelled once a smaller one is decided
+RACE_WIDTH = 3
+
+# Indices into the shared state array
+_RACE = 0
+_FLOOR = 1
+_CEILING = 2
+
+_worker = {}
+
+
+def _init_worker(data: Data, threads: int, state, backend: Optional[str]):
+    from backend import get_backend
+
+    env = get_backend(backend).Env(empty=True)
+    env.setParam('OutputFlag', 0)
+    env.setParam('Threads', threads)
+    env.start()
+    _worker.update(data=data, env=env, state=state)
+
+
+# A task is still useful while its race is running and its horizon lies strictly between the largest horizon
+# known to be infeasible and the smallest known to be feasible.
+def _is_cancelled(race: int, turns: int) -> bool:
+    state = _worker['state']
+    return state[_RACE] >= race or not (state[_FLOOR] < turns < state[_CEILING])
+
+
+def _solve_subproblem(race: int, config: Config, target_constellations: Set[str], turns: int, minimise_refunds: bool):
+    from mip import Subproblem
+
+    if _is_cancelled(race, turns):
+        return None
+
+    sp = Subproblem(_worker['data'], config, target_constellations, turns, env=_worker['env'])
+    GRB = sp.gp.GRB
+    if minimise_refunds:
+        sp.model.setObjective(sp._sum_refunds(), GRB.MINIMIZE)
+
+    def callback(model, where):
+        if where == GRB.Callback.MIP and _is_cancelled(race, turns):
+            model.terminate()
+
+    sp.model.optimize(callback)
+    status = sp.model.Status
+    if status == GRB.OPTIMAL:
+        return True, sp.get_turns(), round(sp.model.ObjVal)
+    elif status == GRB.INFEASIBLE:
+        return False, None, None
+    elif status == GRB.INTERRUPTED:
+        return None
+    else:
+        raise Exception("unexpected GRB status", status)
+
+
+class HorizonPool:
+    # Solves the Subproblems for several horizons at once on a pool of worker processes.  Each worker has its own
+    # solver environment limited to `threads` threads.  Tasks must use the same `backend` as the pool.
+    def __init__(self, data: Data, workers: int, threads: Optional[int] = None, backend: Optional[str] = None):
+        ctx = multiprocessing.get_context("spawn")
+        threads = threads or max(1, (os.cpu_count() or 1) // workers)
+        self.workers = workers
+        self.race = 0
+        self.state = ctx.Array('q', 3, lock=False)
+        self.executor = concurrent.futures.ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=ctx,
+            initializer=_init_worker,
+            initargs=(data, threads, self.state, backend),
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.shutdown()
+
+    def shutdown(self):
+        self.state[_RACE] = self.race
+        self.executor.shutdown(wait=True, cancel_futures=True)
+
+    def _start_race(self, infeasible: int, upper: int):
+        self.race += 1
+        self.state[_FLOOR] = infeasible
+        self.state[_CEILING] = upper + 1
+
+    def _submit(self, config: Config, target_constellations: Set[str], turns: int,
+                minimise_refunds: bool = False) -> concurrent.futures.Future:
+        return self.executor.submit(_solve_subproblem, self.race, config, target_constellations, turns,
+                                    minimise_refunds)
+
+    # Race the horizons of the galloping search (see `horizon.search_horizon`) against each other, smallest first
+    # and at most `RACE_WIDTH` (or one per worker) at once.  The first feasible horizon cancels every larger one, and
+    # every infeasible horizon cancels every smaller one.  `upper`, the largest and costliest model, is only tried
+    # once every smaller horizon has turned out infeasible.  If `minimal` is set, the gap between the two is then
+    # closed by racing evenly spaced horizons.  Returns the feasible horizon found, or `None` if the target is
+    # infeasible at `upper`.
+    def search_horizon(self, config: Config, target_constellations: Set[str], oracle: FeasibilityOracle,
+                       infeasible: int, upper: int, minimal: bool = False) -> Optional[int]:
+        if infeasible >= upper:
+            return None
+
+        self._start_race(infeasible, upper)
+        width = min(self.workers, RACE_WIDTH)
+        feasible = None
+        pending = {}
+
+        waiting = []
+        h = max(infeasible + 1, FIRST_HORIZON)
+        while not waiting or waiting[-1] < upper:
+            waiting.append(min(h, upper))
+            h *= 2
+
+        try:
+            while True:
+                ceiling = feasible if feasible is not None else upper + 1
+                waiting = [h for h in waiting if infeasible < h < ceiling]
+                while waiting and len(pending) < width and (waiting[0] < upper or not pending):
+                    h = waiting.pop(0)
+                    pending[self._submit(config, target_constellations, h)] = h
+                if not pending:
+                    break
+
+                done, _ = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                for f in done:
+                    turns = pending.pop(f)
+                    result = None if f.cancelled() else f.result()
+                    if result is None:
+                        continue
+                    is_feasible, witness, _ = result
+                    if is_feasible:
+                        logging.info(f"feasible with {turns} turns")
+                        oracle.record_feasible(target_constellations, config.num_points, witness)
+                        feasible = len(witness) if feasible is None else min(feasible, len(witness))
+                    else:
+                        logging.warning(f"infeasible with {turns} turns")
+                        oracle.record_infeasible(target_constellations, config.num_points, turns,
+                                                 final=turns >= upper)
+                        infeasible = max(infeasible, turns)
+
+                if infeasible >= upper or (feasible is not None and not minimal):
+                    break
+
+                if feasible is not None:
+                    self.state[_CEILING] = feasible
+                self.state[_FLOOR] = infeasible
+                for f, turns in list(pending.items()):
+                    if not (infeasible < turns < (feasible if feasible is not None else upper + 1)):
+                        f.cancel()
+                        del pending[f]
+
+                if minimal and feasible is not None and not pending and feasible - infeasible > 1:
+                    gap = feasible - infeasible - 1
+                    n = min(width, gap)
+                    for i in range(1, n + 1):
+                        turns = infeasible + (gap + 1) * i // (n + 1)
+                        pending[self._submit(config, target_constellations, turns)] = turns
+        finally:
+            self.state[_RACE] = self.race
+            for f in pending:
+                f.cancel()
+
+        if infeasible >= upper:
+            return None
+        return feasible
+
+    # Minimise refunds for each of `horizons` in order, with at most `RACE_WIDTH` (or one per worker) running at
+    # once, and the last (largest) only once the others are done.  Following `mip.solve_final_constellation_path`,
+    # returns the first horizon whose number of refunds is the same as the previous one's (or the last horizon),
+    # along with that number.  Larger horizons are then cancelled, and those not yet started are never solved.
+    def stable_refunds(self, config: Config, target_constellations: Set[str],
+                       horizons: List[int]) -> Tuple[int, int]:
+        self._start_race(0, horizons[-1])
+        refunds = {}
+        pending = {}
+        waiting = list(horizons)
+        width = min(self.workers, RACE_WIDTH)
+        try:
+            while True:
+                while waiting and len(pending) < width and (len(waiting) > 1 or not pending):
+                    h = waiting.pop(0)
+                    pending[self._submit(config, target_constellations, h, minimise_refunds=True)] = h
+                done, _ = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                for f in done:
+                    h = pending.pop(f)
+                    result = f.result()
+                    if result is None:
+                        raise Exception("refund subproblem was interrupted", h)
+                    _, _, refunds[h] = result
+
+                for prev, h in zip(horizons, horizons[1:]):
+                    if prev not in refunds or h not in refunds:
+                        break
+                    if refunds[prev] == refunds[h]:
+                        return h, refunds[h]
+                else:
+                    if horizons[-1] in refunds:
+                        return horizons[-1], refunds[horizons[-1]]
+        finally:
+            self.state[_RACE] = self.race
+            for f in pending:
+                f.cancel()
@@ -0,0 +1,139 @@
+import dataclasses
+from typing import *
+
+from common import Config, Data, Star
+
+# Minimum violation for a cut to be worth adding
+EPSILON = 1e-3
+
+
+@dataclasses.dataclass
+class CutLimiter:
+    # Keeps separation from slowing down the search: at most `per_round` cuts are added at a node and `total` in
+    # all.  After a round finds nothing, the next rounds are skipped, twice as many after each fruitless round (up
+    # to `max_skip`).
+    per_round: int = 10
+    total: int = 2000
+    max_skip: int = 64
+    added: int = 0
+    skip: int = 0
+    skipped: int = 0
+
+    def should_separate(self) -> bool:
+        if self.added >= self.total:
+            return False
+        if self.skipped < self.skip:
+            self.skipped += 1
+            return False
+        self.skipped = 0
+        return True
+
+    def record(self, num_cuts: int):
+        self.added += num_cuts
+        if num_cuts:
+            self.skip = 0
+        else:
+            self.skip = min(max(1, 2 * self.skip), self.max_skip)
+
+    def room(self) -> int:
+        return min(self.per_round, self.total - self.added)
+
+
+@dataclasses.dataclass
+class Cover:
+    # `var` (the variable of star or constellation `key`) can only be 1 if the constellations in `providers` (with
+    # the amount of the affinity each gives) give at least `amount` between them.
+    var: Any
+    key: Union[Star, str]
+    amount: int
+    providers: List[Tuple[str, int]]
+
+
+class Separator:
+    # Finds inequalities violated by the LP relaxation at a node of the master problem, for `mip.grb_callback` to
+    # add as user cuts.  Two families are separated heuristically:
+    #
+    # - Affinity covers: if a set `S` of constellations doesn't give enough of an affinity that a constellation (or
+    #   the first star of one) needs, some constellation outside `S` is needed too: `var <= sum(Y[d] for d not in
+    #   S)`.  `S` is chosen greedily, most fractional-complete first.
+    # - Point-budget covers: a set `T` of constellations with more points than the limit can't all be completed:
+    #   `sum(Y[d] for d in T) <= |T| - 1`.  `T` is chosen greedily by how close to complete each constellation
+    #   is per point.
+    def __init__(self, gp, data: Data, config: Config, X: Dict[Star, Any], Y: Dict[str, Any]):
+        self.gp = gp
+        self.num_points = config.num_points
+        self.X = X
+        self.Y = Y
+        self.points = {c: len(data.constellations[c]) for c in Y}
+        self.limiter = CutLimiter()
+
+        self.covers = []
+        for c in Y:
+            if c in data.self_sufficient_constellations:
+                continue
+            for a, amount in data.affinity_req[c].items():
+                deficit = amount - data.affinity_bonus[c].get(a, 0)
+                if deficit > 0:
+                    self.covers.append(Cover(Y[c], c, deficit, self._providers(data, a, exclude=c)))
+        for s in X:
+            if s in data.predecessor:
+                continue
+            for a, amount in data.affinity_req[s.cons].items():
+                if amount > 0:
+                    self.covers.append(Cover(X[s], s, amount, self._providers(data, a)))
+
+    def _providers(self, data: Data, a: str, exclude: str = None) -> List[Tuple[str, int]]:
+        return [
+            (d, data.affinity_bonus[d][a]) for d in self.Y
+            if d != exclude and data.affinity_bonus[d].get(a, 0) > 0
+        ]
+
+    def _affinity_cuts(self, x: Dict[Star, float], y: Dict[str, float]) -> Iterator[Tuple[float, Any]]:
+        for cover in self.covers:
+            v = x[cover.key] if isinstance(cover.key, Star) else y[cover.key]
+            if v < EPSILON:
+                continue
+            insufficient = 0
+            outside = []
+            for d, bonus in sorted(cover.providers, key=lambda p: (-y[p[0]], p[1])):
+                if insufficient + bonus < cover.amount:
+                    insufficient += bonus
+                else:
+                    outside.append(d)
+            violation = v - sum(y[d] for d in outside)
+            if violation > EPSILON:
+                yield violation, cover.var <= self.gp.quicksum(self.Y[d] for d in outside)
+
+    def _point_cuts(self, y: Dict[str, float]) -> Iterator[Tuple[float, Any]]:
+        candidates = sorted((c for c in self.Y if y[c] > EPSILON), key=lambda c: (1 - y[c]) / self.points[c])
+        cover = []
+        points = 0
+        for c in candidates:
+            cover.append(c)
+            points += self.points[c]
+            if points > self.num_points:
+                break
+        else:
+            return
+
+        # Make the cover minimal, dropping the least complete constellations first
+        for c in sorted(cover, key=lambda c: y[c]):
+            if points - self.points[c] > self.num_points:
+                cover.remove(c)
+                points -= self.points[c]
+
+        violation = sum(y[c] for c in cover) - (len(cover) - 1)
+        if violation > EPSILON:
+            yield violation, self.gp.quicksum(self.Y[c] for c in cover) <= len(cover) - 1
+
+    # The most violated cuts for the relaxation `x` (star variable values) and `y` (constellation variable values),
+    # as constraints to pass to `cbCut`.  Returns nothing if the limiter says to skip this round.
+    def separate(self, x: Dict[Star, float], y: Dict[str, float]) -> List[Any]:
+        if not self.limiter.should_separate():
+            return []
+        cuts = list(self._affinity_cuts(x, y))
+        cuts.extend(self._point_cuts(y))
+        cuts.sort(key=lambda cut: -cut[0])
+        cuts = [c for _, c in cuts[:self.limiter.room()]]
+        self.limiter.record(len(cuts))
+        return cuts
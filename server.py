@@ -0,0 +1,354 @@
+#!/usr/bin/env python
+import asyncio
+import concurrent.futures
+import contextlib
+import dataclasses
+import itertools
+import json
+import logging
+import multiprocessing
+import os
+import urllib.parse
+from concurrent.futures.process import BrokenProcessPool
+from typing import *
+
+from backend import BACKENDS
+from common import *
+
+# Seconds a job may run past its time limit (while its path is planned) before it is given up on
+TIMEOUT_GRACE = 5.0
+# Largest request body accepted, in bytes
+MAX_BODY = 2**20
+
+_worker = {}
+
+
+def _init_worker(data: Data, state, backend: Optional[str], threads: int):
+    from backend import get_backend
+    from objective import objective_matrix
+    # Imported now so the first job doesn't pay for it
+    import mip
+    import solve
+
+    with contextlib.redirect_stdout(open(os.devnull, 'w')):
+        env = get_backend(backend).Env(empty=True)
+        env.setParam('OutputFlag', 0)
+        env.setParam('Threads', threads)
+        env.start()
+    objective_matrix(data)
+    _worker.update(data=data, env=env, state=state)
+
+
+# Does nothing: submitting it starts a worker, whose initializer loads everything
+def _warm_up():
+    pass
+
+
+# Solve `config` in a worker.  The job is cancelled once `state[slot]` is set.  Returns the solution as JSON, or
+# `None` if there is none or the job was cancelled.
+def _run_job(slot: int, config: Config) -> Optional[str]:
+    from grim_dawn_data.json_utils import dumps_json
+    from solve import solve
+
+    state = _worker['state']
+
+    def should_stop() -> bool:
+        return state[slot] != 0
+
+    if should_stop():
+        return None
+    sol = solve(_worker['data'], config, env=_worker['env'], should_stop=should_stop)
+    return dumps_json(sol) if sol is not None else None
+
+
+class JobError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class SolverServer:
+    # Solves configs sent over HTTP on a pool of worker processes, each of which keeps the data, the objective
+    # matrix and a solver environment loaded between jobs.
+    #
+    # At most `workers` jobs run at once and `queue` more wait; further requests are turned away with 503 rather than
+    # queued without bound.  Each job has a time limit, after which the best solution found is used; if the job
+    # still hasn't finished `TIMEOUT_GRACE` seconds later, it is cancelled.  A job is also cancelled if its client
+    # disconnects (closing the connection or just its own side of it: clients must keep it open for the answer), or
+    # on `DELETE /jobs/<id>`.  Cancelled jobs stop at the next callback of the solver.  If a worker
+    # process dies, the jobs it took down fail with 500 and the pool is started again.
+    #
+    # Jobs are identified by the `X-Job-Id` header of the request, or numbered by the server.
+    def __init__(self, data: Data, workers: int, queue: int, timeout: float, backend: Optional[str] = None,
+                 threads: Optional[int] = None, solution_cache: bool = True):
+        self.ctx = multiprocessing.get_context("spawn")
+        self.data = data
+        self.threads = threads or max(1, (os.cpu_count() or 1) // workers)
+        self.workers = workers
+        self.timeout = timeout
+        self.backend = backend
+        self.solution_cache = solution_cache
+        # One cancellation flag per job that may be running or waiting
+        self.state = self.ctx.Array('b', workers + queue, lock=False)
+        self.free_slots = list(range(workers + queue))
+        self.jobs: Dict[str, int] = {}
+        self.job_ids = itertools.count(1)
+        self.executor = self._start_pool()
+
+    def _start_pool(self) -> concurrent.futures.ProcessPoolExecutor:
+        return concurrent.futures.ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=self.ctx,
+            initializer=_init_worker,
+            initargs=(self.data, self.state, self.backend, self.threads),
+        )
+
+    # Replace `executor` after one of its workers died, unless another job already has
+    def _restart_pool(self, executor: concurrent.futures.ProcessPoolExecutor):
+        if self.executor is executor:
+            logging.warning("a worker process died, restarting the pool")
+            executor.shutdown(wait=False)
+            self.executor = self._start_pool()
+
+    # Start the workers now, rather than on the first jobs
+    async def warm_up(self):
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(self.executor, _warm_up) for _ in range(self.workers)))
+
+    def close(self):
+        for slot in self.jobs.values():
+            self.state[slot] = 1
+        self.executor.shutdown(wait=False)
+
+    def cancel(self, job_id: str) -> bool:
+        try:
+            slot = self.jobs[job_id]
+        except KeyError:
+            return False
+        self.state[slot] = 1
+        return True
+
+    # Run a job until it finishes, or until `disconnected` completes.  Returns the solution as JSON.
+    async def run(self, job_id: str, config: Config, timeout: float, disconnected: asyncio.Future) -> str:
+        if not self.free_slots:
+            raise JobError(503, "too many jobs")
+        if job_id in self.jobs:
+            raise JobError(409, f"job {job_id} is already running")
+
+        slot = self.free_slots.pop()
+        self.state[slot] = 0
+        self.jobs[job_id] = slot
+        config = dataclasses.replace(config, backend=self.backend, time_limit=timeout,
+                                     solution_cache=self.solution_cache)
+        loop = asyncio.get_running_loop()
+        job = None
+        try:
+            executor = self.executor
+            try:
+                job = loop.run_in_executor(executor, _run_job, slot, config)
+            except BrokenProcessPool:
+                self._restart_pool(executor)
+                executor = self.executor
+                job = loop.run_in_executor(executor, _run_job, slot, config)
+            # The slot is only reused once the worker is done with it
+            job.add_done_callback(lambda _: self.free_slots.append(slot))
+            done, _ = await asyncio.wait([job, disconnected], timeout=timeout + TIMEOUT_GRACE,
+                                         return_when=asyncio.FIRST_COMPLETED)
+            if job not in done:
+                self.state[slot] = 1
+                if disconnected in done:
+                    raise JobError(499, "client disconnected")
+                raise JobError(504, f"no solution within {timeout + TIMEOUT_GRACE:.0f} seconds")
+            if self.state[slot]:
+                raise JobError(409, "cancelled")
+            try:
+                sol = job.result()
+            except BrokenProcessPool:
+                self._restart_pool(executor)
+                raise JobError(500, "worker process died")
+            except Exception as e:
+                logging.exception(f"job {job_id} failed")
+                raise JobError(500, f"{type(e).__name__}: {e}")
+            if sol is None:
+                raise JobError(422, "Impossible to satisfy requirements")
+            return sol
+        finally:
+            del self.jobs[job_id]
+            if job is None:
+                self.free_slots.append(slot)
+
+    def status(self) -> Dict:
+        return {
+            "workers": self.workers,
+            "jobs": sorted(self.jobs),
+            "free_slots": len(self.free_slots),
+        }
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            try:
+                method, target, headers, body = await _read_request(reader)
+            except (ValueError, asyncio.IncompleteReadError, asyncio.LimitOverrunError) as e:
+                await _respond(writer, 400, {"error": f"bad request: {e}"})
+                return
+
+            url = urllib.parse.urlsplit(target)
+            query = urllib.parse.parse_qs(url.query)
+            if method == "GET" and url.path == "/status":
+                await _respond(writer, 200, self.status())
+            elif method == "DELETE" and url.path.startswith("/jobs/"):
+                job_id = urllib.parse.unquote(url.path[len("/jobs/"):])
+                if self.cancel(job_id):
+                    await _respond(writer, 200, {"id": job_id, "cancelled": True})
+                else:
+                    await _respond(writer, 404, {"error": f"no job {job_id}"})
+            elif method == "POST" and url.path == "/solve":
+                await self._handle_solve(reader, writer, query, headers, body)
+            else:
+                await _respond(writer, 404, {"error": f"no route for {method} {url.path}"})
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _handle_solve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                            query: Dict[str, List[str]], headers: Dict[str, str], body: bytes):
+        job_id = headers.get("x-job-id") or str(next(self.job_ids))
+        try:
+            config = _parse_config(body, headers.get("content-type", ""))
+            timeout = min(float(query.get("timeout", [self.timeout])[0]), self.timeout)
+        except Exception as e:
+            await _respond(writer, 400, {"id": job_id, "error": f"invalid config: {e}"})
+            return
+
+        disconnected = asyncio.ensure_future(_disconnected(reader))
+        try:
+            sol = await self.run(job_id, config, timeout, disconnected)
+        except JobError as e:
+            if e.status != 499:
+                await _respond(writer, e.status, {"id": job_id, "error": str(e)},
+                               {"Retry-After": "1"} if e.status == 503 else None)
+            return
+        finally:
+            disconnected.cancel()
+        await _respond_raw(writer, 200, f'{{"id": {json.dumps(job_id)}, "solution": {sol}}}'.encode())
+
+
+# Completes once the client of a connection has gone: at the end of the stream, which is all a normal close shows
+# until the answer is written, or on a reset.  Anything sent after the request is ignored.
+async def _disconnected(reader: asyncio.StreamReader):
+    try:
+        while await reader.read(1024):
+            pass
+    except ConnectionError:
+        pass
+
+
+def _parse_config(body: bytes, content_type: str) -> Config:
+    from configure import config_from_dict
+
+    text = body.decode()
+    if "json" in content_type:
+        d = json.loads(text)
+    elif "toml" in content_type:
+        import toml
+        d = toml.loads(text)
+    else:
+        try:
+            d = json.loads(text)
+        except ValueError:
+            import toml
+            d = toml.loads(text)
+    return config_from_dict(d)
+
+
+async def _read_request(reader: asyncio.StreamReader) -> Tuple[str, str, Dict[str, str], bytes]:
+    line = (await reader.readuntil(b"\r\n")).decode("latin-1")
+    try:
+        method, target, _ = line.split()
+    except ValueError:
+        raise ValueError(f"malformed request line {line.strip()!r}")
+
+    headers = {}
+    while True:
+        line = (await reader.readuntil(b"\r\n")).decode("latin-1")
+        if line == "\r\n":
+            break
+        name, _, value = line.partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    length = int(headers.get("content-length", 0))
+    if length > MAX_BODY:
+        raise ValueError("body too large")
+    body = await reader.readexactly(length)
+    return method, target, headers, body
+
+
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 409: "Conflict", 422: "Unprocessable Entity",
+            500: "Internal Server Error", 503: "Service Unavailable", 504: "Gateway Timeout"}
+
+
+async def _respond_raw(writer: asyncio.StreamWriter, status: int, body: bytes, headers: Dict[str, str] = None):
+    lines = [
+        f"HTTP/1.1 {status} {_REASONS.get(status, '')}",
+        "Content-Type: application/json",
+        f"Content-Length: {len(body)}",
+        "Connection: close",
+    ]
+    lines.extend(f"{k}: {v}" for k, v in (headers or {}).items())
+    writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body)
+    await writer.drain()
+
+
+async def _respond(writer: asyncio.StreamWriter, status: int, obj: Dict, headers: Dict[str, str] = None):
+    await _respond_raw(writer, status, json.dumps(obj).encode(), headers)
+
+
+async def serve(server: SolverServer, socket_path: Optional[Path], port: Optional[int]):
+    await server.warm_up()
+    if socket_path is not None:
+        if socket_path.exists():
+            socket_path.unlink()
+        listener = await asyncio.start_unix_server(server.handle, str(socket_path))
+        logging.warning(f"listening on {socket_path}")
+    else:
+        listener = await asyncio.start_server(server.handle, "127.0.0.1", port)
+        logging.warning(f"listening on http://127.0.0.1:{port}")
+    async with listener:
+        await listener.serve_forever()
+
+
+if __name__ == '__main__':
+    import argparse
+
+    p = argparse.ArgumentParser(
+        description="Serve solutions over HTTP: POST a config (TOML or JSON, as for solve.py) to /solve, "
+                    "optionally with ?timeout=SECONDS and an X-Job-Id header.  DELETE /jobs/<id> cancels a job and "
+                    "GET /status lists the running jobs."
+    )
+    where = p.add_mutually_exclusive_group()
+    where.add_argument('--socket', type=Path, default=None, help='Listen on this Unix socket')
+    where.add_argument('--port', type=int, default=8765, help='Listen on this port of localhost (default: 8765)')
+    p.add_argument('-j', '--workers', type=int, default=2, help='Number of worker processes')
+    p.add_argument('--queue', type=int, default=16, help='Number of jobs which may wait for a worker')
+    p.add_argument('--timeout', type=float, default=60.0,
+                   help='Longest time limit a job may ask for, and the default (seconds)')
+    p.add_argument('--threads', type=int, default=None,
+                   help='Number of threads each worker process may use (default: divide the CPUs evenly)')
+    p.add_argument('--backend', choices=BACKENDS, default=None,
+                   help='MIP solver to use (default: gurobi if installed, otherwise highs)')
+    p.add_argument('--no-solution-cache', action='store_true',
+                   help="Don't look up or store solutions in .cache/solutions")
+    args = p.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+    logging.getLogger("gurobipy").setLevel(logging.CRITICAL)
+
+    data = Data.load()
+    server = SolverServer(data, args.workers, args.queue, args.timeout, args.backend, args.threads,
+                          not args.no_solution_cache)
+    try:
+        asyncio.run(serve(server, args.socket, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
@@ -0,0 +1,56 @@
+import dataclasses
+import logging
+from typing import *
+
+from common import Config, Data, Star
+from feasibility import FeasibilityOracle
+from mip import Incumbent, MasterProblem
+
+
+class Session:
+    # Solves one config again and again as its bonus weights or number of points change, which is how builds are
+    # usually tuned (and how `solve.sweep` goes through the budgets).  The master problem is built once and only its
+    # objective or budget is updated, so the cuts, the feasibility oracle (and with it every path found) and the
+    # previous solution all carry over.  The previous solution is the MIP start of the next solve while it is still
+    # valid, and seeds the heuristic otherwise.  The master problem is only rebuilt, keeping the cuts, if the new
+    # weights give value to stars presolve left out.
+    def __init__(self, data: Data, config: Config, pool: 'HorizonPool' = None):
+        self.data = data
+        self.config = dataclasses.replace(config)
+        self.pool = pool
+        self.oracle = FeasibilityOracle(data)
+        self.master = MasterProblem(data, self.config, self.oracle, pool)
+        self.previous: Optional[Tuple[List[Star], List[str]]] = None
+
+    @property
+    def final_constellations(self) -> List[str]:
+        return self.previous[1] if self.previous is not None else []
+
+    # The objective value of the last solution
+    @property
+    def objective(self) -> Optional[float]:
+        return self.master.objective
+
+    def set_objective(self, objective: Dict[str, float]):
+        self.config.objective = dict(objective)
+        if not self.master.set_objective(objective):
+            logging.info("rebuilding the master problem for the new objective")
+            cuts = self.master.cuts
+            self.master = MasterProblem(self.data, self.config, self.oracle, self.pool)
+            self.master.add_cuts(cuts)
+
+    def set_num_points(self, num_points: int):
+        self.config.num_points = num_points
+        self.master.set_num_points(num_points)
+
+    # Returns the solution for the current settings in the format of `solve.solve`, or `None` if the requirements
+    # can't be met.
+    def solve(self, on_incumbent: Callable[[Incumbent], None] = None) -> Optional[Dict]:
+        from solve import plan_path
+
+        result = self.master.solve(on_incumbent, initial=self.final_constellations, start=self.previous)
+        if result is None:
+            return None
+        self.previous = result
+        chosen_stars, final_constellations = result
+        return plan_path(self.data, self.config, chosen_stars, final_constellations, self.oracle, self.pool)
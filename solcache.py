@@ -0,0 +1,152 @@
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+from typing import *
+
+from common import CACHE_DIR, Config, Star, data_dump_hash
+
+SOLUTION_CACHE_DIR = CACHE_DIR / "solutions"
+# Bump whenever the format of the stored solutions changes, or a solver change could change them.
+SOLUTION_CACHE_VERSION = 1
+
+
+# The part of `config` a solution depends on, in a canonical form: `Config.to_dict()` with the weights as floats and
+# bonuses of no weight dropped, plus the path engine (which changes the order, if not the stars) and the longest path
+# considered (which decides which builds count as reachable).
+def normalized_config(config: Config) -> Dict:
+    d = config.to_dict()
+    d["bonus"] = [{"kind": b["kind"], "weight": float(b["weight"])} for b in d["bonus"] if b["weight"]]
+    d["path_engine"] = config.path_engine
+    d["max_horizon"] = config.max_horizon
+    return d
+
+
+def solution_key(config: Config, version: Optional[str] = None) -> str:
+    key = {
+        "cache_version": SOLUTION_CACHE_VERSION,
+        "data": version or data_dump_hash(),
+        "config": normalized_config(config),
+    }
+    return hashlib.sha256(json.dumps(key, sort_keys=True).encode()).hexdigest()
+
+
+# Actions' keys holding sets of constellations
+_SET_KEYS = ("add", "remove", "constellations")
+
+
+def _encode(solution: Dict) -> Dict:
+    def star(s: Star) -> List:
+        return [s.cons, s.idx]
+
+    order = []
+    for action in solution["order"]:
+        action = dict(action)
+        for k in _SET_KEYS:
+            if k in action:
+                action[k] = sorted(action[k])
+        if "straggler_stars" in action:
+            action["straggler_stars"] = [star(s) for s in action["straggler_stars"]]
+        order.append(action)
+    return {"stars": [star(s) for s in solution["stars"]], "order": order}
+
+
+def _decode(solution: Dict) -> Dict:
+    for action in solution["order"]:
+        for k in _SET_KEYS:
+            if k in action:
+                action[k] = set(action[k])
+        if "straggler_stars" in action:
+            action["straggler_stars"] = [Star(*s) for s in action["straggler_stars"]]
+    solution["stars"] = [Star(*s) for s in solution["stars"]]
+    return solution
+
+
+class SolutionCache:
+    # Solutions of `solve.solve` kept on disk, one JSON file per config named by `solution_key`, so repeated configs
+    # are answered without solving.  Only solutions proven optimal should be stored.
+    #
+    # A file's modification time is its last use: `get` touches it, and once the files take more than `max_bytes`,
+    # `put` deletes the least recently used ones.  Files are written to a temporary name and renamed into place, and
+    # eviction holds a lock on the directory, so several processes can share the cache.
+    def __init__(self, directory: Path = SOLUTION_CACHE_DIR, max_bytes: int = 64 * 2**20, version: Optional[str] = None):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.version = version or data_dump_hash()
+        self.hits = 0
+        self.misses = 0
+
+    def path(self, config: Config) -> Path:
+        return self.directory / f"{solution_key(config, self.version)}.json"
+
+    def get(self, config: Config) -> Optional[Dict]:
+        path = self.path(config)
+        try:
+            solution = json.loads(path.read_text())["solution"]
+        except (OSError, ValueError, KeyError):
+            self.misses += 1
+            return None
+        # A read-only cache still answers, it just doesn't keep track of use
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        self.hits += 1
+        logging.info(f"solution found in cache: {path.name}")
+        return _decode(solution)
+
+    def put(self, config: Config, solution: Dict):
+        path = self.path(config)
+        entry = {"config": normalized_config(config), "solution": _encode(solution)}
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            tmp.write_text(json.dumps(entry))
+            os.replace(tmp, path)
+            self.evict()
+        except OSError as e:
+            logging.warning(f"can't write to the solution cache: {e}")
+
+    # Delete the least recently used solutions until the rest fit in `max_bytes`.
+    def evict(self):
+        with self._lock():
+            entries = []
+            for p in self.directory.glob("*.json"):
+                try:
+                    st = p.stat()
+                except OSError:
+                    continue
+                entries.append((st.st_mtime_ns, st.st_size, p))
+            total = sum(size for _, size, _ in entries)
+            for _, size, p in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    p.unlink()
+                except FileNotFoundError:
+                    pass
+                total -= size
+
+    def _lock(self):
+        try:
+            import fcntl
+        except ImportError:
+            # No locking on Windows: at worst, two processes evict at once and delete a few more files than needed
+            import contextlib
+            return contextlib.nullcontext()
+        return _FileLock(self.directory / ".lock", fcntl)
+
+
+class _FileLock:
+    def __init__(self, path: Path, fcntl):
+        self.path = path
+        self.fcntl = fcntl
+
+    def __enter__(self):
+        self.fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        self.fcntl.flock(self.fd, self.fcntl.LOCK_EX)
+
+    def __exit__(self, *exc):
+        self.fcntl.flock(self.fd, self.fcntl.LOCK_UN)
+        os.close(self.fd)
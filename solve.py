@@ -1,12 +1,12 @@
 #!/usr/bin/env python
+import contextlib
 import dataclasses
+import json
 import sys
 
-from gurobipy import *
+from backend import BACKENDS
 from common import *
-from termcolor import colored
 import logging
-import contextlib
 from grim_dawn_data.bonuses import aggregate_bonuses
 from grim_dawn_data.json_utils import dumps_json, load_json
 
@@ -14,230 +14,8 @@ from grim_dawn_data.json_utils import dumps_json, load_json
 class OutputSettings:
     show_all_bonuses: bool = False
     json: bool = False
-
-
-class Subproblem:
-    def __init__(self, data: Data, config: Config, target_constellations: Set[str], turns: int):
-        model = Model()
-        turns = range(turns)
-        if config.log_level > logging.DEBUG:
-            model.setParam('OutputFlag', 0)
-        # Amount of each affinity we have the end of turn t
-        Q = model.addVars(data.affinities, turns, name="Q")
-        # Amount of points we've used have the end of turn t
-        P = model.addVars(turns, name="P", ub=config.num_points)
-
-        # Is constellation c active at the end of turn t?
-        Y = model.addVars(data.constellations, turns, vtype=GRB.BINARY, name="Y")
-
-        # Do we pick (p=1) or unpick (p=-1) constellation c on turn t?
-        Z = model.addVars(data.constellations, [1, -1], turns, vtype=GRB.BINARY, name="Z")
-
-        # Do we pick anything on turn t?
-        W = model.addVars(turns, vtype=GRB.BINARY, name="W")
-
-        constraints = {}
-
-        constraints["affinity_req_pick"] = {
-            (c, t, a): model.addConstr(Z[c, 1, t] * d <= (0 if t == 0 else Q[a, t - 1]))
-            for t in turns
-            for c in data.constellations
-            for a, d in data.affinity_req[c].items()
-        }
-        constraints["affinity_req_unpick"] = {
-            (c, t, a): model.addConstr(Y[c, t] * d <= Q[a, t])
-            for t in turns
-            for c in data.constellations if c not in data.self_sufficient_constellations
-            for a, d in data.affinity_req[c].items()
-        }
-
-        constraints["calc_Q"] = {
-            (t, a): model.addConstr(
-                Q[a, t] == quicksum(Y[c, t] * data.affinity_bonus[c].get(a, 0) for c in data.constellations))
-            for t in turns
-            for a in data.affinities
-        }
-
-        constraints["inventory"] = {
-            (c, t): model.addConstr(
-                Y[c, t] == (Y[c, t - 1] if t > 0 else 0) + Z[c, 1, t] - Z[c, -1, t]
-            )
-            for c in data.constellations
-            for t in turns
-        }
-
-        constraints["calc_P"] = {
-            t: model.addConstr(
-                P[t] == quicksum(len(stars) * Y[c, t] for c, stars in data.constellations.items())
-            )
-            for t in turns
-        }
-
-        constraints["max_points"] = {
-            t: model.addConstr(
-                P[t - 1] + quicksum(
-                    len(stars) * Z[c, 1, t] for c, stars in data.constellations.items()) <= config.num_points
-            )
-            for t in turns[1:]
-        }
-
-        constraints["max_points"][0] = model.addConstr(
-            quicksum(len(stars) * Z[c, 1, 0] for c, stars in data.constellations.items()) <= config.num_points
-        )
-
-        constraints["antisymmetry"] = {
-            t: model.addConstr(W[t] <= W[t - 1])
-            for t in turns[1:]
-        }
-
-        constraints["link_wz"] = {
-            (c, t): model.addConstr(Z[c, 1, t] + Z[c, -1, t] <= W[t])
-            for t in turns
-            for c in data.constellations
-        }
-
-        constraints["must_add_something"] = {
-            t: model.addConstr(quicksum(Z[c, 1, t] for c in data.constellations) >= W[t])
-            for t in turns
-        }
-
-        constraints["final_Y"] = {
-            c: model.addConstr(Y[c, turns[-1]] == int(c in target_constellations))
-            for c in data.constellations
-        }
-
-        self.turns = turns
-        self.data = data
-        self.constraints = constraints
-        self.Y = Y
-        self.Z = Z
-        self.W = W
-        self.Q = Q
-        self.P = P
-        self.model = model
-
-    def is_feasible(self) -> bool:
-        self.model.optimize()
-        status = self.model.Status
-        if status == GRB.OPTIMAL:
-            return True
-        elif status == GRB.INFEASIBLE:
-            return False
-        else:
-            raise Exception("unexpected GRB status", status)
-
-    def _sum_refunds(self) -> LinExpr:
-        return quicksum(
-            self.Z[c, -1, t] * len(stars) for c, stars in self.data.constellations.items() for t in self.turns)
-
-    def minimise_refunds(self) -> Optional[int]:
-        logging.info(f"minimise refunds (max turns = {len(self.turns)})")
-        self.model.setObjective(self._sum_refunds(), GRB.MINIMIZE)
-        self.model.optimize()
-        if self.model.Status == GRB.INFEASIBLE:
-            return None
-        elif self.model.Status == GRB.OPTIMAL:
-            return round(self.model.ObjVal)
-        else:
-            raise Exception("unexpected GRB status", self.model.Status)
-
-    def fix_num_refunds(self, n: int) -> Constr:
-        try:
-            return self.constraints["fix_num_refunds"]
-        except KeyError:
-            c = self.model.addConstr(self._sum_refunds() == n)
-            self.constraints["fix_num_refunds"] = c
-            return c
-
-    def unfix_num_refunds(self):
-        try:
-            c = self.constraints.pop("fix_num_refunds")
-        except KeyError:
-            return
-        self.model.remove(c)
-
-    def minimise_turns(self) -> int:
-        logging.info(f"minimise turns (max turns = {len(self.turns)})")
-        self.model.setObjective(self.W.sum(), GRB.MINIMIZE)
-        self.model.optimize()
-        return round(self.model.ObjVal)
-
-    def get_solution(self) -> List:
-        actions = []
-        active_constellations = set()
-        for t in self.turns:
-            if self.W[t].x > .9:
-                added = set()
-                removed = set()
-                for c in self.data.constellations:
-                    if self.Z[c, 1, t].x > .9:
-                        added.add(c)
-                    if self.Z[c, -1, t].x > .9:
-                        removed.add(c)
-
-                if added:
-                    active_constellations |= added
-                    actions.append({
-                        "add": added,
-                        "constellations": active_constellations.copy(),
-                    })
-                if removed:
-                    active_constellations -= removed
-                    actions.append({
-                        "remove": removed,
-                        "constellations": active_constellations.copy(),
-                    })
-
-        for d in actions:
-            d['affinity'] = total_affinity(self.data, d['constellations'])
-            d['points'] = total_points(self.data, d['constellations'])
-
-        return actions
-
-
-def total_affinity(data: Data, cons: Iterable[str]) -> Dict[str, int]:
-    return {a: sum(data.affinity_bonus[c].get(a, 0) for c in cons) for a in data.affinities}
-
-
-def total_points(data: Data, cons: Iterable[str]) -> int:
-    return sum(len(data.constellations[c]) for c in cons)
-
-
-def solve_final_constellation_path(data: Data, config: Config, constellations: Set[str]):
-    previous_sp = None
-    num_prev_refunds = None
-    for turns in TURNS_SCHEDULE:
-        sp = Subproblem(data, config, constellations, turns)
-        num_refunds = sp.minimise_refunds()
-        if num_prev_refunds is not None and num_prev_refunds == num_refunds:
-            previous_sp.fix_num_refunds(num_refunds)
-            previous_sp.minimise_turns()
-            return previous_sp.get_solution()
-
-        previous_sp = sp
-        num_prev_refunds = num_refunds
-
-
-TURNS_SCHEDULE = [4, 8, 12, 20, 30, 60, 200]
-
-
-def grb_callback(model: Model, where: int):
-    if where == GRB.Callback.MIPSOL:
-        data: Data = model._data
-        config: Config = model._config
-        Y = model._Y
-        Yv = model.cbGetSolution(model._Y)
-        target_constellations = {c for c, val in Yv.items() if val > .9}
-        logging.info(f"solving subproblem {target_constellations}", )
-        for turns in TURNS_SCHEDULE:
-            if Subproblem(data, config, target_constellations, turns).is_feasible():
-                logging.info(f"feasible with {turns} turns")
-                break
-            else:
-                logging.warning(f"infeasible with {turns} turns")
-        else:
-            logging.warning("add cut")
-            model.cbLazy(quicksum(Y[c] for c in target_constellations) <= len(target_constellations) - 1)
+    # Print each improving solution as a line of JSON while solving
+    stream: bool = False
 
 
 def insert_straggler_stars(data: Data, config: Config, straggler_stars: List[Star], sp_sol: List):
@@ -268,6 +46,8 @@ def group_stars_by_constellation(stars: Iterable[Star]) -> Dict[str, List[Star]]
 
 
 def _fmt_stragglers(data: Data, stars: Iterable[Star], indent=0) -> str:
+    from termcolor import colored
+
     cons = group_stars_by_constellation(stars)
     lines = []
     for c, stars in sorted(cons.items()):
@@ -306,9 +86,12 @@ def calculate_total_bonus(data: Data, chosen_stars: List[Star]) -> List[Bonus]:
 
 def pretty_print_solution(
         data: Data,
+        config: Config,
         sol: Dict,
         settings: OutputSettings = None
 ):
+    from termcolor import colored
+
     settings = settings or OutputSettings()
     actions = sol['order']
     chosen_stars = sol['stars']
@@ -363,82 +146,277 @@ def pretty_print_solution(
         print(text)
 
 
-def main(data: Data, config: Config, output: OutputSettings):
-    force_stars = config.desired_stars.copy()
-    force_stars.update(data.celestial_power_stars[p] for p in config.celestial_powers)
-
-    with contextlib.redirect_stdout(open(os.devnull, 'w')):
-        model = Model()
-    model._data = data
-    model._config = config
-    if config.log_level > logging.DEBUG:
-        model.setParam('OutputFlag', 0)
-    model.setParam('LazyConstraints', 1)
-    # Amount of each affinity we have
-    Q = {a: model.addVar(name=f"Q[{a}]") for a in data.affinities}
-
-    # Do we take star s?
-    X = {s: model.addVar(vtype=GRB.BINARY, name=f"X[{s.cons},{s.idx}]") for s in data.stars}
-
-    for s in force_stars:
-        X[s].lb = 1
-
-    # do we finish constellation c?
-    Y = {c: model.addVar(vtype=GRB.BINARY, name=f"Y[{c}]") for c in data.constellations}
-    model._Y = Y
-
-    constraints = {}
-    constraints['finish_constellation'] = {
-        s: model.addConstr(Y[s.cons] <= X[s])
-        for s in data.stars
-    }
-
-    constraints['pred'] = {
-        (s1, s2): model.addConstr(X[s1] <= X[s2])
-        for s1, s2 in data.predecessor.items()
-    }
-
-    constraints['affinity_req'] = {
-        (s, a): model.addConstr(X[s] * amount <= Q[a])
-        for s in data.stars
-        for a, amount in data.affinity_req[s.cons].items()
-    }
-
-    constraints['affinity_bonus'] = {
-        a: model.addConstr(Q[a] == quicksum(Y[c] * bonus.get(a, 0) for c, bonus in data.affinity_bonus.items()))
-        for a in data.affinities
-    }
-
-    constraints['num_points'] = model.addConstr(quicksum(X.values()) == config.num_points)
-
-    obj_coeff = calculate_star_objective(data, config)
-    model.setObjective(
-        quicksum(X[s] * c for s, c in obj_coeff.items()
-    ), GRB.MAXIMIZE)
-    model.optimize(grb_callback)
-
-    if model.status == GRB.INFEASIBLE:
-        print("Impossible to satisfy requirements", file=sys.stderr)
-        sys.exit(1)
-
-    chosen_stars = [s for s, var in X.items() if var.x > .9]
-    chosen_stars.sort()
-
-    final_constellations = []
-    for c, var in Y.items():
-        if var.x > .9:
-            final_constellations.append(c)
-        elif all(X[s].x > 0.9 for s in data.constellations[c]):
-            final_constellations.append(c)
+# Returns the solution for `config`, or `None` if the requirements can't be met or `should_stop` returned `True`
+# (see `mip.MasterProblem.solve`).  `env` is the solver environment for the master problem.
+def solve(data: Data, config: Config, pool: 'HorizonPool' = None, heuristic: bool = False,
+          on_incumbent: Callable[['Incumbent'], None] = None, env: 'Env' = None,
+          should_stop: Callable[[], bool] = None) -> Optional[Dict]:
+    cache = None
+    if config.solution_cache:
+        from solcache import SolutionCache
+        cache = SolutionCache()
+        sol = cache.get(config)
+        if sol is not None:
+            return sol
+
+    import mip
+    from feasibility import FeasibilityOracle
+
+    oracle = FeasibilityOracle(data)
+    optimal = False
+    if heuristic:
+        from heuristic import solve_heuristic
+        result = solve_heuristic(data, config, oracle)
+    else:
+        master = mip.MasterProblem(data, config, oracle, pool, env)
+        result = master.solve(on_incumbent, should_stop=should_stop)
+        optimal = master.optimal
+    if result is None or (should_stop is not None and should_stop()):
+        return None
+    chosen_stars, final_constellations = result
+    sol = plan_path(data, config, chosen_stars, final_constellations, oracle, pool)
+    if cache is not None and optimal:
+        cache.put(config, sol)
+    return sol
+
+
+# The solution for the final set of stars `chosen_stars`: the stars and the order to take them in.
+def plan_path(data: Data, config: Config, chosen_stars: List[Star], final_constellations: List[str],
+              oracle: 'FeasibilityOracle', pool: 'HorizonPool' = None) -> Dict:
+    import mip
 
     straggler_stars = [s for s in chosen_stars if s.cons not in final_constellations]
-    order = solve_final_constellation_path(data, config, final_constellations)
+    if config.path_engine == "search":
+        import pathsearch
+        order = pathsearch.solve_final_constellation_path(data, config, final_constellations, oracle, pool)
+    else:
+        order = mip.solve_final_constellation_path(data, config, final_constellations, oracle, pool)
     insert_straggler_stars(data, config, straggler_stars, order)
-    sol = {"stars": chosen_stars, "order": order }
-    if output.json:
+    return {"stars": chosen_stars, "order": order}
+
+
+# Solve `config` for each number of points in `points` in one `session.Session`.  The budgets are solved from the
+# largest down, so the cuts found for one budget stay valid for the next, and each solve starts from the previous
+# budget's solution or final constellations.  Prints a line of JSON per budget as it is solved, or a table at the end.
+def sweep(data: Data, config: Config, points: Iterable[int], output: OutputSettings, pool: 'HorizonPool' = None):
+    from session import Session
+
+    budgets = sorted(set(points), reverse=True)
+    session = Session(data, dataclasses.replace(config, num_points=budgets[0]), pool)
+    rows = []
+    for n in budgets:
+        session.set_num_points(n)
+        result = session.solve()
+        row = {"points": n, "objective": None}
+        if result is not None:
+            row["objective"] = session.objective
+            row["constellations"] = sorted(session.final_constellations)
+            row.update(result)
+        if output.json:
+            print(dumps_json(row), flush=True)
+        rows.append(row)
+        # Fewer points can't help
+        if result is None:
+            break
+
+    if not output.json:
+        print(f"{'Points':>6} {'Objective':>12}  Constellations")
+        for row in reversed(rows):
+            if row["objective"] is None:
+                print(f"{row['points']:>6} {'-':>12}  Impossible to satisfy requirements")
+            else:
+                print(f"{row['points']:>6} {row['objective']:>12.1f}  {', '.join(row['constellations'])}")
+
+
+# Find the `k` best builds whose final constellations are pairwise at least `min_difference` constellations apart
+# (see `mip.MasterProblem.exclude`), best first, by solving one master problem again after cutting off each build
+# found.  The cuts and the oracle carry over, so each path is only checked once.  Prints a line of JSON per build as
+# it is found, or a table at the end.
+def top_builds(data: Data, config: Config, k: int, min_difference: int, output: OutputSettings,
+               pool: 'HorizonPool' = None):
+    import mip
+    from feasibility import FeasibilityOracle
+
+    oracle = FeasibilityOracle(data)
+    master = mip.MasterProblem(data, config, oracle, pool)
+    rows = []
+    for rank in range(1, k + 1):
+        result = master.solve()
+        if result is None:
+            break
+        chosen_stars, final_constellations = result
+        row = {"rank": rank, "objective": master.objective, "constellations": sorted(final_constellations)}
+        row.update(plan_path(data, config, chosen_stars, final_constellations, oracle, pool))
+        if output.json:
+            print(dumps_json(row), flush=True)
+        rows.append(row)
+        master.exclude(final_constellations, min_difference)
+
+    if not rows:
+        fatal("Impossible to satisfy requirements")
+    if len(rows) < k:
+        logging.warning(f"only {len(rows)} builds differ in at least {min_difference} constellations")
+    if not output.json:
+        print(f"{'Rank':>4} {'Objective':>12}  Constellations")
+        for row in rows:
+            print(f"{row['rank']:>4} {row['objective']:>12.1f}  {', '.join(row['constellations'])}")
+
+
+# Returns a callback for `mip.solve_master` which prints each incumbent as a line of JSON.
+def incumbent_printer() -> Callable[['Incumbent'], None]:
+    import time
+    started = time.perf_counter()
+
+    def print_incumbent(incumbent: 'Incumbent'):
+        # Relative gap as Gurobi defines it, unknown for the heuristic's solution and undefined at zero
+        gap = None
+        if incumbent.bound is not None and incumbent.objective != 0:
+            gap = abs(incumbent.bound - incumbent.objective) / abs(incumbent.objective)
+        line = {
+            "objective": incumbent.objective,
+            "gap": gap,
+            "elapsed": time.perf_counter() - started,
+            "stars": incumbent.stars,
+        }
+        print(dumps_json(line), flush=True)
+
+    return print_incumbent
+
+
+_batch_worker = {}
+
+
+def _init_batch_worker(data: Data, backend: Optional[str], threads: int):
+    import os
+    from backend import get_backend
+
+    with contextlib.redirect_stdout(open(os.devnull, 'w')):
+        env = get_backend(backend).Env(empty=True)
+        env.setParam('OutputFlag', 0)
+        env.setParam('Threads', threads)
+        env.start()
+    _batch_worker.update(data=data, env=env)
+
+
+# Solve the config on line `lineno` of a batch file, with the settings `runtime` (fields of `Config`).  Returns the
+# line of output.
+def _batch_job(lineno: int, line: str, runtime: Dict, heuristic: bool) -> str:
+    from configure import config_from_dict
+
+    job_id = lineno
+    try:
+        job = json.loads(line)
+        if isinstance(job, dict) and "config" in job:
+            job_id = job.get("id", lineno)
+            job = job["config"]
+        config = dataclasses.replace(config_from_dict(job), **runtime)
+        sol = solve(_batch_worker['data'], config, heuristic=heuristic, env=_batch_worker['env'])
+    except Exception as e:
+        logging.exception(f"job {job_id} failed")
+        return dumps_json({"id": job_id, "error": f"{type(e).__name__}: {e}"})
+    if sol is None:
+        error = "no solution found by the heuristic" if heuristic else "Impossible to satisfy requirements"
+        return dumps_json({"id": job_id, "solution": None, "error": error})
+    return dumps_json({"id": job_id, "solution": sol})
+
+
+# Solve every config in the file `path` (`-` for stdin) on `workers` processes, printing a line of JSON for each as
+# it finishes: `{"id": ..., "solution": ...}`, or `{"id": ..., "error": ...}` if it failed.  Each line of the file
+# is a config in the schema of `configure.get_config_schema`, identified by its line number, or an object
+# `{"id": ..., "config": {...}}`.
+#
+# The workers are forked after the data is loaded, so they share it.  Only a few lines are read ahead of the
+# workers, so the file can be of any length.  If a worker process dies, the pool is restarted and the jobs that
+# were running are tried again one at a time, so only the job that kills its worker fails.
+def batch(data: Data, path: Path, runtime: Dict, workers: int, threads: int = None, heuristic: bool = False):
+    import concurrent.futures
+    import multiprocessing
+    import os
+    from concurrent.futures.process import BrokenProcessPool
+
+    ctx = multiprocessing.get_context("fork")
+    threads = threads or max(1, (os.cpu_count() or 1) // workers)
+
+    def start_pool() -> concurrent.futures.ProcessPoolExecutor:
+        return concurrent.futures.ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=ctx,
+            initializer=_init_batch_worker,
+            initargs=(data, runtime.get("backend"), threads),
+        )
+
+    executor = start_pool()
+    # Maps each running job to its line and whether it is running alone
+    pending = {}
+    # Jobs running when a worker died, to be tried again one at a time
+    suspects = []
+    fp = sys.stdin if str(path) == "-" else open(path)
+    with fp:
+        lines = ((lineno, line) for lineno, line in enumerate(fp, 1) if line.strip())
+        while True:
+            # A suspect keeps the pool to itself until it finishes, so that it is only blamed for its own death
+            limit = 1 if suspects or any(alone for _, _, alone in pending.values()) else 2 * workers
+            while len(pending) < limit:
+                if suspects:
+                    lineno, line = suspects.pop()
+                else:
+                    try:
+                        lineno, line = next(lines)
+                    except StopIteration:
+                        break
+                pending[executor.submit(_batch_job, lineno, line, runtime, heuristic)] = (lineno, line, limit == 1)
+            if not pending:
+                break
+
+            done, _ = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+            broken = False
+            for f in done:
+                lineno, line, alone = pending.pop(f)
+                try:
+                    print(f.result(), flush=True)
+                except BrokenProcessPool:
+                    broken = True
+                    if alone:
+                        print(dumps_json({"id": lineno, "error": "worker process died"}), flush=True)
+                    else:
+                        suspects.append((lineno, line))
+            if broken:
+                suspects.extend((lineno, line) for lineno, line, _ in pending.values())
+                pending.clear()
+                executor.shutdown(wait=False)
+                executor = start_pool()
+
+    executor.shutdown()
+
+
+def main(data: Data, config: Config, output: OutputSettings, workers: int = 1, threads: int = None,
+         heuristic: bool = False, sweep_points: Sequence[int] = None, top: int = None, min_difference: int = 1):
+    if workers > 1:
+        from racing import HorizonPool
+        pool_context = HorizonPool(data, workers, threads, config.backend)
+    else:
+        pool_context = contextlib.nullcontext()
+
+    on_incumbent = incumbent_printer() if output.stream else None
+    with pool_context as pool:
+        if sweep_points:
+            sweep(data, config, sweep_points, output, pool)
+            return
+        if top:
+            top_builds(data, config, top, min_difference, output, pool)
+            return
+        sol = solve(data, config, pool, heuristic, on_incumbent)
+    if sol is None and heuristic:
+        fatal("The heuristic found no solution meeting the requirements; run without --heuristic to solve exactly")
+    if sol is None:
+        fatal("Impossible to satisfy requirements")
+
+    if output.stream:
+        print(dumps_json(sol), flush=True)
+    elif output.json:
         print(dumps_json(sol))
     else:
-        pretty_print_solution(data, sol, output)
+        pretty_print_solution(data, config, sol, output)
 
 if __name__ == '__main__':
     import argparse
@@ -449,10 +427,76 @@ if __name__ == '__main__':
     p.add_argument('-a', "--all", action='store_true', help="List all bonuses obtained.")
     p.add_argument("-l", "--load",type=Path, default=None, help='Load an existing solution from a JSON file')
     p.add_argument('--json', action='store_true', help='Output as JSON')
+    p.add_argument('-j', '--workers', type=int, default=1,
+                   help='Solve path subproblems for several horizons at once on this many processes '
+                        '(with --batch: solve this many configs at once)')
+    p.add_argument('--threads', type=int, default=None,
+                   help='Number of threads each worker process may use (default: divide the CPUs evenly)')
+    p.add_argument('--backend', choices=BACKENDS, default=None,
+                   help='MIP solver to use (default: gurobi if installed, otherwise highs)')
+    p.add_argument('--path-engine', choices=['mip', 'search'], default='mip',
+                   help='Plan the path to the final constellations with the MIP or with a combinatorial search')
+    p.add_argument('--max-horizon', type=int, default=200, metavar='TURNS',
+                   help='Longest path to consider, in turns; builds needing longer paths are treated as unreachable')
+    p.add_argument('--no-presolve', action='store_true', help="Don't shrink the master problem before solving it")
+    p.add_argument('--no-cut-pool', action='store_true',
+                   help="Don't use or extend the pool of unreachable constellation sets kept in .cache/cuts")
+    p.add_argument('--no-shrink-cuts', action='store_true',
+                   help="Cut off each unreachable set of constellations as found, without shrinking it to a minimal core")
+    p.add_argument('--no-user-cuts', action='store_true',
+                   help="Don't separate affinity and point-budget cuts at the nodes of the master problem")
+    p.add_argument('--heuristic', action='store_true',
+                   help='Find a good solution quickly with a local search instead of solving the master problem')
+    p.add_argument('--time-limit', type=float, default=None,
+                   help='Stop solving after this many seconds and use the best solution found')
+    p.add_argument('--stream', action='store_true',
+                   help='Print each improving solution as a line of JSON (objective, gap, elapsed seconds, stars) '
+                        'as it is found, then the final solution')
+    p.add_argument('--sweep', type=int, nargs=2, metavar=('LOW', 'HIGH'), default=None,
+                   help='Solve for every number of points from LOW to HIGH, reusing the master problem, and print '
+                        'a table of the builds (or a line of JSON per build with --json)')
+    p.add_argument('--top', type=int, default=None, metavar='K',
+                   help='Find the K best builds, each completing a different set of constellations, and print a '
+                        'table of them (or a line of JSON per build with --json)')
+    p.add_argument('--min-difference', type=int, default=1, metavar='D',
+                   help='With --top, make the sets of completed constellations of any two builds differ in at '
+                        'least D constellations')
+    p.add_argument('--no-solution-cache', action='store_true',
+                   help="Don't look up or store solutions in .cache/solutions")
+    p.add_argument('--batch', type=Path, default=None, metavar='JOBS',
+                   help='Solve every config in JOBS, a file with a config in JSON on each line (- for stdin), and '
+                        'print a line of JSON with the id and solution of each as it finishes')
+    p.add_argument('--weapon-sets', nargs='+', default=[], metavar='WEAPONS',
+                   help='Alternative weapon loadouts to compare, each a comma separated list of weapon types')
+    p.add_argument('--power-sets', nargs='+', default=[], metavar='POWERS',
+                   help='Alternative sets of celestial powers to compare, each a comma separated list of powers '
+                        '("" for none).  Every combination with --weapon-sets is solved, this many at once with -j, '
+                        'and a table of them is printed best first (or a line of JSON per combination with --json)')
+    p.add_argument('--no-mip-start', action='store_true',
+                   help="Don't start the master problem from the local search's solution")
 
     args = p.parse_args()
 
-    config = configure.load_config_or_exit(args.config)
+    # Settings for how to solve, rather than what
+    runtime = dict(
+        backend=args.backend,
+        path_engine=args.path_engine,
+        max_horizon=args.max_horizon,
+        presolve=not args.no_presolve,
+        cut_pool=not args.no_cut_pool,
+        shrink_cuts=not args.no_shrink_cuts,
+        user_cuts=not args.no_user_cuts,
+        mip_start=not args.no_mip_start,
+        time_limit=args.time_limit,
+        solution_cache=not args.no_solution_cache,
+    )
+    if args.batch:
+        logging.basicConfig(level=logging.ERROR)
+        logging.getLogger("gurobipy").setLevel(logging.CRITICAL)
+        batch(Data.load(), args.batch, runtime, args.workers, args.threads, args.heuristic)
+        sys.exit(0)
+
+    config = dataclasses.replace(configure.load_config_or_exit(args.config), **runtime)
     # config.log_level = logging.DEBUG
     logging.basicConfig(level=config.log_level)
     logging.getLogger("gurobipy").setLevel(logging.CRITICAL)
@@ -460,11 +504,28 @@ if __name__ == '__main__':
     output = OutputSettings(
         show_all_bonuses=args.all,
         json=args.json,
+        stream=args.stream,
     )
 
     data = Data.load()
-    if args.load:
+    if args.weapon_sets or args.power_sets:
+        import alternatives
+
+        def split(s: str) -> List[str]:
+            return [x.strip() for x in s.split(',') if x.strip()]
+        try:
+            configs = alternatives.combinations(data, config, [split(s) for s in args.weapon_sets],
+                                                [split(s) for s in args.power_sets])
+        except ValueError as e:
+            fatal(str(e))
+        on_row = (lambda row: print(dumps_json(row), flush=True)) if output.json else None
+        rows = alternatives.solve_combinations(data, configs, args.workers, args.threads, on_row)
+        if not output.json:
+            alternatives.print_table(rows)
+    elif args.load:
         sol = load_json(args.load)
-        pretty_print_solution(data, sol, output)
+        pretty_print_solution(data, config, sol, output)
     else:
-        main(data, config, output)
+        sweep_points = range(args.sweep[0], args.sweep[1] + 1) if args.sweep else None
+        main(data, config, output, args.workers, args.threads, args.heuristic, sweep_points, args.top,
+             args.min_difference)
@@ -0,0 +1,39 @@
+import sys
+from pathlib import Path
+from typing import *
+
+import pytest
+
+# The scripts import each other as top-level modules
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from common import Config, Data, data_index
+
+
+@pytest.fixture(scope="session")
+def data() -> Data:
+    return Data.load()
+
+
+# Builds small configs that work with any data dump: every weapon type, and unit weights on the selectable bonus
+# kinds given by the most stars.  Paths are limited to 16 turns, plenty for these budgets, so that proving a set
+# unreachable stays cheap.  Nothing is read from or written to the on-disk caches.
+@pytest.fixture(scope="session")
+def make_config(data: Data) -> Callable[..., Config]:
+    index = data_index(data)
+    kinds = sorted(data.selectable_bonus_kinds & index.bonus_stars.keys(), key=lambda k: -len(index.bonus_stars[k]))
+
+    def make(num_points: int = 20, celestial_powers: Iterable[str] = (), **runtime) -> Config:
+        runtime.setdefault("max_horizon", 16)
+        runtime.setdefault("cut_pool", False)
+        runtime.setdefault("solution_cache", False)
+        return Config(
+            objective={k: 1.0 for k in kinds[:3]},
+            desired_stars=set(),
+            weapons=set(data.weapon_types),
+            celestial_powers=set(celestial_powers),
+            num_points=num_points,
+            **runtime,
+        )
+
+    return make
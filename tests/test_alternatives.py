@@ -0,0 +1,60 @@
+import dataclasses
+
+import pytest
+
+import mip
+from alternatives import combinations, optimistic_bound, solve_combinations
+
+
+def test_combinations(data, make_config):
+    config = make_config()
+    weapons = sorted(data.weapon_types)
+    powers = sorted(data.celestial_power_stars)
+    configs = combinations(data, config, [weapons[:1], weapons[1:3]], [[], powers[:1]])
+    assert [(c.weapons, c.celestial_powers) for c in configs] == [
+        (set(weapons[:1]), set()), (set(weapons[:1]), set(powers[:1])),
+        (set(weapons[1:3]), set()), (set(weapons[1:3]), set(powers[:1])),
+    ]
+    assert all(c.num_points == config.num_points and c.objective == config.objective for c in configs)
+    assert combinations(data, config, [], []) == [config]
+
+    with pytest.raises(ValueError, match="weapon"):
+        combinations(data, config, [["no such weapon"]], [])
+    with pytest.raises(ValueError, match="celestial power"):
+        combinations(data, config, [], [["no such power"]])
+
+
+# Each combination gets the objective it would get alone, except those whose LP bound can't beat a better one
+def test_solve_combinations(data, make_config):
+    config = make_config(num_points=10)
+    weapons = sorted(data.weapon_types)
+    configs = combinations(data, config, [weapons, weapons[:1], []], [])
+    # With one point, the LP bound is below the best objective of ten points
+    hopeless = dataclasses.replace(config, num_points=1)
+    rows = solve_combinations(data, configs + [hopeless], workers=1, threads=1)
+    assert len(rows) == 4
+
+    expected = {}
+    for c in configs:
+        master = mip.MasterProblem(data, c)
+        master.solve()
+        expected[tuple(sorted(c.weapons))] = master.objective
+    best = max(expected.values())
+
+    assert rows[0]["objective"] == pytest.approx(best)
+    for row in rows:
+        if row["status"] == "optimal":
+            assert row["objective"] == pytest.approx(expected[tuple(row["weapons"])])
+            assert row["bound"] >= row["objective"] - 1e-6
+        else:
+            assert row["status"] == "pruned" and row["objective"] is None and row["bound"] <= best + 1e-6
+    assert [row["status"] for row in rows].count("pruned") >= 1
+    assert rows[-1]["status"] == "pruned"
+
+
+def test_optimistic_bound(data, make_config):
+    config = make_config(num_points=10)
+    assert optimistic_bound(data, config) >= optimistic_bound(data, dataclasses.replace(config, num_points=5))
+    master = mip.MasterProblem(data, config)
+    master.solve()
+    assert optimistic_bound(data, config) >= master.objective - 1e-6
@@ -0,0 +1,38 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from mip import MasterProblem
+from solve import solve
+
+pytest.importorskip("gurobipy")
+pytest.importorskip("scipy")
+
+
+@pytest.mark.parametrize("num_points", [8, 12])
+def test_highs_matches_gurobi(data, make_config, num_points):
+    objectives = {}
+    for backend in ("gurobi", "highs"):
+        master = MasterProblem(data, make_config(num_points=num_points, backend=backend))
+        result = master.solve()
+        assert result is not None
+        assert master.optimal
+        objectives[backend] = master.objective
+    assert objectives["highs"] == pytest.approx(objectives["gurobi"])
+
+
+def test_highs_plans_a_path(data, make_config):
+    config = make_config(backend="highs")
+    sol = solve(data, config)
+    assert sol is not None
+    assert len(set(sol["stars"])) <= config.num_points
+
+
+# The solvers are only loaded once they are needed
+def test_solver_not_imported_at_startup():
+    code = "import sys, solve, info; print(sorted({'gurobipy', 'scipy.optimize'} & sys.modules.keys()))"
+    out = subprocess.run([sys.executable, "-c", code], cwd=Path(__file__).resolve().parent.parent,
+                         capture_output=True, text=True, check=True).stdout
+    assert out.strip() == "[]"
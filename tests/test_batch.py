@@ -0,0 +1,45 @@
+import json
+import os
+import time
+from pathlib import Path
+
+import solve
+
+
+# Stands in for `solve._batch_job` in the workers.  A job with "crash": "always" kills its worker, and one with
+# "crash": "once" only the first time it runs.  Jobs are identified by their line number, like those without an id.
+def _job(lineno, line, runtime, heuristic):
+    job = json.loads(line)
+    crash = job.get("crash")
+    if crash == "always" or crash == "once" and not os.path.exists(job["marker"]):
+        if crash == "once":
+            Path(job["marker"]).touch()
+        os._exit(1)
+    time.sleep(job.get("sleep", 0))
+    return json.dumps({"id": lineno, "solution": "ok"})
+
+
+def _run_batch(data, jobs, tmp_path, monkeypatch, capsys, workers=2):
+    monkeypatch.setattr(solve, "_batch_job", _job)
+    path = tmp_path / "jobs.jsonl"
+    path.write_text("".join(json.dumps(job) + "\n" for job in jobs))
+    solve.batch(data, path, {"backend": "highs"}, workers, threads=1)
+    results = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert sorted(r["id"] for r in results) == list(range(1, len(jobs) + 1))
+    return [r.get("error") for r in sorted(results, key=lambda r: r["id"])]
+
+
+def test_worker_death(data, tmp_path, monkeypatch, capsys):
+    jobs = [{"sleep": 0.1}] * 8
+    jobs[3] = {"crash": "always"}
+    errors = _run_batch(data, jobs, tmp_path, monkeypatch, capsys)
+    assert errors == [None] * 3 + ["worker process died"] + [None] * 4
+
+
+# Suspects run alone until they finish, so a job started after the last one which kills the pool doesn't get it
+# blamed
+def test_suspect_runs_alone(data, tmp_path, monkeypatch, capsys):
+    marker = str(tmp_path / "crashed")
+    jobs = [{"crash": "once", "marker": marker}] + [{"sleep": 0.5}] * 3 + [{"crash": "always"}, {"sleep": 0.1}]
+    errors = _run_batch(data, jobs, tmp_path, monkeypatch, capsys)
+    assert errors == [None] * 4 + ["worker process died", None]
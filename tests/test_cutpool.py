@@ -0,0 +1,52 @@
+import pytest
+
+import mip
+from cutpool import CutPool
+
+
+def test_persistence(tmp_path):
+    pool = CutPool(20, 16, version="test", directory=tmp_path)
+    pool.add({"a", "b"})
+    pool.add({"a", "b", "c"})
+    pool.add({"d"})
+    assert pool.covers({"a", "b", "e"}) and not pool.covers({"a", "c"})
+    assert pool.path(20).read_text().splitlines() == ['["a", "b"]', '["d"]']
+
+    with open(pool.path(20), "a") as fp:
+        fp.write('["e", ')
+    CutPool(30, 16, version="test", directory=tmp_path).add({"f"})
+    CutPool(10, 16, version="test", directory=tmp_path).add({"g"})
+
+    # Sets unreachable with more points are unreachable with fewer, but not the other way around
+    assert CutPool(20, 16, version="test", directory=tmp_path).sets == {frozenset("ab"), frozenset("d"), frozenset("f")}
+    assert CutPool(30, 16, version="test", directory=tmp_path).sets == {frozenset("f")}
+    assert CutPool(20, 32, version="test", directory=tmp_path).sets == set()
+    assert CutPool(20, 16, version="other", directory=tmp_path).sets == set()
+
+
+# Sets found unreachable by one solve are cut off up front by the next, so they are never checked again
+def test_cuts_are_reused(data, make_config, tmp_path, monkeypatch):
+    monkeypatch.setattr(mip, "CutPool", lambda n, h: CutPool(n, h, version="test", directory=tmp_path))
+    checked = []
+    is_reachable = mip.is_reachable
+
+    def record(data, config, target, *args, **kwargs):
+        checked.append(frozenset(target))
+        return is_reachable(data, config, target, *args, **kwargs)
+
+    monkeypatch.setattr(mip, "is_reachable", record)
+    # A short horizon leaves some final sets out of reach
+    config = make_config(num_points=10, max_horizon=4, cut_pool=True)
+    first = mip.MasterProblem(data, config)
+    first.solve()
+    pool = CutPool(10, 4, version="test", directory=tmp_path)
+    if not pool.sets:
+        pytest.skip("no unreachable set found with this data")
+    assert all(pool.covers(cut) for cut in first.cuts)
+
+    checked.clear()
+    second = mip.MasterProblem(data, config)
+    second.solve()
+    assert set(pool.sets) <= set(second.cuts)
+    assert not any(pool.covers(target) for target in checked)
+    assert second.objective == pytest.approx(first.objective)
@@ -0,0 +1,75 @@
+import pytest
+
+import mip
+from common import total_points
+from feasibility import FeasibilityOracle
+from horizon import turn_lower_bound
+
+
+@pytest.fixture
+def counted_subproblems(monkeypatch):
+    built = []
+    subproblem = mip.Subproblem
+
+    def build(*args, **kwargs):
+        sp = subproblem(*args, **kwargs)
+        built.append(sp)
+        return sp
+
+    monkeypatch.setattr(mip, "Subproblem", build)
+    return built
+
+
+# Pairs of constellations with no path within the horizon, though `turn_lower_bound` doesn't rule them out: a
+# constellation which can't be reached alone, and a cheap one to go with it
+def _unreachable_pairs(data, config, limit=3):
+    oracle = FeasibilityOracle(data)
+    cheap = sorted(data.constellations, key=lambda c: (len(data.constellations[c]), c))
+    pairs = []
+    for c in sorted(data.constellations):
+        if turn_lower_bound(data, {c}, config.num_points) is None or mip.is_reachable(data, config, {c}, oracle):
+            continue
+        for d in cheap:
+            target = {c, d}
+            if d != c and total_points(data, target) <= config.num_points and (
+                    turn_lower_bound(data, target, config.num_points) is not None):
+                pairs.append(target)
+                break
+        if len(pairs) >= limit:
+            break
+    return pairs
+
+
+def test_unreachable_core(data, make_config):
+    config = make_config(num_points=10)
+    targets = _unreachable_pairs(data, config)
+    if not targets:
+        pytest.skip("no unreachable pair of constellations with this data")
+    upper = mip.turn_upper_bound(data, config.num_points, config.max_horizon)
+
+    def assert_core(core, target):
+        assert core and core <= target
+        sp = mip.Subproblem(data, config, core, upper)
+        sp.require_final(core)
+        assert not sp.is_feasible()
+
+    for target in targets:
+        assert not mip.is_reachable(data, config, target, FeasibilityOracle(data))
+        assert_core(mip.unreachable_core(data, config, target, upper), target)
+
+
+# The core is found on the Subproblem which showed the target unreachable, rather than on a new one
+def test_core_reuses_proof(data, make_config, counted_subproblems):
+    config = make_config(num_points=10)
+    targets = _unreachable_pairs(data, config, limit=1)
+    if not targets:
+        pytest.skip("no unreachable pair of constellations with this data")
+    upper = mip.turn_upper_bound(data, config.num_points, config.max_horizon)
+
+    counted_subproblems.clear()
+    proofs = []
+    assert not mip.is_reachable(data, config, targets[0], FeasibilityOracle(data), proofs=proofs)
+    assert len(proofs) == 1 and len(counted_subproblems) == 1
+    core = mip.unreachable_core(data, config, targets[0], upper, proofs[0])
+    assert core <= targets[0]
+    assert len(counted_subproblems) == 1
@@ -0,0 +1,61 @@
+import dataclasses
+import json
+
+import pytest
+
+import mip
+from evaluate import evaluate_star_sets, evaluate_stream
+
+
+@pytest.fixture(scope="module")
+def solved(data, make_config):
+    config = make_config(num_points=20)
+    master = mip.MasterProblem(data, config)
+    stars, _ = master.solve()
+    return config, set(stars), master.objective
+
+
+def test_solution_is_legal(data, solved):
+    config, stars, objective = solved
+    ev = evaluate_star_sets(data, config, [stars, set()])
+    assert list(ev.legal) == [True, True]
+    assert ev.objective[0] == pytest.approx(objective)
+    assert list(ev.points) == [len(stars), 0]
+
+
+def test_problems(data, solved):
+    config, stars, _ = solved
+    successor = next(iter(data.predecessor))
+    needy = next(s for s in data.stars if s not in data.predecessor and any(data.affinity_req[s.cons].values()))
+    power = sorted(data.celestial_power_stars)[0]
+    config = dataclasses.replace(config, celestial_powers={power})
+    star_sets = [
+        {successor},
+        {needy},
+        set(data.stars),
+        stars - {data.celestial_power_stars[power]},
+    ]
+    ev = evaluate_star_sets(data, config, star_sets)
+    assert not ev.legal.any()
+    assert ev.missing_predecessors[0] > 0
+    assert ev.affinity_deficit[1].sum() > 0 and ev.missing_predecessors[1] == 0
+    assert ev.points[2] > config.num_points
+    assert ev.missing_required[3] == 1
+
+
+def test_stream(data, solved):
+    config, stars, objective = solved
+    first = sorted(stars)[0]
+    lines = [
+        json.dumps({"id": "best", "stars": [[s.cons, s.idx] for s in sorted(stars)]}),
+        "",
+        json.dumps([{"cons": first.cons, "idx": first.idx}]),
+        json.dumps([[first.cons, 1000]]),
+        "not json",
+    ]
+    results = list(evaluate_stream(data, config, lines, batch_size=2))
+    assert [r["index"] for r in results] == [0, 1, 2, 3]
+    assert results[0]["id"] == "best" and results[0]["legal"] and results[0]["problems"] == []
+    assert results[0]["objective"] == pytest.approx(objective)
+    assert "id" not in results[1] and results[1]["points"] == 1
+    assert "error" in results[2] and "error" in results[3]
@@ -0,0 +1,82 @@
+import pytest
+
+import mip
+from feasibility import FeasibilityOracle, check_path
+
+
+# Constellations without requirements, smallest first, so that paths through them can be written by hand
+@pytest.fixture(scope="module")
+def free(data):
+    free = sorted((c for c in data.constellations if not any(data.affinity_req[c].values())),
+                  key=lambda c: (len(data.constellations[c]), c))
+    if len(free) < 2:
+        pytest.skip("fewer than two constellations without requirements")
+    return free
+
+
+def test_more_points(data, free):
+    target = {free[0], free[1]}
+    n = len(data.constellations[free[0]]) + len(data.constellations[free[1]])
+    witness = [(frozenset(target), frozenset())]
+    assert check_path(data, n, witness, target)
+
+    oracle = FeasibilityOracle(data)
+    oracle.record_feasible(target, n, witness)
+    for more in (n, n + 5):
+        known = oracle.lookup(target, more)
+        assert known.feasible is True and known.witness == witness and known.turns == 1
+    assert oracle.lookup(target, n - 1).feasible is None
+    assert (oracle.hits, oracle.misses) == (2, 1)
+
+
+def test_fewer_points(data, free):
+    target = {free[0]}
+    oracle = FeasibilityOracle(data)
+    oracle.record_infeasible(target, 10, 8)
+    known = oracle.lookup(target, 9)
+    assert known.feasible is None and known.infeasible_horizon == 8
+
+    oracle.record_infeasible(target, 10, 16, final=True)
+    known = oracle.lookup(target, 9)
+    assert known.feasible is False and known.infeasible_horizon == 16
+    known = oracle.lookup(target, 11)
+    assert known.feasible is None and known.infeasible_horizon == 0
+
+
+# A path to a subset is found by leaving out the extra constellations on the final turn, then remembered
+def test_subset(data, free):
+    target = set(free[:2])
+    n = len(data.constellations[free[0]]) + len(data.constellations[free[1]])
+    oracle = FeasibilityOracle(data)
+    oracle.record_feasible(target, n, [(frozenset(free[:1]), frozenset()), (frozenset(free[1:2]), frozenset())])
+
+    assert oracle.lookup({free[1]}, n - 1).feasible is None
+    known = oracle.lookup({free[1]}, n)
+    assert known.feasible is True
+    assert check_path(data, n, known.witness, {free[1]})
+    assert oracle.records[frozenset({free[1]}), n].witness == known.witness
+
+
+# Verdicts are remembered between calls, so no Subproblem is solved twice for the same question
+def test_verdicts_are_reused(data, make_config, monkeypatch):
+    built = []
+    subproblem = mip.Subproblem
+
+    def build(*args, **kwargs):
+        built.append(args[2])
+        return subproblem(*args, **kwargs)
+
+    monkeypatch.setattr(mip, "Subproblem", build)
+    config = make_config(num_points=10)
+    oracle = FeasibilityOracle(data)
+    targets = sorted(({c} for c in data.constellations), key=lambda target: sorted(target))
+    verdicts = [mip.is_reachable(data, config, target, oracle) for target in targets]
+    assert built
+
+    built.clear()
+    assert [mip.is_reachable(data, config, target, oracle) for target in targets] == verdicts
+    fewer = make_config(num_points=8)
+    for target, reachable in zip(targets, verdicts):
+        if not reachable:
+            assert not mip.is_reachable(data, fewer, target, oracle)
+    assert built == []
@@ -0,0 +1,49 @@
+import pytest
+
+import pathsearch
+from common import total_affinity
+from heuristic import solve_heuristic
+from mip import MasterProblem
+from objective import objective_matrix
+
+
+# Celestial powers whose star's constellation has requirements the power's own stars don't meet
+def _powers_needing_affinity(data, limit=3):
+    powers = []
+    for name, star in sorted(data.celestial_power_stars.items()):
+        c = star.cons
+        affinity = total_affinity(data, [c])
+        if any(d > affinity[a] for a, d in data.affinity_req[c].items()):
+            powers.append(name)
+    return powers[:limit]
+
+
+def test_heuristic_without_powers(data, make_config):
+    config = make_config()
+    result = solve_heuristic(data, config)
+    if result is None:
+        pytest.skip("the heuristic found nothing within its time limit")
+    stars, final = result
+    assert len(set(stars)) <= config.num_points
+    assert pathsearch.solve_final_constellation_path(data, config, final) is not None
+
+
+@pytest.mark.parametrize("power_index", range(3))
+def test_heuristic_finds_solution_with_power(data, make_config, power_index):
+    powers = _powers_needing_affinity(data)
+    if power_index >= len(powers):
+        pytest.skip("not enough celestial powers with affinity requirements")
+    config = make_config(celestial_powers=[powers[power_index]])
+
+    exact = MasterProblem(data, config).solve()
+    # Whether the heuristic finds anything within its time limit depends on timing, but what it finds must be valid
+    result = solve_heuristic(data, config)
+    if result is None:
+        return
+    assert exact is not None
+
+    stars, final = result
+    assert data.celestial_power_stars[powers[power_index]] in stars
+    assert pathsearch.solve_final_constellation_path(data, config, final) is not None
+    objective = objective_matrix(data).star_objective(config)
+    assert sum(objective.get(s, 0) for s in stars) <= sum(objective.get(s, 0) for s in exact[0]) + 1e-6
@@ -0,0 +1,44 @@
+import logging
+from fractions import Fraction
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("scipy")
+
+import highs
+from highs import GRB
+
+
+def _model():
+    model = highs.Model()
+    model.setParam("OutputFlag", 0)
+    return model
+
+
+# Any real number can be a coefficient, including those out of numpy arrays
+def test_real_coefficients():
+    model = _model()
+    x = model.addVar(ub=4, vtype=GRB.INTEGER)
+    y = model.addVar(ub=4, vtype=GRB.INTEGER)
+    objective = np.float32(2) * x + y * np.int64(3) + np.int64(1)
+    assert objective.coeffs == {x.index: 2, y.index: 3} and objective.constant == 1
+    half = highs.quicksum([x * Fraction(1, 2), Fraction(1, 2)])
+    assert half.coeffs == {x.index: 0.5} and half.constant == 0.5
+
+    model.addConstr(x + y <= np.int64(5))
+    model.setObjective(objective, GRB.MAXIMIZE)
+    model.optimize()
+    assert model.Status == GRB.OPTIMAL
+    assert (model.ObjVal, x.X, y.X) == (15, 1, 4)
+
+
+def test_mip_start_is_ignored(caplog):
+    model = _model()
+    x = model.addVar(vtype=GRB.BINARY)
+    model.setObjective(x, GRB.MAXIMIZE)
+    x.Start = 0
+    with caplog.at_level(logging.DEBUG):
+        model.optimize()
+    assert model.ObjVal == 1
+    assert "MIP start" in caplog.text
@@ -0,0 +1,45 @@
+import mip
+from cutpool import CutPool
+from horizon import search_horizon, turn_lower_bound, turn_upper_bound
+
+
+def test_turn_upper_bound(data):
+    single = sum(len(stars) == 1 for stars in data.constellations.values())
+    assert turn_upper_bound(data, 1, 200) == single
+    assert turn_upper_bound(data, 55, 200) == 200
+    assert turn_upper_bound(data, 55, 16) == 16
+    bounds = [turn_upper_bound(data, n, 200) for n in range(1, 30)]
+    assert bounds == sorted(bounds)
+
+
+def test_turn_lower_bound(data):
+    assert turn_lower_bound(data, set(), 10) == 0
+    assert turn_lower_bound(data, set(data.constellations), 10) is None
+
+
+def test_search_horizon():
+    def search(smallest, upper, minimal=True):
+        checked = []
+
+        def check(h):
+            checked.append(h)
+            return h if h >= smallest else None
+        return search_horizon(check, 0, upper, minimal=minimal), checked
+
+    assert search(13, 200) == (13, [4, 8, 16, 12, 14, 13])
+    assert search(13, 200, minimal=False) == (16, [4, 8, 16])
+    horizon, checked = search(300, 200)
+    assert horizon is None and checked == [4, 8, 16, 32, 64, 128, 200]
+    assert search_horizon(lambda h: h, 20, 20) is None
+
+
+# Sets with no path within `max_horizon` turns are cut off as unreachable, which doesn't stop the solution from
+# being optimal, and the cuts are kept in the pool
+def test_cuts_are_final(data, make_config, tmp_path, monkeypatch):
+    monkeypatch.setattr(mip, "CutPool", lambda n, h: CutPool(n, h, version="test", directory=tmp_path))
+    for shrink_cuts in (False, True):
+        master = mip.MasterProblem(data, make_config(num_points=10, cut_pool=True, shrink_cuts=shrink_cuts))
+        assert master.solve() is not None
+        assert master.optimal
+        pool = CutPool(10, 16, version="test", directory=tmp_path)
+        assert all(pool.covers(cut) for cut in master.cuts)
@@ -0,0 +1,32 @@
+import dataclasses
+
+import pytest
+
+import common
+from common import DataIndex, TokenIndex, data_index, filter_strings, load_snapshot
+
+
+@pytest.mark.parametrize("patterns", [
+    [], ["aeth"], ["damage"], ["Damage.Cold"], ["cold", "fire"], ["modifier cold"], ["^X"], ["nothing like this"],
+])
+def test_search_matches_filter_strings(data, patterns):
+    texts = {k: data.bonus_kinds_info[k]['display'] for k in sorted(data.selectable_bonus_kinds)}
+    index = TokenIndex.build(texts.items())
+    assert index.search(patterns) == filter_strings(texts, patterns, key=texts.__getitem__)
+
+
+def test_snapshot_index(data):
+    assert data_index(data) is load_snapshot()['index']
+
+
+# A `Data` which didn't come from the snapshot gets an index of its own, without loading the snapshot
+def test_index_of_other_data(data, monkeypatch):
+    def unexpected(*args, **kwargs):
+        raise AssertionError("the snapshot was loaded")
+
+    monkeypatch.setattr(common, "load_snapshot", unexpected)
+    other = dataclasses.replace(data, affinity_bonus={c: {} for c in data.affinity_bonus})
+    index = data_index(other)
+    assert index is not data_index(data)
+    assert all(not rows for rows in index.affinity_constellations.values())
+    assert index.bonus_stars == DataIndex.build(data).bonus_stars
@@ -0,0 +1,50 @@
+import argparse
+import json
+import re
+
+import pytest
+
+import info
+from common import data_index, star_contributions
+
+
+def _rows(capsys, command, *patterns):
+    command(argparse.Namespace(pattern=list(patterns), json=True))
+    return json.loads(capsys.readouterr().out)
+
+
+def test_givers(data, capsys):
+    kind = max(data_index(data).bonus_stars, key=lambda k: len(data_index(data).bonus_stars[k]))
+    rows = _rows(capsys, info.bonus_stars, kind)
+
+    values = {}
+    for s, k, val in star_contributions(data):
+        if k == kind:
+            values[f"{s.cons} {s.idx}"] = values.get(f"{s.cons} {s.idx}", 0) + val
+    assert {row["Bonus"] for row in rows} == {kind}
+    assert sorted(row["Star"] for row in rows) == sorted(values)
+    shown = [float(row["Value"]) for row in rows]
+    assert shown == sorted(shown, reverse=True)
+    for row in rows:
+        assert float(row["Value"]) == pytest.approx(values[row["Star"]], abs=0.005)
+
+
+# A description selects every bonus kind it matches, like `info.py bonus`
+def test_givers_by_description(data, capsys):
+    kind = sorted(data.selectable_bonus_kinds & data_index(data).bonus_stars.keys())[0]
+    display = data.bonus_kinds_info[kind]['display']
+    rows = _rows(capsys, info.bonus_stars, re.escape(display))
+    assert kind in {row["Bonus"] for row in rows}
+
+
+def test_affinity(data, capsys):
+    rows = _rows(capsys, info.affinity_constellations)
+    for a in data.affinities:
+        expected = {c: bonus[a] for c, bonus in data.affinity_bonus.items() if bonus.get(a, 0) > 0}
+        shown = [row for row in rows if row["Affinity"] == a]
+        assert {row["Constellation"]: row["Bonus"] for row in shown} == expected
+        assert [row["Bonus"] for row in shown] == sorted(expected.values(), reverse=True)
+        assert all(row["Stars"] == len(data.constellations[row["Constellation"]]) for row in shown)
+
+    a = sorted(data.affinities)[0]
+    assert {row["Affinity"] for row in _rows(capsys, info.affinity_constellations, f"^{a}$")} == {a}
@@ -0,0 +1,28 @@
+import dataclasses
+
+import pytest
+
+from common import calculate_bonus_objective, calculate_star_objective, star_bonuses_meet_weapon_req
+
+
+# The coefficients bonus by bonus, as the master problem used to compute them
+def _reference(data, config):
+    obj = {}
+    for s, blist in star_bonuses_meet_weapon_req(data, config).items():
+        coeff = sum(calculate_bonus_objective(config, b) for b in blist)
+        if coeff > 0:
+            obj[s] = coeff
+    return obj
+
+
+@pytest.mark.parametrize("num_weapons", [0, 1, 2, None])
+def test_star_objective(data, make_config, num_weapons):
+    config = make_config()
+    config.weapons = set(sorted(data.weapon_types)[:num_weapons])
+    for objective in (config.objective, {k: i + 1.5 for i, k in enumerate(sorted(data.bonus_kinds))}, {}):
+        config = dataclasses.replace(config, objective=objective)
+        expected = _reference(data, config)
+        got = calculate_star_objective(data, config)
+        assert got.keys() == expected.keys()
+        for s, value in expected.items():
+            assert got[s] == pytest.approx(value)
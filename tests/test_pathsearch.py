@@ -0,0 +1,57 @@
+import pytest
+
+import mip
+import pathsearch
+from common import total_points
+from feasibility import FeasibilityOracle
+
+
+def _refunds(data, order):
+    return sum(total_points(data, action["remove"]) for action in order if "remove" in action)
+
+
+@pytest.fixture(scope="module")
+def final_sets(data, make_config):
+    sets = []
+    for n in (12, 20, 30):
+        result = mip.MasterProblem(data, make_config(num_points=n)).solve()
+        if result is not None:
+            sets.append((n, set(result[1])))
+    return sets
+
+
+def test_search_matches_mip(data, make_config, final_sets):
+    for n, final in final_sets:
+        config = make_config(num_points=n)
+        order = pathsearch.solve_final_constellation_path(data, config, final)
+        expected = mip.solve_final_constellation_path(data, config, final)
+        assert order[-1]["constellations"] == final
+        assert all(action["points"] <= n for action in order)
+        assert _refunds(data, order) == _refunds(data, expected)
+
+
+# Out of states, the path is planned with the MIP instead
+def test_search_falls_back_to_mip(data, make_config, final_sets, monkeypatch):
+    n, final = final_sets[-1]
+    config = make_config(num_points=n)
+    planned = []
+    plan = mip.solve_final_constellation_path
+
+    def plan_with_mip(*args, **kwargs):
+        planned.append(args[2])
+        return plan(*args, **kwargs)
+
+    monkeypatch.setattr(mip, "solve_final_constellation_path", plan_with_mip)
+    oracle = FeasibilityOracle(data)
+    order = pathsearch.solve_final_constellation_path(data, config, final, oracle, max_states=1)
+    assert planned == [final]
+    assert order[-1]["constellations"] == final
+    assert oracle.lookup(final, n).feasible is True
+
+
+def test_search_unreachable(data, make_config):
+    config = make_config(num_points=10)
+    target = set(sorted(data.constellations, key=lambda c: -len(data.constellations[c]))[:3])
+    oracle = FeasibilityOracle(data)
+    assert pathsearch.solve_final_constellation_path(data, config, target, oracle) is None
+    assert oracle.lookup(target, 10).feasible is False
@@ -0,0 +1,77 @@
+import dataclasses
+
+import pytest
+
+import mip
+from common import calculate_star_objective
+from evaluate import evaluate_star_sets
+from presolve import _dominates, fill_points, presolve
+
+
+@pytest.mark.parametrize("num_points", [10, 20])
+def test_same_objective(data, make_config, num_points):
+    objectives = {}
+    for enabled in (False, True):
+        config = make_config(num_points=num_points, presolve=enabled)
+        master = mip.MasterProblem(data, config)
+        stars, constellations = master.solve()
+        objectives[enabled] = master.objective
+        assert evaluate_star_sets(data, config, [stars]).legal[0]
+        if enabled:
+            # Bundled constellations are taken whole or not at all
+            for c in master.pre.bundled:
+                assert sum(s in stars for s in data.constellations[c]) in (0, len(data.constellations[c]))
+    assert objectives[True] == pytest.approx(objectives[False])
+
+
+def test_kept_stars(data, make_config):
+    config = make_config(num_points=20)
+    pre = presolve(data, config)
+    kept = set(pre.stars)
+    assert set(calculate_star_objective(data, config)) <= kept
+    assert all(data.predecessor[s] in kept for s in kept if s in data.predecessor)
+    assert all(s not in kept for c in pre.bundled for s in data.constellations[c])
+    assert set(pre.bundled) <= set(pre.constellations)
+
+    everything = presolve(data, make_config(num_points=20, presolve=False))
+    assert everything.stars == list(data.stars) and everything.complete
+
+
+# Of constellations only worth completing for their affinity, those giving less for as much are tied to the better
+# ones, and of two equivalent ones the first is preferred
+def test_dominance(data, make_config):
+    cheap = sorted((c for c in data.constellations if not any(data.affinity_req[c].values())),
+                   key=lambda c: (len(data.constellations[c]), c))
+    needy = next((c for c in sorted(data.constellations) if any(data.affinity_req[c].values())), None)
+    if len(cheap) < 3 or needy is None:
+        pytest.skip("not enough constellations without requirements")
+    a = next(a for a, d in data.affinity_req[needy].items() if d > 0)
+
+    # Three cheap constellations of the same size which only give `a`: the first two equally, the third less
+    first, second, third = sorted(cheap[:3], key=list(data.constellations).index)
+    if len({len(data.constellations[c]) for c in (first, second, third)}) > 1:
+        pytest.skip("the cheapest constellations without requirements differ in size")
+    bonus = dict(data.affinity_bonus)
+    bonus[first] = bonus[second] = {a: 2}
+    bonus[third] = {a: 1}
+    changed = dataclasses.replace(data, affinity_bonus=bonus)
+
+    config = make_config(num_points=20)
+    config.objective = {}
+    config.desired_stars = {data.constellations[needy][0]}
+    pre = presolve(changed, config)
+    assert {first, second, third} <= set(pre.bundled)
+    assert {(second, first), (third, first), (third, second)} <= set(pre.dominated)
+    assert (first, second) not in pre.dominated
+    assert all(_dominates(changed, d, c) for c, d in pre.dominated)
+
+
+# Padding only takes stars allowed by the final constellations, without completing any other constellation
+def test_fill_points(data, make_config):
+    config = make_config(num_points=20)
+    _, final = mip.MasterProblem(data, config).solve()
+    stars = [s for c in final for s in data.constellations[c]]
+    filled = fill_points(data, config, stars, final)
+    assert set(stars) < set(filled) and len(filled) <= config.num_points
+    assert evaluate_star_sets(data, config, [filled]).legal[0]
+    assert {c for c, cons in data.constellations.items() if set(cons) <= set(filled)} == set(final)
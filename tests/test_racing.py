@@ -0,0 +1,69 @@
+import pytest
+
+import mip
+from feasibility import FeasibilityOracle
+from horizon import turn_lower_bound
+from racing import RACE_WIDTH, HorizonPool
+
+
+@pytest.fixture(scope="module")
+def pool(data):
+    with HorizonPool(data, workers=RACE_WIDTH + 1, threads=1) as pool:
+        yield pool
+
+
+# Record the horizons submitted to `pool`, with the number of tasks of the same race already running
+@pytest.fixture
+def submitted(pool, monkeypatch):
+    log = []
+    running = set()
+    submit, start_race = pool._submit, pool._start_race
+
+    def record(config, target, turns, minimise_refunds=False):
+        running.difference_update({f for f in running if f.done()})
+        log.append((turns, len(running)))
+        f = submit(config, target, turns, minimise_refunds)
+        running.add(f)
+        return f
+
+    def new_race(*args):
+        running.clear()
+        start_race(*args)
+
+    monkeypatch.setattr(pool, "_submit", record)
+    monkeypatch.setattr(pool, "_start_race", new_race)
+    return log
+
+
+def _targets(data, config):
+    singles = sorted(
+        ({c} for c in data.constellations if turn_lower_bound(data, {c}, config.num_points) is not None),
+        key=lambda target: sorted(target),
+    )
+    return singles[:6]
+
+
+def test_pool_matches_serial_search(data, make_config, pool, submitted):
+    config = make_config(num_points=10)
+    upper = mip.turn_upper_bound(data, config.num_points, config.max_horizon)
+    for target in _targets(data, config):
+        serial = mip.find_horizon(data, config, target, FeasibilityOracle(data), minimal=True)
+        submitted.clear()
+        raced = mip.find_horizon(data, config, target, FeasibilityOracle(data), minimal=True, pool=pool)
+        assert (raced is None) == (serial is None)
+        if serial is not None:
+            assert raced[0] == serial[0]
+
+        assert all(running < RACE_WIDTH for _, running in submitted)
+        # The largest horizon is only tried alone, after every smaller one failed
+        assert all(running == 0 for turns, running in submitted if turns >= upper)
+
+
+def test_stable_refunds_matches_serial(data, make_config, pool, submitted):
+    config = make_config(num_points=20)
+    for target in _targets(data, config):
+        serial = mip.solve_final_constellation_path(data, config, target, FeasibilityOracle(data))
+        submitted.clear()
+        raced = mip.solve_final_constellation_path(data, config, target, FeasibilityOracle(data), pool=pool)
+        assert (raced is None) == (serial is None)
+        assert all(running < RACE_WIDTH for _, running in submitted)
@@ -0,0 +1,77 @@
+import pytest
+
+pytest.importorskip("scipy")
+
+import highs
+import mip
+from highs import GRB
+from separation import EPSILON, CutLimiter, Separator
+
+
+def test_limiter():
+    limiter = CutLimiter(per_round=3, total=10, max_skip=4)
+    rounds = []
+    for found in (0, 0, 0, 2):
+        while not limiter.should_separate():
+            rounds.append("skip")
+        rounds.append(found)
+        limiter.record(found)
+    assert rounds == [0, "skip", 0, "skip", "skip", 0, "skip", "skip", "skip", "skip", 2]
+    assert limiter.room() == 3
+    limiter.record(7)
+    assert limiter.room() == 1
+    limiter.record(1)
+    assert not limiter.should_separate()
+
+
+def _value(cut, values):
+    return sum(c * values[i] for i, c in cut.expr.coeffs.items()) + cut.expr.constant
+
+
+# Cuts are violated by the point they were separated from, and hold for every legal final set
+def test_cuts_are_valid(data, make_config):
+    config = make_config(num_points=10)
+    stars, final = mip.MasterProblem(data, config).solve()
+
+    model = highs.Model()
+    X = {s: model.addVar(vtype=GRB.BINARY) for s in data.stars}
+    Y = {c: model.addVar(vtype=GRB.BINARY) for c in data.constellations}
+    separator = Separator(highs, data, config, X, Y)
+    separator.limiter = CutLimiter(per_round=1000)
+
+    # The largest constellations nearly complete, over the point limit between them, and the first star of a
+    # constellation with requirements taken without any constellation giving the affinity
+    x = {s: 0.0 for s in X}
+    y = {c: 0.0 for c in Y}
+    points = 0
+    for c in sorted(Y, key=lambda c: (-len(data.constellations[c]), c)):
+        if points > config.num_points:
+            break
+        y[c] = 0.9
+        points += len(data.constellations[c])
+    for s in data.stars:
+        needed = {a for a, amount in data.affinity_req[s.cons].items() if amount > 0}
+        if s not in data.predecessor and needed and not any(y[d] for d in Y if data.affinity_bonus[d].keys() & needed):
+            x[s] = 1.0
+            break
+    cuts = separator.separate(x, y)
+    assert cuts
+
+    fractional = {v.index: x[s] for s, v in X.items()}
+    fractional.update({v.index: y[c] for c, v in Y.items()})
+    legal = {v.index: float(s in stars) for s, v in X.items()}
+    legal.update({v.index: float(c in final) for c, v in Y.items()})
+    for cut in cuts:
+        assert cut.sense == GRB.LESS_EQUAL
+        assert _value(cut, fractional) > EPSILON
+        assert _value(cut, legal) <= 1e-9
+
+
+def test_same_objective(data, make_config):
+    objectives = []
+    for user_cuts in (False, True):
+        master = mip.MasterProblem(data, make_config(num_points=20, user_cuts=user_cuts))
+        master.solve()
+        assert master.optimal
+        objectives.append(master.objective)
+    assert objectives[0] == pytest.approx(objectives[1])
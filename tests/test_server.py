@@ -0,0 +1,98 @@
+import asyncio
+import json
+import multiprocessing
+import socket
+import time
+
+import pytest
+
+from server import JobError, SolverServer, _disconnected
+
+
+# One worker and no queue, so a second job is turned away while one runs
+@pytest.fixture(scope="module")
+def server(data):
+    server = SolverServer(data, workers=1, queue=0, timeout=30.0, solution_cache=False)
+    asyncio.run(server.warm_up())
+    yield server
+    server.close()
+
+
+def _run(server, config, job_id="job"):
+    async def run():
+        return await server.run(job_id, config, 30.0, asyncio.get_running_loop().create_future())
+    return json.loads(asyncio.run(run()))
+
+
+def test_solves(server, make_config):
+    assert _run(server, make_config())["stars"]
+    assert server.status() == {"workers": 1, "jobs": [], "free_slots": 1}
+
+
+def test_too_many_jobs(server, make_config):
+    async def run():
+        never = asyncio.get_running_loop().create_future()
+        first = asyncio.ensure_future(server.run("first", make_config(), 30.0, never))
+        await asyncio.sleep(0)
+        with pytest.raises(JobError) as e:
+            await server.run("second", make_config(), 30.0, never)
+        assert e.value.status == 503
+        return await first
+
+    assert json.loads(asyncio.run(run()))["stars"]
+    assert server.status()["free_slots"] == 1
+
+
+def test_recovers_from_worker_crash(server, make_config):
+    async def run():
+        never = asyncio.get_running_loop().create_future()
+        job = asyncio.ensure_future(server.run("crash", make_config(), 30.0, never))
+        await asyncio.sleep(0)
+        for p in multiprocessing.active_children():
+            p.kill()
+        with pytest.raises(JobError) as e:
+            await job
+        assert e.value.status == 500
+
+    asyncio.run(run())
+    assert server.status() == {"workers": 1, "jobs": [], "free_slots": 1}
+    assert _run(server, make_config())["stars"]
+
+
+async def _serve(handler, client):
+    listener = await asyncio.start_server(handler, "127.0.0.1", 0)
+    async with listener:
+        port = listener.sockets[0].getsockname()[1]
+        return await asyncio.get_running_loop().run_in_executor(None, client, port)
+
+
+# A client is gone once its side of the connection is closed, but not while it merely sends something more
+def test_disconnected():
+    events = []
+
+    async def handler(reader, writer):
+        task = asyncio.ensure_future(_disconnected(reader))
+        await asyncio.sleep(0.2)
+        events.append(task.done())
+        await asyncio.wait_for(task, 5)
+        events.append(task.done())
+        writer.close()
+
+    def client(port):
+        with socket.create_connection(("127.0.0.1", port)) as s:
+            s.sendall(b"more")
+            time.sleep(0.4)
+            s.shutdown(socket.SHUT_WR)
+            s.recv(1)
+
+    asyncio.run(_serve(handler, client))
+    assert events == [False, True]
+
+
+def test_request_line_too_long(server):
+    def client(port):
+        with socket.create_connection(("127.0.0.1", port)) as s:
+            s.sendall(b"GET /" + b"x" * 2**17 + b" HTTP/1.1\r\n\r\n")
+            return s.recv(65536)
+
+    assert asyncio.run(_serve(server.handle, client)).startswith(b"HTTP/1.1 400")
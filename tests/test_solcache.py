@@ -0,0 +1,67 @@
+import dataclasses
+import os
+
+import pytest
+
+import mip
+import solcache
+from solcache import SolutionCache, solution_key
+from solve import solve
+
+
+@pytest.fixture(scope="module")
+def solved(data, make_config):
+    config = make_config(num_points=10)
+    return config, solve(data, config)
+
+
+def test_round_trip(solved, tmp_path):
+    config, sol = solved
+    cache = SolutionCache(tmp_path, version="test")
+    assert cache.get(config) is None
+    cache.put(config, sol)
+    assert cache.get(config) == sol
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert SolutionCache(tmp_path, version="other").get(config) is None
+
+
+def test_key(make_config):
+    config = make_config()
+    key = solution_key(config, "test")
+    kind = next(iter(config.objective))
+    assert solution_key(dataclasses.replace(config, objective={**config.objective, "unused": 0}), "test") == key
+    assert solution_key(dataclasses.replace(config, objective={**config.objective, kind: 1}), "test") == key
+    for changed in ({"objective": {**config.objective, kind: 2}}, {"num_points": 21}, {"max_horizon": 17},
+                    {"path_engine": "search"}, {"weapons": set()}):
+        assert solution_key(dataclasses.replace(config, **changed), "test") != key
+    assert solution_key(config, "other") != key
+    assert solution_key(dataclasses.replace(config, time_limit=5, user_cuts=False), "test") == key
+
+
+# A solution proven optimal is stored, and answers the same config without solving
+def test_solve_uses_cache(data, make_config, solved, tmp_path, monkeypatch):
+    monkeypatch.setattr(solcache, "SolutionCache", lambda: SolutionCache(tmp_path, version="test"))
+    config = dataclasses.replace(solved[0], solution_cache=True)
+    sol = solve(data, config)
+    assert sol is not None
+
+    def unexpected(*args, **kwargs):
+        raise AssertionError("solved again")
+
+    monkeypatch.setattr(mip, "MasterProblem", unexpected)
+    assert solve(data, config) == sol
+
+
+def test_evict(solved, tmp_path):
+    config, sol = solved
+    cache = SolutionCache(tmp_path, version="test")
+    configs = [dataclasses.replace(config, num_points=n) for n in (10, 11, 12)]
+    for i, c in enumerate(configs):
+        cache.put(c, sol)
+        os.utime(cache.path(c), ns=(i * 10**9, i * 10**9))
+    size = cache.path(configs[0]).stat().st_size
+
+    assert cache.get(configs[0]) is not None
+    cache.max_bytes = 2 * size
+    cache.evict()
+    assert [cache.path(c).exists() for c in configs] == [True, False, True]
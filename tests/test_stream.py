@@ -0,0 +1,52 @@
+import json
+
+import pytest
+
+import mip
+from evaluate import evaluate_star_sets
+from feasibility import FeasibilityOracle
+from solve import incumbent_printer
+
+
+# Every improving solution is passed on as it is found, and only if its final constellations can be reached
+def test_incumbents(data, make_config):
+    config = make_config(num_points=14)
+    incumbents = []
+    master = mip.MasterProblem(data, config)
+    result = master.solve(incumbents.append)
+    assert result is not None and master.optimal
+
+    objectives = [incumbent.objective for incumbent in incumbents]
+    assert objectives == sorted(set(objectives))
+    assert objectives[-1] == pytest.approx(master.objective)
+    assert (incumbents[-1].stars, incumbents[-1].final_constellations) == result
+    oracle = FeasibilityOracle(data)
+    for incumbent in incumbents:
+        assert evaluate_star_sets(data, config, [incumbent.stars]).legal[0]
+        assert mip.is_reachable(data, config, set(incumbent.final_constellations), oracle)
+        assert incumbent.bound is None or incumbent.bound >= incumbent.objective - 1e-6
+
+
+# Stopped early, the best solution so far is returned, but not as optimal
+def test_should_stop(data, make_config):
+    config = make_config(num_points=14)
+    started = []
+    master = mip.MasterProblem(data, config)
+    result = master.solve(started.append, should_stop=lambda: True)
+    assert not master.optimal
+    if started:
+        assert result == (started[-1].stars, started[-1].final_constellations)
+    else:
+        assert result is None
+
+
+def test_printer(capsys):
+    print_incumbent = incumbent_printer()
+    print_incumbent(mip.Incumbent(10.0, 12.0, [], []))
+    print_incumbent(mip.Incumbent(12.0, None, [], []))
+    print_incumbent(mip.Incumbent(0.0, 1.0, [], []))
+    lines = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert [line["objective"] for line in lines] == [10.0, 12.0, 0.0]
+    assert lines[0]["gap"] == pytest.approx(0.2)
+    assert lines[1]["gap"] is None and lines[2]["gap"] is None
+    assert all(line["elapsed"] >= 0 and line["stars"] == [] for line in lines)
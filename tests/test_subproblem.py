@@ -0,0 +1,46 @@
+import pytest
+
+import mip
+from feasibility import check_path
+
+
+# The final constellations of the best builds with a few budgets, with the budget
+@pytest.fixture(scope="module")
+def targets(data, make_config):
+    targets = []
+    for n in (12, 20):
+        result = mip.MasterProblem(data, make_config(num_points=n)).solve()
+        if result is not None:
+            targets.append((n, set(result[1])))
+    return targets
+
+
+# A Subproblem grown turn by turn gives the same answers as one built for each horizon
+def test_grown_matches_fresh(data, make_config, targets):
+    for n, target in targets:
+        config = make_config(num_points=n)
+        grown = mip.Subproblem(data, config, target, 1)
+        for turns in (1, 2, 4, 8):
+            grown.limit_turns(turns)
+            fresh = mip.Subproblem(data, config, target, turns)
+            feasible = grown.is_feasible()
+            assert feasible == fresh.is_feasible()
+            if feasible:
+                assert check_path(data, config.num_points, grown.get_turns(), target)
+                assert grown.minimise_refunds() == fresh.minimise_refunds()
+
+
+# A fixed number of refunds still holds over the turns added after it was fixed
+def test_grown_keeps_refunds_fixed(data, make_config, targets):
+    for n, target in targets:
+        config = make_config(num_points=n)
+        sp = mip.Subproblem(data, config, target, 4)
+        refunds = sp.minimise_refunds()
+        if refunds is None:
+            continue
+        sp.fix_num_refunds(refunds)
+        sp.limit_turns(8)
+        assert sp.minimise_refunds() == refunds
+        turns = sp.get_turns()
+        assert check_path(data, config.num_points, turns, target)
+        assert sum(len(data.constellations[c]) for _, removed in turns for c in removed) == refunds
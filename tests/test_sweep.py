@@ -0,0 +1,78 @@
+import dataclasses
+import json
+
+import pytest
+
+from mip import MasterProblem
+from session import Session
+from solve import OutputSettings, sweep
+
+
+def _objective(data, config):
+    master = MasterProblem(data, config)
+    return master.objective if master.solve() is not None else None
+
+
+def test_sweep_matches_independent_solves(data, make_config, capsys):
+    points = range(14, 19)
+    sweep(data, make_config(), points, OutputSettings(json=True))
+    rows = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert [row["points"] for row in rows] == sorted(points, reverse=True)
+    for row in rows:
+        expected = _objective(data, make_config(num_points=row["points"]))
+        assert row["objective"] == pytest.approx(expected)
+
+
+# Going up in points keeps the previous solution valid, so it is the MIP start of the next solve
+@pytest.mark.parametrize("points", [(14, 16, 18), (18, 16, 14)])
+def test_session_matches_independent_solves(data, make_config, points):
+    session = Session(data, make_config(num_points=points[0]))
+    for n in points:
+        session.set_num_points(n)
+        result = session.solve()
+        expected = _objective(data, make_config(num_points=n))
+        assert (result is None) == (expected is None)
+        if result is not None:
+            assert session.objective == pytest.approx(expected)
+            assert len(set(result["stars"])) <= n
+
+
+def test_session_objective_change(data, make_config):
+    config = make_config()
+    kind = next(iter(config.objective))
+    session = Session(data, config)
+    session.solve()
+    session.set_objective({kind: 1.0})
+    session.solve()
+    assert session.objective == pytest.approx(_objective(data, dataclasses.replace(config, objective={kind: 1.0})))
+
+
+# Cuts found with more points stay with fewer, and are dropped when the budget goes back up
+def test_master_set_num_points(data, make_config):
+    master = MasterProblem(data, make_config(num_points=18))
+    cuts = []
+    for n in (18, 15, 12):
+        master.set_num_points(n)
+        assert master.solve() is not None
+        assert master.objective == pytest.approx(_objective(data, make_config(num_points=n)))
+        assert set(cuts) <= set(master.cuts)
+        cuts = master.cuts
+
+    master.set_num_points(18)
+    assert master.cuts == []
+    master.solve()
+    assert master.objective == pytest.approx(_objective(data, make_config(num_points=18)))
+
+
+# Once a budget is impossible, smaller ones aren't tried
+def test_sweep_stops_when_impossible(data, make_config, capsys):
+    def possible(n, power):
+        return _objective(data, make_config(num_points=n, celestial_powers=[power])) is not None
+
+    power = next((p for p in sorted(data.celestial_power_stars) if possible(20, p) and not possible(2, p)), None)
+    if power is None:
+        pytest.skip("no celestial power needs between 3 and 20 points")
+    sweep(data, make_config(celestial_powers=[power]), [1, 2, 20], OutputSettings())
+    lines = capsys.readouterr().out.splitlines()
+    assert [line.split()[0] for line in lines[1:]] == ["2", "20"]
+    assert "Impossible" in lines[1] and "Impossible" not in lines[2]
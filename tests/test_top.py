@@ -0,0 +1,33 @@
+import pytest
+
+from mip import MasterProblem
+
+
+def _top(data, config, k, min_difference):
+    master = MasterProblem(data, config)
+    builds = []
+    for _ in range(k):
+        result = master.solve()
+        if result is None:
+            break
+        stars, final = result
+        builds.append((master.objective, set(stars), frozenset(final)))
+        master.exclude(final, min_difference)
+    return builds
+
+
+@pytest.mark.parametrize("min_difference", [1, 2])
+def test_top_builds_are_distinct(data, make_config, min_difference):
+    builds = _top(data, make_config(), 6, min_difference)
+    assert len(builds) > 1
+
+    # Best first, to within the solver's optimality gap
+    objectives = [objective for objective, _, _ in builds]
+    assert all(b <= a + 1e-4 * abs(a) for a, b in zip(objectives, objectives[1:]))
+    for _, stars, final in builds:
+        # Taking every star of a constellation completes it, so the cut on the final constellations can't be dodged
+        assert final == {c for c, cons in data.constellations.items() if set(cons) <= stars}
+    for i, (_, stars, final) in enumerate(builds):
+        for _, other_stars, other_final in builds[:i]:
+            assert stars != other_stars
+            assert len(final ^ other_final) >= min_difference